@@ -1,4 +1,5 @@
 import 'dart:convert';
+import 'dart:math' as math;
 import 'package:flutter/foundation.dart';
 import 'package:flutter/services.dart';
 import 'package:shared_preferences/shared_preferences.dart';
@@ -13,10 +14,15 @@ import '../../services/time/time.dart';
 /// Input tensor order (CRITICAL - must match training):
 /// [hourOfDay, dayOfWeek, currentStreak, failuresLast7Days, categoryEnumValue]
 /// Shape: [1, 5] (batch size 1, 5 features)
+///
+/// When assets/ml_models/logistic_model.json is shipped, it is used instead of
+/// the TFLite model: weights on raw features plus a bias, evaluated as a dot
+/// product and a sigmoid.
 class AbandonmentPredictor {
   final Clock clock;
   Interpreter? _interpreter;
   Map<String, dynamic>? _scalerParams;
+  Map<String, dynamic>? _logisticModel;
   Map<String, dynamic>? _modelMetadata;
   bool _initialized = false;
 
@@ -72,22 +78,34 @@ class AbandonmentPredictor {
         'AbandonmentPredictor.initialize: Model version ${_modelMetadata!['version']} loaded',
       );
 
-      // Load TFLite model from assets
-      debugPrint('AbandonmentPredictor.initialize: Loading TFLite model...');
-      _interpreter = await Interpreter.fromAsset(
-        'assets/ml_models/predictor.tflite',
-      );
-      debugPrint(
-        'AbandonmentPredictor.initialize: TFLite model loaded successfully',
-      );
+      // Prefer the logistic model when shipped (no interpreter needed)
+      _logisticModel = await _loadLogisticModel();
 
-      // Load scaler parameters
-      debugPrint('AbandonmentPredictor: Loading scaler params...');
-      final scalerJson = await rootBundle.loadString(
-        'assets/ml_models/scaler_params.json',
-      );
-      _scalerParams = json.decode(scalerJson) as Map<String, dynamic>;
-      debugPrint('AbandonmentPredictor: Scaler params loaded successfully');
+      if (_logisticModel == null) {
+        // Load TFLite model from assets
+        debugPrint('AbandonmentPredictor.initialize: Loading TFLite model...');
+        _interpreter = await Interpreter.fromAsset(
+          'assets/ml_models/predictor.tflite',
+        );
+        debugPrint(
+          'AbandonmentPredictor.initialize: TFLite model loaded successfully',
+        );
+
+        // Load scaler parameters (optional: newer models normalize in-graph)
+        debugPrint('AbandonmentPredictor: Loading scaler params...');
+        try {
+          final scalerJson = await rootBundle.loadString(
+            'assets/ml_models/scaler_params.json',
+          );
+          _scalerParams = json.decode(scalerJson) as Map<String, dynamic>;
+          debugPrint('AbandonmentPredictor: Scaler params loaded successfully');
+        } catch (e) {
+          _scalerParams = null;
+          debugPrint(
+            'AbandonmentPredictor: No scaler params, model takes raw features',
+          );
+        }
+      }
 
       // Load persisted telemetry
       await _loadTelemetry();
@@ -107,13 +125,75 @@ class AbandonmentPredictor {
     }
   }
 
+  /// Load the logistic model, or null when it is not shipped or invalid
+  Future<Map<String, dynamic>?> _loadLogisticModel() async {
+    try {
+      final logisticJson = await rootBundle.loadString(
+        'assets/ml_models/logistic_model.json',
+      );
+      final model = json.decode(logisticJson) as Map<String, dynamic>;
+      if (model['format'] != 'logistic_v1') {
+        debugPrint('AbandonmentPredictor: Unknown logistic model format');
+        return null;
+      }
+      debugPrint('AbandonmentPredictor: Logistic model loaded');
+      return model;
+    } catch (e) {
+      debugPrint('AbandonmentPredictor: No logistic model, using TFLite ($e)');
+      return null;
+    }
+  }
+
+  bool get _hasModel => _logisticModel != null || _interpreter != null;
+
+  /// Logistic model probability: sigmoid(bias + sum(weights[i] * features[i]))
+  double _logisticRisk(List<double> features) {
+    final weights = (_logisticModel!['weights'] as List).cast<num>();
+    if (weights.length != features.length) {
+      throw StateError(
+        'Logistic model expects ${weights.length} features, got ${features.length}',
+      );
+    }
+    var z = (_logisticModel!['bias'] as num).toDouble();
+    for (int i = 0; i < features.length; i++) {
+      z += weights[i] * features[i];
+    }
+    return 1 / (1 + math.exp(-z));
+  }
+
+  /// Run the shipped model on raw features and return the probability
+  double _runModel(List<double> rawFeatures) {
+    if (_logisticModel != null) {
+      return _logisticRisk(rawFeatures);
+    }
+
+    // Normalize features using StandardScaler (x - mean) / std
+    final normalizedFeatures = _normalizeFeatures(rawFeatures);
+
+    // Prepare input tensor [1, 5] - batch size 1, 5 features
+    final input = [normalizedFeatures];
+
+    // Prepare output tensor [1, 1] - batch size 1, 1 output
+    final output = List.filled(1, List.filled(1, 0.0));
+
+    // Run inference
+    _interpreter!.run(input, output);
+
+    // Extract probability (value between 0 and 1)
+    return output[0][0];
+  }
+
   /// Normalize features using StandardScaler parameters from training
   /// Applies: (feature - mean) / scale element-wise
+  ///
+  /// Models exported with the scaler folded in take raw features: their
+  /// scaler_params.json is flagged `normalized_in_model` (or absent).
   List<double> _normalizeFeatures(List<double> features) {
     if (_scalerParams == null) {
-      debugPrint(
-        'AbandonmentPredictor: Scaler params not loaded, returning raw features',
-      );
+      return features;
+    }
+
+    if (_scalerParams!['normalized_in_model'] == true) {
       return features;
     }
 
@@ -152,7 +232,7 @@ class AbandonmentPredictor {
   /// 4. Failures last 7 days (MLFeaturesCalculator.countRecentFailures(habit, 7))
   /// 5. Category enum value (habit.category.index)
   Future<double> predictRisk(Habit habit) async {
-    if (!_initialized || _interpreter == null) {
+    if (!_initialized || !_hasModel) {
       debugPrint(
         'AbandonmentPredictor: Not initialized, returning neutral risk 0.5',
       );
@@ -198,21 +278,8 @@ class AbandonmentPredictor {
         'streak=$currentStreak, failures=$failuresLast7Days, category=$categoryEnumValue]',
       );
 
-      // Normalize features using StandardScaler (x - mean) / std
-      final normalizedFeatures = _normalizeFeatures(rawFeatures);
-
-      // Prepare input tensor [1, 5] - batch size 1, 5 features
-      // Input must be 2D array: [[hourOfDay, dayOfWeek, currentStreak, failuresLast7Days, categoryEnumValue]]
-      final input = [normalizedFeatures];
-
-      // Prepare output tensor [1, 1] - batch size 1, 1 output
-      final output = List.filled(1, List.filled(1, 0.0));
-
-      // Run inference
-      _interpreter!.run(input, output);
-
-      // Extract probability (value between 0 and 1)
-      final probability = output[0][0];
+      // Run the logistic model or the TFLite interpreter on [1, 5] input
+      final probability = _runModel(rawFeatures);
 
       debugPrint(
         'AbandonmentPredictor: Predicted risk = ${(probability * 100).toStringAsFixed(1)}% '
@@ -256,7 +323,7 @@ class AbandonmentPredictor {
     required int recentFailures,
     required int hoursSinceReminder,
   }) async {
-    if (!_initialized || _interpreter == null) {
+    if (!_initialized || !_hasModel) {
       debugPrint('AbandonmentPredictor: Not initialized, returning 0.0');
       return 0.0;
     }
@@ -271,20 +338,8 @@ class AbandonmentPredictor {
         hoursSinceReminder.toDouble(),
       ];
 
-      // Normalize features
-      final normalizedFeatures = _normalizeFeatures(rawFeatures);
-
-      // Prepare input tensor [1, 5] - batch size 1, 5 features
-      final input = [normalizedFeatures];
-
-      // Prepare output tensor [1, 1] - batch size 1, 1 output
-      final output = List.filled(1, List.filled(1, 0.0));
-
-      // Run inference
-      _interpreter!.run(input, output);
-
-      // Extract probability (value between 0 and 1)
-      final probability = output[0][0];
+      // Run the logistic model or the TFLite interpreter
+      final probability = _runModel(rawFeatures);
 
       debugPrint(
         'AbandonmentPredictor: Predicted risk = ${(probability * 100).toStringAsFixed(1)}%',
@@ -302,6 +357,7 @@ class AbandonmentPredictor {
     _interpreter?.close();
     _interpreter = null;
     _scalerParams = null;
+    _logisticModel = null;
     _initialized = false;
     debugPrint('AbandonmentPredictor: Disposed');
   }
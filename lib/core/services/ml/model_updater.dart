@@ -85,21 +85,29 @@ class ModelUpdater {
         'ModelUpdater: predictor.tflite downloaded (${modelResponse.bodyBytes.length} bytes)',
       );
 
-      // Download scaler_params.json
+      // Download scaler_params.json (optional: newer models normalize in-graph)
       debugPrint('ModelUpdater: Downloading scaler_params.json...');
       final scalerResponse = await http.get(Uri.parse(_scalerUrl));
+      final scalerFile = File('${mlDir.path}/scaler_params.json');
 
-      if (scalerResponse.statusCode != 200) {
+      if (scalerResponse.statusCode == 404) {
+        // Release has no scaler: drop any stale one from a previous model
+        if (await scalerFile.exists()) {
+          await scalerFile.delete();
+        }
+        debugPrint(
+          'ModelUpdater: No scaler_params.json, model takes raw features',
+        );
+      } else if (scalerResponse.statusCode != 200) {
         debugPrint(
           'ModelUpdater: Failed to download scaler, status: ${scalerResponse.statusCode}',
         );
         return false;
+      } else {
+        await scalerFile.writeAsString(scalerResponse.body);
+        debugPrint('ModelUpdater: scaler_params.json downloaded');
       }
 
-      final scalerFile = File('${mlDir.path}/scaler_params.json');
-      await scalerFile.writeAsString(scalerResponse.body);
-      debugPrint('ModelUpdater: scaler_params.json downloaded');
-
       return true;
     } catch (e) {
       debugPrint('ModelUpdater: Download failed: $e');
@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""
+Benchmark TFLite inference for the abandonment predictor.
+
+Loads the exported model with tf.lite.Interpreter at each requested thread
+count and measures, over held-out rows from the training store:
+- model load time (interpreter construction + tensor allocation)
+- single-sample latency (one invoke per row, as the app does)
+- batched latency and throughput
+
+Exits with status 1 when a latency/load budget is exceeded, so a slow model
+can be caught before it replaces assets/ml_models/predictor.tflite.
+
+Usage:
+    python benchmark_tflite.py
+    python benchmark_tflite.py --model ../assets/ml_models/predictor_int8.tflite --threads 1 2 4
+    python benchmark_tflite.py --max-p99-us 500 --max-load-ms 50
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+import tensorflow as tf
+
+from train_model import default_data_path, dequantize_output, quantize_input, sample_split
+from training_store import FEATURES
+
+ASSETS_DIR = os.path.join(os.path.dirname(__file__), '..', 'assets', 'ml_models')
+DEFAULT_MODEL = os.path.join(ASSETS_DIR, 'predictor.tflite')
+DEFAULT_ROWS = 5000
+WARMUP_RUNS = 50
+PERCENTILES = (50, 95, 99)
+
+
+def load_inputs(data_path, model_path, rows):
+    """Raw feature rows of the test split (held out by both trainers), scaled only when the model expects scaled input.
+
+    Models exported with the scaler folded in take raw features; for older
+    models scaler_params.json next to the model holds the real mean/scale.
+    Its feature list (absent before feature sets) selects the columns.
+    """
+    scaler_path = os.path.join(os.path.dirname(model_path), 'scaler_params.json')
+    params = {}
+    if os.path.exists(scaler_path):
+        with open(scaler_path) as f:
+            params = json.load(f)
+    X, _ = sample_split(data_path, 'test', rows, features=params.get('features', FEATURES))
+    if params and not params.get('normalized_in_model'):
+        X = (X - np.array(params['mean'])) / np.array(params['scale'])
+    return X
+
+
+def load_interpreter(model_path, threads):
+    """(interpreter, load seconds)."""
+    start = time.perf_counter()
+    interpreter = tf.lite.Interpreter(model_path=model_path, num_threads=threads)
+    interpreter.allocate_tensors()
+    return interpreter, time.perf_counter() - start
+
+
+def time_invokes(interpreter, X, batch_size):
+    """Per-call seconds for invoking the model on consecutive batches of X (tail batch dropped)."""
+    inp = interpreter.get_input_details()[0]
+    out = interpreter.get_output_details()[0]
+    interpreter.resize_tensor_input(inp['index'], [batch_size, X.shape[1]])
+    interpreter.allocate_tensors()
+    inp = interpreter.get_input_details()[0]
+    X = quantize_input(X, inp)
+
+    batches = [X[i:i + batch_size] for i in range(0, len(X) - batch_size + 1, batch_size)]
+    for batch in batches[:WARMUP_RUNS]:
+        interpreter.set_tensor(inp['index'], batch)
+        interpreter.invoke()
+
+    latencies = np.empty(len(batches))
+    for i, batch in enumerate(batches):
+        start = time.perf_counter()
+        interpreter.set_tensor(inp['index'], batch)
+        interpreter.invoke()
+        dequantize_output(interpreter.get_tensor(out['index']), out)
+        latencies[i] = time.perf_counter() - start
+    return latencies
+
+
+def benchmark(model_path, X, threads=(1,), batch_sizes=(1, 64)):
+    """One result dict per (threads, batch size): load ms, p50/p95/p99 µs per call, rows/s."""
+    results = []
+    for n_threads in threads:
+        interpreter, load_seconds = load_interpreter(model_path, n_threads)
+        for batch_size in batch_sizes:
+            latencies = time_invokes(interpreter, X, batch_size)
+            p50, p95, p99 = np.percentile(latencies, PERCENTILES)
+            results.append({
+                'threads': n_threads,
+                'batch': batch_size,
+                'load_ms': load_seconds * 1e3,
+                'p50_us': p50 * 1e6,
+                'p95_us': p95 * 1e6,
+                'p99_us': p99 * 1e6,
+                'rows_per_s': len(latencies) * batch_size / latencies.sum(),
+            })
+    return results
+
+
+def print_results(results):
+    print(f"   {'threads':>7} {'batch':>6} {'load (ms)':>10} {'p50 (µs)':>10} {'p95 (µs)':>10} "
+          f"{'p99 (µs)':>10} {'rows/s':>12}")
+    for r in results:
+        print(f"   {r['threads']:7d} {r['batch']:6d} {r['load_ms']:10.2f} {r['p50_us']:10.1f} "
+              f"{r['p95_us']:10.1f} {r['p99_us']:10.1f} {r['rows_per_s']:12,.0f}")
+
+
+def check_budgets(results, max_p50_us=None, max_p99_us=None, max_load_ms=None):
+    """Budget violations as messages; latency budgets apply to single-sample (batch 1) runs."""
+    violations = []
+    loads_checked = set()
+    for r in results:
+        label = f"threads={r['threads']}"
+        if max_load_ms is not None and r['threads'] not in loads_checked and r['load_ms'] > max_load_ms:
+            violations.append(f"{label}: load {r['load_ms']:.2f}ms > {max_load_ms}ms")
+        loads_checked.add(r['threads'])
+        if r['batch'] != 1:
+            continue
+        if max_p50_us is not None and r['p50_us'] > max_p50_us:
+            violations.append(f"{label}: p50 {r['p50_us']:.1f}µs > {max_p50_us}µs")
+        if max_p99_us is not None and r['p99_us'] > max_p99_us:
+            violations.append(f"{label}: p99 {r['p99_us']:.1f}µs > {max_p99_us}µs")
+    return violations
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark TFLite inference of the abandonment predictor")
+    parser.add_argument('--model', default=DEFAULT_MODEL, help='TFLite model to benchmark')
+    parser.add_argument('--data', default=None,
+                        help='Store directory or CSV (default: data/training_store, else data/training_data.csv)')
+    parser.add_argument('--rows', type=int, default=DEFAULT_ROWS, help='Held-out rows to run')
+    parser.add_argument('--threads', type=int, nargs='+', default=[1], help='Interpreter thread counts')
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=[1, 64], help='Rows per invoke')
+    parser.add_argument('--max-p50-us', type=float, default=None, help='Budget: single-sample p50 latency')
+    parser.add_argument('--max-p99-us', type=float, default=None, help='Budget: single-sample p99 latency')
+    parser.add_argument('--max-load-ms', type=float, default=None, help='Budget: model load time')
+    args = parser.parse_args()
+
+    data_path = args.data or default_data_path()
+    for path in (args.model, data_path):
+        if not os.path.exists(path):
+            print(f"❌ Error: {path} not found")
+            sys.exit(1)
+
+    X = load_inputs(data_path, args.model, args.rows)
+    if len(X) < max(args.batch_sizes):
+        print(f"❌ Error: only {len(X)} held-out rows, need at least {max(args.batch_sizes)}")
+        sys.exit(1)
+
+    print(f"⏱️  {os.path.basename(args.model)} ({os.path.getsize(args.model) / 1024:.1f} KB), "
+          f"{len(X)} held-out rows")
+    results = benchmark(args.model, X, args.threads, args.batch_sizes)
+    print_results(results)
+
+    violations = check_budgets(results, args.max_p50_us, args.max_p99_us, args.max_load_ms)
+    if violations:
+        print("\n❌ Budget exceeded:")
+        for violation in violations:
+            print(f"   - {violation}")
+        sys.exit(1)
+    print("\n✅ Within budget")
+
+
+if __name__ == '__main__':
+    main()
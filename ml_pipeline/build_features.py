@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+"""
+Feature-building stage between the Firestore export and training.
+
+Derives temporal features per user and per user/habit from the exported
+records, using grouped cumulative sums and shifts (no per-row Python loops):
+- cyclic hour/day encodings
+- hours since the previous record of the same habit
+- completion rate over the previous records of the habit / of the user
+
+User, habit and event time come from the document id written by the app,
+`{userId}_{habitId}_{millisecondsSinceEpoch}`. Rates only look at earlier
+records (not ones at the same instant), so a row's own label never leaks
+into its features.
+
+FEATURE_SETS is the registry train_model.py reads (--feature-set); the set
+name is exported next to the model so the app knows which inputs to build.
+
+Usage:
+    python build_features.py [--data data/training_store] [--output data/features.parquet]
+"""
+
+import argparse
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+
+from training_store import FEATURES, ID_COLUMN, LABEL, compact_frame, read_dataset
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), 'data')
+DEFAULT_OUTPUT = os.path.join(DATA_DIR, 'features.parquet')
+
+HABIT_WINDOW = 7                # previous records of the habit in habit_completion_rate
+USER_WINDOW = 30                # previous records of the user in user_completion_rate
+NO_HISTORY_RATE = 0.5           # rate used before a habit/user has any history
+HOURS_SINCE_CAP = 24 * 30       # hours_since_last is capped (and used when there is no previous record)
+
+# Derived features: name -> description
+DERIVED_FEATURES = {
+    'hour_sin': 'sin(2*pi*hourOfDay/24)',
+    'hour_cos': 'cos(2*pi*hourOfDay/24)',
+    'dow_sin': 'sin(2*pi*(dayOfWeek-1)/7)',
+    'dow_cos': 'cos(2*pi*(dayOfWeek-1)/7)',
+    'hours_since_last': f'hours since the previous record of the habit (capped at {HOURS_SINCE_CAP})',
+    'habit_completion_rate': f'completed share of the habit\'s previous {HABIT_WINDOW} records',
+    'user_completion_rate': f'completed share of the user\'s previous {USER_WINDOW} records',
+}
+
+# Versioned feature sets; append new versions, never edit a shipped one
+FEATURE_SETS = {
+    'v1': list(FEATURES),
+    'v2': list(FEATURES) + list(DERIVED_FEATURES),
+}
+DEFAULT_FEATURE_SET = 'v1'
+
+
+def feature_columns(name):
+    """Feature columns of a registered set (ValueError for unknown names)."""
+    if name not in FEATURE_SETS:
+        raise ValueError(f"Unknown feature set {name!r} (registered: {', '.join(FEATURE_SETS)})")
+    return list(FEATURE_SETS[name])
+
+
+def needs_derived(features):
+    return any(f in DERIVED_FEATURES for f in features)
+
+
+def is_materialized(data_path, features):
+    """True when data_path is a Parquet file (build_features.py output) that already holds every feature."""
+    if os.path.isdir(data_path) or not data_path.endswith('.parquet'):
+        return False
+    return set(features) <= set(pq.read_schema(data_path).names)
+
+
+def parse_doc_ids(ids):
+    """(user key, user/habit key, event millis) from app doc ids; NaN where an id is missing or malformed."""
+    ids = pd.Series(ids, dtype='string')
+    head_tail = ids.str.rsplit('_', n=1)
+    habit_key = head_tail.str[0]
+    millis = pd.to_numeric(head_tail.str[1], errors='coerce')
+    user_key = ids.str.split('_', n=1).str[0]
+    valid = millis.notna() & habit_key.str.contains('_', regex=False).fillna(False)
+    return user_key.where(valid), habit_key.where(valid), millis.where(valid)
+
+
+def trailing_rate(completed, keys, window, times=None):
+    """Mean of `completed` over each row's previous `window` rows with the same key (rows sorted by time).
+
+    Windowed sums come from a per-group cumulative sum minus its lag, so the
+    whole column is computed with grouped C loops. With times, rows sharing
+    a key and a time are not each other's history: all of them get the
+    value of the first.
+    """
+    groups = completed.groupby(keys, sort=False)
+    before = groups.cumsum() - completed                        # sum over all earlier rows
+    lagged = before.groupby(keys, sort=False).shift(window).fillna(0.0)
+    count = np.minimum(groups.cumcount(), window)
+    if times is not None:
+        before, lagged, count = (at_first_of_instant(s, keys, times) for s in (before, lagged, count))
+    with np.errstate(invalid='ignore', divide='ignore'):
+        rate = (before - lagged) / count.where(count > 0)
+    return rate.fillna(NO_HISTORY_RATE)
+
+
+def at_first_of_instant(values, keys, times):
+    """values with every row replaced by the first row (in order) sharing its key and time."""
+    return values.groupby([keys, times], sort=False).transform('first')
+
+
+def add_features(df):
+    """Return df with every DERIVED_FEATURES column added (row order and index preserved).
+
+    Needs the raw FEATURES, LABEL and the doc id column.
+    """
+    if ID_COLUMN not in df.columns:
+        raise ValueError(f"Derived features need the {ID_COLUMN} column (re-export into the Parquet store)")
+
+    out = df.copy()
+    hour = out['hourOfDay'].to_numpy(dtype=np.float64)
+    day = out['dayOfWeek'].to_numpy(dtype=np.float64) - 1
+    out['hour_sin'] = np.sin(2 * np.pi * hour / 24)
+    out['hour_cos'] = np.cos(2 * np.pi * hour / 24)
+    out['dow_sin'] = np.sin(2 * np.pi * day / 7)
+    out['dow_cos'] = np.cos(2 * np.pi * day / 7)
+
+    user_key, habit_key, millis = parse_doc_ids(out[ID_COLUMN].to_numpy())
+    events = pd.DataFrame({
+        'user': user_key.to_numpy(),
+        'habit': habit_key.to_numpy(),
+        'millis': millis.to_numpy(dtype=np.float64),
+        'completed': 1.0 - out[LABEL].to_numpy(dtype=np.float64),
+    })
+
+    # Per-habit features in (habit, time) order
+    by_habit = events.sort_values(['habit', 'millis'], kind='stable')
+    gap_hours = by_habit.groupby('habit', sort=False)['millis'].diff() / 3.6e6
+    hours_since = gap_hours.clip(upper=HOURS_SINCE_CAP).fillna(HOURS_SINCE_CAP)
+    # Records at the same instant are not earlier than each other
+    hours_since = at_first_of_instant(hours_since, by_habit['habit'], by_habit['millis'])
+    habit_rate = trailing_rate(by_habit['completed'], by_habit['habit'], HABIT_WINDOW, by_habit['millis'])
+
+    # Per-user features in (user, time) order
+    by_user = events.sort_values(['user', 'millis'], kind='stable')
+    user_rate = trailing_rate(by_user['completed'], by_user['user'], USER_WINDOW, by_user['millis'])
+
+    # Rows without a usable id have no history
+    no_id = events['habit'].isna().to_numpy()
+    out['hours_since_last'] = np.where(no_id, HOURS_SINCE_CAP, hours_since.sort_index().to_numpy())
+    out['habit_completion_rate'] = np.where(no_id, NO_HISTORY_RATE, habit_rate.sort_index().to_numpy())
+    out['user_completion_rate'] = np.where(no_id, NO_HISTORY_RATE, user_rate.sort_index().to_numpy())
+    return out
+
+
+def build_feature_frame(data_path, name):
+    """Return FEATURE_SETS[name] + LABEL, computing derived columns unless data_path already holds them."""
+    features = feature_columns(name)
+    if not needs_derived(features) or is_materialized(data_path, features):
+        return read_dataset(data_path, columns=features + [LABEL])
+    raw = read_dataset(data_path, columns=FEATURES + [LABEL, ID_COLUMN])
+    return add_features(raw)[features + [LABEL]]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Materialize a registered feature set for training")
+    parser.add_argument('--data', default=os.path.join(DATA_DIR, 'training_store'),
+                        help='Raw export (store directory, part file or CSV with docId)')
+    parser.add_argument('--feature-set', default=sorted(FEATURE_SETS)[-1], choices=sorted(FEATURE_SETS),
+                        help='Feature set to build (default: newest)')
+    parser.add_argument('--output', default=DEFAULT_OUTPUT, help='Parquet file to write')
+    args = parser.parse_args()
+
+    if not os.path.exists(args.data):
+        print(f"❌ Error: {args.data} not found")
+        print("   Run export_firestore_data.py first to generate training data")
+        sys.exit(1)
+
+    print(f"🧮 Building feature set {args.feature_set} from {args.data}...")
+    df = build_feature_frame(args.data, args.feature_set)
+    compact_frame(df).to_parquet(args.output, index=False)
+
+    print(f"✅ {len(df)} rows x {len(df.columns) - 1} features -> {args.output}")
+    for name in feature_columns(args.feature_set):
+        if name in DERIVED_FEATURES:
+            print(f"   - {name}: {DERIVED_FEATURES[name]}")
+
+
+if __name__ == '__main__':
+    main()
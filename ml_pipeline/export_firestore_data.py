@@ -1,28 +1,45 @@
 #!/usr/bin/env python3
 """
-Export Firestore ML training data to CSV for model training.
+Export Firestore ML training data for model training.
 
 This script:
 1. Connects to Firestore using Firebase Admin SDK
-2. Queries the ml_training_data collection
-3. Exports data to CSV with required ML features
+2. Pages through the ml_training_data collection (start_after cursors)
+3. Writes each page (Parquet parts by default, or CSV) with required ML features,
+   checkpointing the cursor
 4. Validates minimum record count (50 records)
 
 Usage:
     Place serviceAccountKey.json in ml_pipeline directory
-    python export_firestore_data.py
+    python export_firestore_data.py [--page-size 500] [--restart] [--format parquet|csv]
+    python export_firestore_data.py --delta   # nightly: only documents since the last run
+    python export_firestore_data.py --workers 8   # full export, 8 shards in parallel
 """
 
+import argparse
+import json
 import os
 import sys
 import firebase_admin
 from firebase_admin import credentials, firestore
+import shutil
+import time
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
 import pandas as pd
-from datetime import datetime
+from datetime import datetime, timedelta
+
+from training_store import FEATURES, store_summary, validate_page, write_part
 
 
 def initialize_firebase():
     """Initialize Firebase Admin SDK with service account credentials."""
+    # The Admin SDK talks to the emulator on its own when this is set; no key needed
+    if os.environ.get('FIRESTORE_EMULATOR_HOST'):
+        firebase_admin.initialize_app(options={'projectId': os.environ.get('GCLOUD_PROJECT', 'demo-ml-export')})
+        print(f"✅ Using Firestore emulator at {os.environ['FIRESTORE_EMULATOR_HOST']}")
+        return
+
     # Check for service account key
     key_path = os.path.join(os.path.dirname(__file__), 'serviceAccountKey.json')
     
@@ -40,77 +57,546 @@ def initialize_firebase():
         sys.exit(1)
 
 
-def export_training_data():
-    """Export ml_training_data collection to CSV."""
-    db = firestore.client()
-    
-    # Query all documents from ml_training_data collection
-    print("📥 Fetching data from Firestore ml_training_data collection...")
-    
+COLLECTION = 'ml_training_data'
+DATA_DIR = os.path.join(os.path.dirname(__file__), 'data')
+DEFAULT_PAGE_SIZE = 500
+MIN_RECORDS = 50
+
+# Delta exports: CompletionRecord.completedAt (ISO-8601 string) is the high-water mark.
+# It is device-local time, so each run re-reads a lookback window and dedups by doc id.
+TIMESTAMP_FIELD = 'completedAt'
+STORE_DIR = os.path.join(DATA_DIR, 'training_store')
+DEFAULT_LOOKBACK_HOURS = 48
+
+
+def fetch_pages(db, page_size=DEFAULT_PAGE_SIZE, start_after=None, since=None):
+    """Yield lists of document snapshots, one page at a time.
+
+    Pages are ordered by document id (or by completedAt, then id, when
+    since is given) and chained with start_after cursors, so at most
+    page_size documents are held in memory. start_after is a document id
+    (id order) or a cursor dict from page_cursor(). Works with any client
+    exposing the Firestore query API (real client, emulator or a fake).
+    """
+    query = db.collection(COLLECTION)
+    if since is None:
+        order = ['__name__']
+        cursor = None if start_after is None else {'__name__': start_after}
+    else:
+        query = query.where(TIMESTAMP_FIELD, '>=', since)
+        order = [TIMESTAMP_FIELD, '__name__']
+        cursor = start_after
+    for field in order:
+        query = query.order_by(field)
+    return paginate(query, order, page_size, cursor)
+
+
+def paginate(query, order, page_size=DEFAULT_PAGE_SIZE, cursor=None):
+    """Yield pages of an already-ordered query, chaining start_after cursors."""
+    query = query.limit(page_size)
+    while True:
+        page_query = query if cursor is None else query.start_after(cursor)
+        docs = list(page_query.stream())
+        if not docs:
+            return
+        yield docs
+        if len(docs) < page_size:
+            return
+        cursor = page_cursor(docs[-1], order)
+
+
+def page_cursor(doc, order):
+    """Cursor dict positioned at doc for a query ordered by the given fields."""
+    data = doc.to_dict()
+    return {field: doc.id if field == '__name__' else data.get(field) for field in order}
+
+
+def _numeric(values):
+    """Column buffer -> float array, NaN for missing or non-numeric values."""
     try:
-        docs = db.collection('ml_training_data').stream()
-        
-        records = []
-        for doc in docs:
-            data = doc.to_dict()
-            
-            # Extract ML features
-            record = {
-                'hourOfDay': data.get('hourOfDay'),
-                'dayOfWeek': data.get('dayOfWeek'),
-                'streakAtTime': data.get('streakAtTime'),
-                'failuresLast7Days': data.get('failuresLast7Days'),
-                'hoursFromReminder': data.get('hoursFromReminder'),
-                'abandoned': not data.get('completed', True),  # abandoned = !completed
-            }
-            
-            # Only include records with all required fields
-            if all(v is not None for v in record.values()):
-                records.append(record)
-            else:
-                print(f"⚠️  Skipping incomplete record: {doc.id}")
-        
-        if not records:
-            print("⚠️  No complete records found in ml_training_data collection")
+        return np.array(values, dtype=np.float64)  # None -> NaN
+    except (TypeError, ValueError):
+        return pd.to_numeric(pd.Series(values, dtype=object), errors='coerce').to_numpy(dtype=np.float64)
+
+
+def page_to_frame(docs, keep_ids=False):
+    """Extract ML features from one page of documents.
+
+    Fields are gathered into columnar buffers and validated for the whole
+    page at once. Returns (DataFrame of valid records, {reason: rejected
+    count}). With keep_ids, a leading docId column is kept for deduplication.
+    """
+    data = [doc.to_dict() for doc in docs]
+    columns = {feature: _numeric([d.get(feature) for d in data]) for feature in FEATURES}
+    # abandoned = !completed (an absent flag counts as completed)
+    completed = np.array([bool(d.get('completed', True)) for d in data], dtype=bool)
+
+    keep, rejected = validate_page(columns)
+
+    df = pd.DataFrame({feature: values[keep] for feature, values in columns.items()})
+    df['abandoned'] = ~completed[keep]
+    if keep_ids:
+        df.insert(0, 'docId', np.array([doc.id for doc in docs], dtype=object)[keep])
+    return df, rejected
+
+
+def merge_rejects(total, page):
+    """Add one page's reject counts into a running {reason: count} dict."""
+    for reason, count in page.items():
+        total[reason] = total.get(reason, 0) + count
+    return total
+
+
+def print_rejects(rejected):
+    """Aggregate reject summary (one line per reason)."""
+    print(f"  - Rejected: {sum(rejected.values())}")
+    for reason, count in sorted(rejected.items(), key=lambda item: -item[1]):
+        print(f"      {reason}: {count}")
+
+
+def load_checkpoint(checkpoint_path):
+    """Return the saved export checkpoint, or None if there is none."""
+    if not os.path.exists(checkpoint_path):
+        return None
+    with open(checkpoint_path, 'r') as f:
+        return json.load(f)
+
+
+def save_checkpoint(checkpoint_path, checkpoint):
+    """Atomically persist the checkpoint (written after each page is on disk)."""
+    tmp_path = checkpoint_path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(checkpoint, f, indent=2)
+    os.replace(tmp_path, checkpoint_path)
+
+
+def export_training_data(db=None, page_size=DEFAULT_PAGE_SIZE, resume=True, output_path=None):
+    """Export ml_training_data collection to CSV, one page at a time.
+
+    Each page is appended to <output>.partial and the last document id is
+    checkpointed, so an interrupted export resumes where it stopped and peak
+    memory is bounded by page_size. The CSV is moved into place once the
+    collection is drained.
+    """
+    if db is None:
+        db = firestore.client()
+    if output_path is None:
+        output_path = os.path.join(DATA_DIR, 'training_data.csv')
+    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+
+    partial_path = output_path + '.partial'
+    checkpoint_path = output_path + '.checkpoint.json'
+
+    checkpoint = load_checkpoint(checkpoint_path) if resume else None
+    if checkpoint and os.path.exists(partial_path):
+        # Drop anything appended after the last checkpointed page
+        with open(partial_path, 'r+b') as f:
+            f.truncate(checkpoint['bytes'])
+        print(f"↩️  Resuming after document {checkpoint['last_doc_id']} "
+              f"({checkpoint['records']} records, {checkpoint['pages']} pages already exported)")
+    else:
+        checkpoint = {'last_doc_id': None, 'pages': 0, 'records': 0, 'rejected': {}, 'abandoned': 0, 'bytes': 0}
+        if os.path.exists(partial_path):
+            os.remove(partial_path)
+
+    print(f"📥 Fetching data from Firestore {COLLECTION} collection (page size {page_size})...")
+
+    try:
+        for docs in fetch_pages(db, page_size, start_after=checkpoint['last_doc_id']):
+            df, rejected = page_to_frame(docs)
+
+            # Write the page straight to disk (header only on the first page)
+            df.to_csv(partial_path, mode='a', header=checkpoint['bytes'] == 0, index=False)
+
+            checkpoint['last_doc_id'] = docs[-1].id
+            checkpoint['pages'] += 1
+            checkpoint['records'] += len(df)
+            merge_rejects(checkpoint['rejected'], rejected)
+            checkpoint['abandoned'] += int(df['abandoned'].sum())
+            checkpoint['bytes'] = os.path.getsize(partial_path)
+            save_checkpoint(checkpoint_path, checkpoint)
+            print(f"  Page {checkpoint['pages']}: {len(df)} records (total {checkpoint['records']})")
+
+        total = checkpoint['records']
+        if total == 0:
+            print(f"⚠️  No complete records found in {COLLECTION} collection")
             print("   Make sure app is collecting data with recordCompletionForML()")
             sys.exit(1)
-        
-        # Create DataFrame
-        df = pd.DataFrame(records)
-        
+
         # Validate minimum record count
-        if len(df) < 50:
-            print(f"⚠️  Need at least 50 records for training, found {len(df)}")
-            print(f"   Current records: {len(df)}/50")
+        if total < MIN_RECORDS:
+            print(f"⚠️  Need at least {MIN_RECORDS} records for training, found {total}")
+            print(f"   Current records: {total}/{MIN_RECORDS}")
             print("   Continue collecting data before training model")
             sys.exit(1)
-        
-        # Export to CSV
-        output_path = os.path.join(os.path.dirname(__file__), 'data', 'training_data.csv')
-        df.to_csv(output_path, index=False)
-        
-        print(f"✅ {len(df)} records exported to {output_path}")
+
+        os.replace(partial_path, output_path)
+        os.remove(checkpoint_path)
+
+        abandoned = checkpoint['abandoned']
+        print(f"✅ {total} records exported to {output_path}")
         print(f"\nData summary:")
-        print(f"  - Total records: {len(df)}")
-        print(f"  - Abandoned: {df['abandoned'].sum()} ({df['abandoned'].sum()/len(df)*100:.1f}%)")
-        print(f"  - Completed: {(~df['abandoned']).sum()} ({(~df['abandoned']).sum()/len(df)*100:.1f}%)")
-        print(f"\nFeature ranges:")
-        print(df.describe())
-        
+        print(f"  - Total records: {total}")
+        print_rejects(checkpoint['rejected'])
+        print(f"  - Abandoned: {abandoned} ({abandoned/total*100:.1f}%)")
+        print(f"  - Completed: {total - abandoned} ({(total - abandoned)/total*100:.1f}%)")
+
     except Exception as e:
         print(f"❌ Error exporting data: {e}")
+        if checkpoint['pages']:
+            print(f"   Progress saved; re-run to resume after document {checkpoint['last_doc_id']}")
         sys.exit(1)
 
 
+def load_store_manifest(store_dir):
+    """Delta-export manifest: high-water mark, boundary doc ids and part files."""
+    manifest_path = os.path.join(store_dir, '_manifest.json')
+    if not os.path.exists(manifest_path):
+        return {'high_water_mark': None, 'boundary': {}, 'parts': [], 'records': 0}
+    with open(manifest_path, 'r') as f:
+        return json.load(f)
+
+
+def remove_orphan_parts(store_dir, manifest):
+    """Delete part files written by a run that died before recording them."""
+    known = set(manifest['parts'])
+    removed = 0
+    for root, _, files in os.walk(store_dir):
+        for name in files:
+            rel = os.path.relpath(os.path.join(root, name), store_dir)
+            if name.startswith('part-') and rel not in known:
+                os.remove(os.path.join(root, name))
+                removed += 1
+    return removed
+
+
+def advance_mark(manifest, docs, lookback):
+    """Move the high-water mark past docs and prune boundary ids outside the lookback window."""
+    boundary = manifest['boundary']
+    mark = manifest['high_water_mark'] or ''
+    for doc in docs:
+        ts = doc.to_dict().get(TIMESTAMP_FIELD)
+        if ts:
+            boundary[doc.id] = ts
+            mark = max(mark, ts)
+    manifest['high_water_mark'] = mark or None
+    if mark:
+        cutoff = (datetime.fromisoformat(mark) - lookback).isoformat()
+        manifest['boundary'] = {doc_id: ts for doc_id, ts in boundary.items() if ts >= cutoff}
+
+
+def export_delta(db=None, page_size=DEFAULT_PAGE_SIZE, store_dir=STORE_DIR,
+                 lookback_hours=DEFAULT_LOOKBACK_HOURS, part_format='parquet'):
+    """Append documents newer than the last run to the partitioned store.
+
+    The store holds export_date=YYYY-MM-DD/part-* files plus a
+    _manifest.json sidecar with the completedAt high-water mark. Each run
+    queries completedAt >= (mark - lookback_hours), skips documents whose id
+    was already stored inside that window, and records the new mark after
+    every page, so an interrupted run loses at most one page of progress.
+    The first run (no manifest) backfills the whole collection.
+    """
+    if db is None:
+        db = firestore.client()
+    os.makedirs(store_dir, exist_ok=True)
+
+    manifest = load_store_manifest(store_dir)
+    orphans = remove_orphan_parts(store_dir, manifest)
+    if orphans:
+        print(f"🧹 Removed {orphans} part file(s) left by an interrupted run")
+
+    lookback = timedelta(hours=lookback_hours)
+    if manifest['high_water_mark']:
+        since = (datetime.fromisoformat(manifest['high_water_mark']) - lookback).isoformat()
+        print(f"📥 Fetching {COLLECTION} documents with {TIMESTAMP_FIELD} >= {since} "
+              f"(high-water mark {manifest['high_water_mark']}, {lookback_hours}h lookback)...")
+    else:
+        since = ''  # Every ISO timestamp sorts after the empty string
+        print(f"📥 No high-water mark yet; backfilling the whole {COLLECTION} collection...")
+
+    now = datetime.now()
+    partition = f"export_date={now.date().isoformat()}"
+    os.makedirs(os.path.join(store_dir, partition), exist_ok=True)
+    run_stamp = now.strftime('%H%M%S%f')
+
+    fetched = new_records = duplicates = pages = 0
+    rejected = {}
+
+    for docs in fetch_pages(db, page_size, since=since):
+        pages += 1
+        fetched += len(docs)
+        fresh = [doc for doc in docs if doc.id not in manifest['boundary']]
+        duplicates += len(docs) - len(fresh)
+
+        df, page_rejected = page_to_frame(fresh, keep_ids=True)
+        merge_rejects(rejected, page_rejected)
+        if len(df):
+            part = os.path.join(partition, f"part-{run_stamp}-{pages:05d}.{part_format}")
+            write_part(df, os.path.join(store_dir, part))
+            manifest['parts'].append(part)
+            manifest['records'] += len(df)
+            new_records += len(df)
+
+        advance_mark(manifest, fresh, lookback)
+        save_checkpoint(os.path.join(store_dir, '_manifest.json'), manifest)
+
+    print(f"✅ Delta export: {new_records} new records in {pages} pages -> {store_dir}/{partition}")
+    print(f"  - Fetched: {fetched}")
+    print(f"  - Already stored (deduplicated by doc id): {duplicates}")
+    print_rejects(rejected)
+    print(f"  - Store total: {manifest['records']} records in {len(manifest['parts'])} part files")
+    print(f"  - High-water mark: {manifest['high_water_mark']}")
+
+    return new_records
+
+
+def publish_snapshot(staging_dir, store_dir, stats):
+    """Write the store manifest into a finished staging dir and swap it into place."""
+    manifest = {key: stats[key] for key in ('high_water_mark', 'boundary', 'parts', 'records')}
+    save_checkpoint(os.path.join(staging_dir, '_manifest.json'), manifest)
+
+    if os.path.exists(store_dir):
+        old_dir = store_dir.rstrip(os.sep) + '.old'
+        os.replace(store_dir, old_dir)
+        os.replace(staging_dir, store_dir)
+        shutil.rmtree(old_dir)
+    else:
+        os.replace(staging_dir, store_dir)
+
+
+def export_snapshot(db=None, page_size=DEFAULT_PAGE_SIZE, resume=True, store_dir=STORE_DIR,
+                    lookback_hours=DEFAULT_LOOKBACK_HOURS, part_format='parquet'):
+    """Rebuild the columnar store from a full, paged export.
+
+    Pages are written as part files into <store_dir>.staging with the same
+    checkpoint/resume behaviour as the CSV export. Once the collection is
+    drained the staging directory replaces the store, with a manifest that
+    lets later --delta runs continue from this snapshot.
+    """
+    if db is None:
+        db = firestore.client()
+
+    staging_dir = store_dir.rstrip(os.sep) + '.staging'
+    checkpoint_path = os.path.join(staging_dir, '_checkpoint.json')
+
+    checkpoint = load_checkpoint(checkpoint_path) if resume else None
+    if checkpoint:
+        remove_orphan_parts(staging_dir, checkpoint)
+        print(f"↩️  Resuming after document {checkpoint['last_doc_id']} "
+              f"({checkpoint['records']} records, {checkpoint['pages']} pages already exported)")
+    else:
+        if os.path.exists(staging_dir):
+            shutil.rmtree(staging_dir)
+        checkpoint = {'last_doc_id': None, 'pages': 0, 'records': 0, 'rejected': {}, 'abandoned': 0,
+                      'parts': [], 'high_water_mark': None, 'boundary': {}}
+
+    partition = f"export_date={datetime.now().date().isoformat()}"
+    os.makedirs(os.path.join(staging_dir, partition), exist_ok=True)
+    lookback = timedelta(hours=lookback_hours)
+
+    print(f"📥 Fetching data from Firestore {COLLECTION} collection (page size {page_size})...")
+
+    try:
+        for docs in fetch_pages(db, page_size, start_after=checkpoint['last_doc_id']):
+            df, rejected = page_to_frame(docs, keep_ids=True)
+
+            checkpoint['pages'] += 1
+            part = os.path.join(partition, f"part-{checkpoint['pages']:05d}.{part_format}")
+            write_part(df, os.path.join(staging_dir, part))
+
+            checkpoint['parts'].append(part)
+            checkpoint['last_doc_id'] = docs[-1].id
+            checkpoint['records'] += len(df)
+            merge_rejects(checkpoint['rejected'], rejected)
+            checkpoint['abandoned'] += int(df['abandoned'].sum())
+            advance_mark(checkpoint, docs, lookback)
+            save_checkpoint(checkpoint_path, checkpoint)
+            print(f"  Page {checkpoint['pages']}: {len(df)} records (total {checkpoint['records']})")
+
+        total = checkpoint['records']
+        if total < MIN_RECORDS:
+            print(f"⚠️  Need at least {MIN_RECORDS} records for training, found {total}")
+            print("   Continue collecting data before training model")
+            sys.exit(1)
+
+        os.remove(checkpoint_path)
+        publish_snapshot(staging_dir, store_dir, checkpoint)
+
+        partitions, parts, size = store_summary(store_dir)
+        abandoned = checkpoint['abandoned']
+        print(f"✅ {total} records exported to {store_dir} ({parts} {part_format} parts, {size / 1024:.1f}KB)")
+        print(f"\nData summary:")
+        print(f"  - Total records: {total}")
+        print_rejects(checkpoint['rejected'])
+        print(f"  - Abandoned: {abandoned} ({abandoned/total*100:.1f}%)")
+        print(f"  - Completed: {total - abandoned} ({(total - abandoned)/total*100:.1f}%)")
+
+    except Exception as e:
+        print(f"❌ Error exporting data: {e}")
+        if checkpoint['pages']:
+            print(f"   Progress saved; re-run to resume after document {checkpoint['last_doc_id']}")
+        sys.exit(1)
+
+
+# Document ids are '<uid>_<habitId>_<millis>'; Firebase uids use this alphabet (byte order)
+ID_ALPHABET = '0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz'
+
+
+def id_range_shards(db, shards):
+    """Split the collection into document-id ranges on the first id character."""
+    step = len(ID_ALPHABET) / shards
+    bounds = [None] + [ID_ALPHABET[round(i * step)] for i in range(1, shards)] + [None]
+    queries = []
+    for low, high in zip(bounds, bounds[1:]):
+        query = db.collection(COLLECTION).order_by('__name__')
+        if low is not None:
+            query = query.start_at({'__name__': low})
+        if high is not None:
+            query = query.end_before({'__name__': high})
+        queries.append(query)
+    return queries
+
+
+def shard_queries(db, shards):
+    """One ordered query per shard: Firestore partition queries when available, else id ranges."""
+    if shards > 1 and hasattr(db, 'collection_group'):
+        try:
+            partitions = list(db.collection_group(COLLECTION).get_partitions(shards))
+            return [partition.query() for partition in partitions], 'partition query'
+        except Exception as e:  # e.g. emulator without PartitionQuery support
+            print(f"⚠️  Partition query unavailable ({e}); falling back to document-id ranges")
+    return id_range_shards(db, shards), 'document-id ranges'
+
+
+def export_shard(shard, query, page_size, staging_dir, partition, part_format, lookback):
+    """Drain one shard into its own part files; returns the shard's stats."""
+    start = time.perf_counter()
+    stats = {'shard': shard, 'docs': 0, 'pages': 0, 'records': 0, 'abandoned': 0, 'rejected': {},
+             'parts': [], 'high_water_mark': None, 'boundary': {}}
+
+    for docs in paginate(query, ['__name__'], page_size):
+        df, rejected = page_to_frame(docs, keep_ids=True)
+        stats['pages'] += 1
+        part = os.path.join(partition, f"part-s{shard:03d}-{stats['pages']:05d}.{part_format}")
+        write_part(df, os.path.join(staging_dir, part))
+
+        stats['parts'].append(part)
+        stats['docs'] += len(docs)
+        stats['records'] += len(df)
+        stats['abandoned'] += int(df['abandoned'].sum())
+        merge_rejects(stats['rejected'], rejected)
+        advance_mark(stats, docs, lookback)
+
+    stats['seconds'] = time.perf_counter() - start
+    return stats
+
+
+def export_sharded(db=None, workers=4, page_size=DEFAULT_PAGE_SIZE, store_dir=STORE_DIR,
+                   lookback_hours=DEFAULT_LOOKBACK_HOURS, part_format='parquet'):
+    """Full snapshot export with shards drained concurrently.
+
+    The collection is split into `workers` key ranges and each range is
+    paged on its own thread, writing part files into <store_dir>.staging.
+    Shard results are merged into one manifest and the snapshot replaces
+    the store like export_snapshot(). Not resumable: a failed shard fails
+    the run.
+    """
+    if db is None:
+        db = firestore.client()
+
+    staging_dir = store_dir.rstrip(os.sep) + '.staging'
+    if os.path.exists(staging_dir):
+        shutil.rmtree(staging_dir)
+    partition = f"export_date={datetime.now().date().isoformat()}"
+    os.makedirs(os.path.join(staging_dir, partition))
+    lookback = timedelta(hours=lookback_hours)
+
+    queries, method = shard_queries(db, workers)
+    print(f"📥 Fetching {COLLECTION} in {len(queries)} shards ({method}) with {workers} workers...")
+
+    start = time.perf_counter()
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(export_shard, shard, query, page_size, staging_dir, partition, part_format, lookback)
+                       for shard, query in enumerate(queries)]
+            results = [future.result() for future in futures]
+    except Exception as e:
+        print(f"❌ Error exporting data: {e}")
+        sys.exit(1)
+    elapsed = time.perf_counter() - start
+
+    # Merge shard results
+    merged = {'parts': [], 'records': 0, 'abandoned': 0, 'rejected': {}, 'high_water_mark': None, 'boundary': {}}
+    for stats in results:
+        merged['parts'].extend(stats['parts'])
+        merged['records'] += stats['records']
+        merged['abandoned'] += stats['abandoned']
+        merge_rejects(merged['rejected'], stats['rejected'])
+        merged['boundary'].update(stats['boundary'])
+        merged['high_water_mark'] = max(merged['high_water_mark'] or '', stats['high_water_mark'] or '') or None
+    advance_mark(merged, [], lookback)  # prune boundary ids against the merged mark
+
+    print(f"\n{'Shard':>5} {'Docs':>9} {'Pages':>6} {'Secs':>7} {'Docs/s':>9}")
+    for stats in results:
+        rate = stats['docs'] / stats['seconds'] if stats['seconds'] else 0.0
+        print(f"{stats['shard']:>5} {stats['docs']:>9} {stats['pages']:>6} {stats['seconds']:>7.2f} {rate:>9.0f}")
+    total_docs = sum(stats['docs'] for stats in results)
+    print(f"{'all':>5} {total_docs:>9} {sum(s['pages'] for s in results):>6} {elapsed:>7.2f} "
+          f"{total_docs / elapsed if elapsed else 0.0:>9.0f}")
+
+    total = merged['records']
+    if total < MIN_RECORDS:
+        print(f"⚠️  Need at least {MIN_RECORDS} records for training, found {total}")
+        print("   Continue collecting data before training model")
+        sys.exit(1)
+
+    publish_snapshot(staging_dir, store_dir, merged)
+
+    partitions, parts, size = store_summary(store_dir)
+    abandoned = merged['abandoned']
+    print(f"\n✅ {total} records exported to {store_dir} ({parts} {part_format} parts, {size / 1024:.1f}KB)")
+    print(f"\nData summary:")
+    print(f"  - Total records: {total}")
+    print_rejects(merged['rejected'])
+    print(f"  - Abandoned: {abandoned} ({abandoned/total*100:.1f}%)")
+    print(f"  - Completed: {total - abandoned} ({(total - abandoned)/total*100:.1f}%)")
+
+
 def main():
     """Main execution function."""
+    parser = argparse.ArgumentParser(description="Export Firestore ML training data")
+    parser.add_argument('--page-size', type=int, default=DEFAULT_PAGE_SIZE,
+                        help='Documents fetched (and held in memory) per page')
+    parser.add_argument('--restart', action='store_true',
+                        help='Ignore any saved checkpoint and export from the beginning')
+    parser.add_argument('--format', choices=['parquet', 'csv'], default='parquet',
+                        help='parquet: columnar store in data/training_store/ (default); '
+                             'csv: legacy data/training_data.csv')
+    parser.add_argument('--delta', action='store_true',
+                        help='Only fetch documents newer than the last run into data/training_store/')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='Drain the collection in this many concurrent shards (full parquet export only)')
+    parser.add_argument('--lookback-hours', type=float, default=DEFAULT_LOOKBACK_HOURS,
+                        help='With --delta, re-read this window before the high-water mark (device clock skew)')
+    args = parser.parse_args()
+
     print("=" * 60)
     print("Firestore ML Training Data Exporter")
     print("=" * 60)
     print()
     
     initialize_firebase()
-    export_training_data()
+    if args.workers > 1 and (args.delta or args.format != 'parquet'):
+        parser.error('--workers only applies to full parquet exports')
+
+    if args.workers > 1:
+        export_sharded(workers=args.workers, page_size=args.page_size, lookback_hours=args.lookback_hours)
+    elif args.delta:
+        export_delta(page_size=args.page_size, lookback_hours=args.lookback_hours, part_format=args.format)
+    elif args.format == 'parquet':
+        export_snapshot(page_size=args.page_size, resume=not args.restart, lookback_hours=args.lookback_hours)
+    else:
+        export_training_data(page_size=args.page_size, resume=not args.restart)
     
     print("\n" + "=" * 60)
     print("Export complete! Ready to train model with train_model.py")
@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Dependency-free logistic artifact for the abandonment predictor.
+
+The sklearn logistic baseline and its StandardScaler fold into one weight per
+raw feature plus a bias, so inference is a dot product and a sigmoid:
+
+    p = 1 / (1 + exp(-(w . x + b)))
+
+Saved as assets/ml_models/logistic_model.json. Neither this module nor the
+app needs TensorFlow to evaluate it.
+"""
+
+import json
+
+import numpy as np
+
+FORMAT = 'logistic_v1'
+
+
+def fold_logistic(model, scaler):
+    """(weights, bias) on raw features for a linear classifier trained on scaler.transform(X)."""
+    coef = model.coef_[0]
+    weights = coef / scaler.scale_
+    bias = model.intercept_[0] - np.dot(coef, scaler.mean_ / scaler.scale_)
+    return weights, float(bias)
+
+
+def build_artifact(model, scaler, features, accuracy=None, feature_set=None):
+    weights, bias = fold_logistic(model, scaler)
+    artifact = {
+        'format': FORMAT,
+        'features': list(features),
+        'weights': weights.tolist(),
+        'bias': bias,
+    }
+    if accuracy is not None:
+        artifact['accuracy'] = round(float(accuracy), 4)
+    if feature_set is not None:
+        artifact['feature_set'] = feature_set
+    return artifact
+
+
+def save_logistic(model, scaler, path, features, accuracy=None, feature_set=None):
+    """Write the artifact as JSON; returns it."""
+    artifact = build_artifact(model, scaler, features, accuracy, feature_set)
+    with open(path, 'w') as f:
+        json.dump(artifact, f, indent=2)
+    return artifact
+
+
+def load_logistic(path):
+    with open(path) as f:
+        artifact = json.load(f)
+    if artifact.get('format') != FORMAT:
+        raise ValueError(f"{path} is not a {FORMAT} artifact")
+    return artifact
+
+
+def predict_proba(artifact, X):
+    """Abandonment probability for each row of raw features X."""
+    z = np.asarray(X, dtype=np.float64) @ np.asarray(artifact['weights']) + artifact['bias']
+    return 1.0 / (1.0 + np.exp(-z))
@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""
+Content-addressed cache of training runs.
+
+A run is keyed by a SHA-256 over the training data's bytes, the options
+that change the result and the pipeline's source, so an unchanged rerun
+(CI, notebook sessions) is served from disk instead of retrained:
+
+    data/cache/
+        <training key>/
+            run.json            metrics of the trained models
+            models/             baseline.joblib, keras_model.keras, keras.joblib
+            exports/<export key>/
+                export.json     shipped model, output files, TFLite size
+                predictor.tflite, scaler_params.json, ...
+
+Changing only export options reuses the trained models and re-exports;
+changing the data, a training option or the code retrains. Entries are
+never modified once written; the least recently used are pruned.
+"""
+
+import hashlib
+import importlib.metadata
+import json
+import os
+import shutil
+import tempfile
+import time
+
+from training_store import list_parts
+
+CACHE_DIR = os.path.join(os.path.dirname(__file__), 'data', 'cache')
+MAX_ENTRIES = 10               # training entries kept (least recently used are pruned)
+HASH_BLOCK_BYTES = 1 << 20
+
+# Modules whose code decides what a run produces
+SOURCE_FILES = ('train_model.py', 'build_features.py', 'training_store.py', 'logistic_model.py')
+LIBRARIES = ('numpy', 'pandas', 'scikit-learn', 'tensorflow', 'tensorflow-cpu', 'tensorflow-macos')
+
+
+def _update_file(digest, path):
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(HASH_BLOCK_BYTES), b''):
+            digest.update(block)
+
+
+def data_fingerprint(data_path):
+    """SHA-256 over the bytes of a data file, or of every part file (with its relative path) in a store."""
+    digest = hashlib.sha256()
+    if os.path.isdir(data_path):
+        for part in list_parts(data_path):
+            digest.update(os.path.relpath(part, data_path).replace(os.sep, '/').encode())
+            _update_file(digest, part)
+    else:
+        _update_file(digest, data_path)
+    return digest.hexdigest()
+
+
+def code_fingerprint():
+    """SHA-256 over the pipeline sources and the installed versions of the libraries it trains with."""
+    digest = hashlib.sha256()
+    here = os.path.dirname(os.path.abspath(__file__))
+    for name in SOURCE_FILES:
+        digest.update(name.encode())
+        _update_file(digest, os.path.join(here, name))
+    for library in LIBRARIES:
+        try:
+            version = importlib.metadata.version(library)
+        except importlib.metadata.PackageNotFoundError:
+            version = None
+        digest.update(f'{library}={version}'.encode())
+    return digest.hexdigest()
+
+
+def cache_key(*parts):
+    """Hex key of JSON-serializable parts (fingerprints and option dicts)."""
+    payload = json.dumps(parts, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()[:24]
+
+
+def _write_json(path, data):
+    with open(path, 'w') as f:
+        json.dump(data, f, indent=2)
+
+
+def _read_json(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def _publish(staging, final):
+    """Move a fully written staging directory into place (a concurrent writer of the same key wins)."""
+    os.makedirs(os.path.dirname(final), exist_ok=True)
+    try:
+        os.replace(staging, final)
+    except OSError:
+        shutil.rmtree(staging, ignore_errors=True)
+
+
+def load_run(train_key, cache_dir=None):
+    """(metrics, models directory) of a cached training run, or None."""
+    entry = os.path.join(cache_dir or CACHE_DIR, train_key)
+    if not os.path.exists(os.path.join(entry, 'run.json')):
+        return None
+    os.utime(entry)   # mark as recently used
+    return _read_json(os.path.join(entry, 'run.json')), os.path.join(entry, 'models')
+
+
+def save_run(train_key, model_files, metrics, cache_dir=None):
+    """Store copies of a run's model files (by basename) and its metrics under train_key."""
+    cache_dir = cache_dir or CACHE_DIR
+    os.makedirs(cache_dir, exist_ok=True)
+    staging = tempfile.mkdtemp(prefix='.run-', dir=cache_dir)
+    os.makedirs(os.path.join(staging, 'models'))
+    for path in model_files:
+        copy = shutil.copytree if os.path.isdir(path) else shutil.copy2
+        copy(path, os.path.join(staging, 'models', os.path.basename(path)))
+    metrics = dict(metrics, models=[os.path.basename(p) for p in model_files],
+                   created=time.strftime('%Y-%m-%d %H:%M'))
+    _write_json(os.path.join(staging, 'run.json'), metrics)
+    _publish(staging, os.path.join(cache_dir, train_key))
+    prune(cache_dir)
+
+
+def load_export(train_key, export_key, cache_dir=None):
+    """(export metadata, directory holding its files) of a cached export, or None."""
+    entry = os.path.join(cache_dir or CACHE_DIR, train_key, 'exports', export_key)
+    if not os.path.exists(os.path.join(entry, 'export.json')):
+        return None
+    return _read_json(os.path.join(entry, 'export.json')), entry
+
+
+def save_export(train_key, export_key, output_files, metadata, cache_dir=None):
+    """Store copies of the exported files (by basename) and their metadata under a cached run."""
+    exports_dir = os.path.join(cache_dir or CACHE_DIR, train_key, 'exports')
+    if not os.path.isdir(os.path.dirname(exports_dir)):
+        return
+    os.makedirs(exports_dir, exist_ok=True)
+    staging = tempfile.mkdtemp(prefix='.export-', dir=exports_dir)
+    for path in output_files:
+        shutil.copy2(path, staging)
+    metadata = dict(metadata, files=[os.path.basename(p) for p in output_files])
+    _write_json(os.path.join(staging, 'export.json'), metadata)
+    _publish(staging, os.path.join(exports_dir, export_key))
+
+
+def restore_files(src_dir, names, dest_dir):
+    """Copy cached files into dest_dir; returns their new paths."""
+    os.makedirs(dest_dir, exist_ok=True)
+    restored = []
+    for name in names:
+        src, dest = os.path.join(src_dir, name), os.path.join(dest_dir, name)
+        if os.path.isdir(src):
+            shutil.rmtree(dest, ignore_errors=True)
+            shutil.copytree(src, dest)
+        else:
+            shutil.copy2(src, dest)
+        restored.append(dest)
+    return restored
+
+
+def prune(cache_dir=None, max_entries=MAX_ENTRIES):
+    """Delete all but the max_entries most recently used training entries."""
+    cache_dir = cache_dir or CACHE_DIR
+    entries = [os.path.join(cache_dir, name) for name in os.listdir(cache_dir) if not name.startswith('.')]
+    entries.sort(key=os.path.getmtime, reverse=True)
+    for entry in entries[max_entries:]:
+        shutil.rmtree(entry, ignore_errors=True)
@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the derived features
+Checks the vectorized features against a per-row reference loop
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+import numpy as np
+import pandas as pd
+
+from build_features import (
+    HABIT_WINDOW,
+    HOURS_SINCE_CAP,
+    NO_HISTORY_RATE,
+    USER_WINDOW,
+    add_features,
+    parse_doc_ids,
+    trailing_rate,
+)
+from training_store import FEATURES, ID_COLUMN, LABEL
+
+MALFORMED_IDS = [None, '', 'nounderscores', 'user_1700000000000', 'u1_habit_notanumber', 'u1_habit_']
+
+def make_records(n=480, seed=0):
+    """Raw rows of 3 users x 4 habits, shuffled so row order is not time order, with some malformed ids"""
+    rng = np.random.default_rng(seed)
+    users = rng.integers(0, 3, n)
+    habits = rng.integers(0, 4, n)
+    millis = 1_700_000_000_000 + rng.integers(0, 60, n) * 3_600_000   # coarse times: many ties
+    ids = [f"user{u}_habit_{h}_{m}" for u, h, m in zip(users, habits, millis)]  # habit ids contain '_'
+    for i, doc_id in zip(rng.choice(n, len(MALFORMED_IDS), replace=False), MALFORMED_IDS):
+        ids[i] = doc_id
+    return pd.DataFrame({
+        ID_COLUMN: pd.array(ids, dtype='string'),
+        'hourOfDay': rng.integers(0, 24, n),
+        'dayOfWeek': rng.integers(1, 8, n),
+        'streakAtTime': rng.integers(0, 50, n),
+        'failuresLast7Days': rng.integers(0, 8, n),
+        'hoursFromReminder': rng.normal(0, 2, n),
+        LABEL: rng.random(n) < 0.35,
+    }, index=pd.RangeIndex(1000, 1000 + n))   # non-default index must be preserved
+
+def reference_features(df):
+    """Per-row loop: each row only looks at strictly earlier records of its habit/user (in time, then row order)"""
+    parsed = []
+    for doc_id in df[ID_COLUMN]:
+        parts = None if pd.isna(doc_id) else doc_id.split('_')
+        if parts is None or len(parts) < 3 or not parts[-1].isdigit():
+            parsed.append(None)
+        else:
+            parsed.append((parts[0], '_'.join(parts[:-1]), int(parts[-1])))
+    completed = (~df[LABEL].to_numpy(dtype=bool)).astype(float)
+
+    rows = []
+    for i, key in enumerate(parsed):
+        if key is None:
+            rows.append((HOURS_SINCE_CAP, NO_HISTORY_RATE, NO_HISTORY_RATE))
+            continue
+        user, habit, millis = key
+
+        def earlier(match):
+            return sorted((parsed[j][2], j) for j in range(len(parsed))
+                          if parsed[j] is not None and match(parsed[j]) and parsed[j][2] < millis)
+
+        def rate(history, window):
+            recent = history[-window:]
+            return np.mean([completed[j] for _, j in recent]) if recent else NO_HISTORY_RATE
+
+        habit_history = earlier(lambda p: p[1] == habit)
+        user_history = earlier(lambda p: p[0] == user)
+        since = min((millis - habit_history[-1][0]) / 3.6e6, HOURS_SINCE_CAP) if habit_history else HOURS_SINCE_CAP
+        rows.append((since, rate(habit_history, HABIT_WINDOW), rate(user_history, USER_WINDOW)))
+    return pd.DataFrame(rows, columns=['hours_since_last', 'habit_completion_rate', 'user_completion_rate'],
+                        index=df.index)
+
+# ==================== TESTS ====================
+
+def test_parse_doc_ids():
+    """Test that malformed ids parse to missing keys and habit ids may contain underscores"""
+    print("\n=== TEST: Parse Doc Ids ===")
+
+    user, habit, millis = parse_doc_ids(['u1_habit_x_1700000000000', 'u2_h_5'] + MALFORMED_IDS)
+    assert user.tolist()[:2] == ['u1', 'u2'] and habit.tolist()[:2] == ['u1_habit_x', 'u2_h']
+    assert millis.tolist()[:2] == [1700000000000, 5]
+    assert user[2:].isna().all() and habit[2:].isna().all() and millis[2:].isna().all()
+
+    print("✅ PASSED: Doc ids parse to (user, habit, millis)")
+    return True
+
+def test_trailing_rate_matches_loop():
+    """Test trailing_rate against a loop for windows shorter and longer than the history"""
+    print("\n=== TEST: Trailing Rate ===")
+
+    rng = np.random.default_rng(1)
+    keys = pd.Series(rng.choice(['a', 'b', 'c'], 200))   # interleaved groups, already in time order
+    completed = pd.Series(rng.integers(0, 2, 200).astype(float))
+
+    times = pd.Series(np.sort(rng.integers(0, 80, 200)))   # sorted, with ties
+
+    for window in (1, 2, 7, 30, 500):
+        rate = trailing_rate(completed, keys, window).to_numpy()
+        tied = trailing_rate(completed, keys, window, times).to_numpy()
+        for i in range(len(keys)):
+            history = [completed[j] for j in range(i) if keys[j] == keys[i]][-window:]
+            expected = np.mean(history) if history else NO_HISTORY_RATE
+            assert abs(rate[i] - expected) < 1e-12, f"window={window}, row {i}: {rate[i]} != {expected}"
+            history = [completed[j] for j in range(i) if keys[j] == keys[i] and times[j] < times[i]][-window:]
+            expected = np.mean(history) if history else NO_HISTORY_RATE
+            assert abs(tied[i] - expected) < 1e-12, f"window={window}, row {i} with times: {tied[i]} != {expected}"
+        print(f"window={window}: matches")
+
+    print("✅ PASSED: Windowed rates match the loop")
+    return True
+
+def test_add_features_matches_loop():
+    """Test the per-habit and per-user features against the reference loop"""
+    print("\n=== TEST: add_features vs Loop ===")
+
+    df = make_records()
+    out = add_features(df)
+    expected = reference_features(df)
+
+    assert out.index.equals(df.index), "Row order and index must be preserved"
+    pd.testing.assert_frame_equal(out[df.columns], df)
+    for column in expected.columns:
+        diff = np.abs(out[column].to_numpy() - expected[column].to_numpy()).max()
+        assert diff < 1e-9, f"{column} differs from the loop by {diff}"
+
+    malformed = df[ID_COLUMN].isna() | df[ID_COLUMN].isin(MALFORMED_IDS)
+    assert (out.loc[malformed, 'hours_since_last'] == HOURS_SINCE_CAP).all()
+    assert (out.loc[malformed, ['habit_completion_rate', 'user_completion_rate']] == NO_HISTORY_RATE).all().all()
+    assert np.allclose(out['hour_sin'] ** 2 + out['hour_cos'] ** 2, 1)
+    assert np.allclose(out.loc[df['dayOfWeek'] == 1, 'dow_sin'], 0)
+
+    print(f"✅ PASSED: {len(df)} rows match the reference loop")
+    return True
+
+def test_add_features_no_label_leak():
+    """Test that a row's features only depend on the labels of earlier records"""
+    print("\n=== TEST: No Label Leak ===")
+
+    df = make_records(240, seed=2)
+    derived = ['habit_completion_rate', 'user_completion_rate', 'hours_since_last']
+    base = add_features(df)[derived]
+    millis = parse_doc_ids(df[ID_COLUMN].to_numpy())[2].to_numpy(dtype=np.float64)
+
+    rng = np.random.default_rng(3)
+    for i in rng.choice(len(df), 25, replace=False):
+        if np.isnan(millis[i]):
+            continue
+        # Flip the row's own label and every label that is later in time (ties included)
+        flipped = df.copy()
+        later = np.nan_to_num(millis, nan=-1) >= millis[i]
+        flipped.loc[later, LABEL] = ~flipped.loc[later, LABEL]
+        changed = add_features(flipped)[derived]
+        pd.testing.assert_series_equal(changed.iloc[i], base.iloc[i])
+
+    # Earlier labels do move the rates (the test above is not vacuous)
+    flipped = df.copy()
+    flipped[LABEL] = ~flipped[LABEL]
+    assert not add_features(flipped)['habit_completion_rate'].equals(base['habit_completion_rate'])
+
+    print("✅ PASSED: Features never see the row's own or later labels")
+    return True
+
+def run_all_tests():
+    """Run all tests"""
+    print("\n" + "="*60)
+    print("RUNNING FEATURE BUILDING TEST SUITE")
+    print("="*60)
+
+    tests = [
+        test_parse_doc_ids,
+        test_trailing_rate_matches_loop,
+        test_add_features_matches_loop,
+        test_add_features_no_label_leak,
+    ]
+
+    passed = 0
+    failed = 0
+
+    for test in tests:
+        try:
+            if test():
+                passed += 1
+        except AssertionError as e:
+            print(f"❌ FAILED: {e}")
+            failed += 1
+        except Exception as e:
+            print(f"❌ ERROR: {e}")
+            failed += 1
+
+    print("\n" + "="*60)
+    print(f"TEST RESULTS: {passed} passed, {failed} failed")
+    print("="*60)
+
+    return failed == 0
+
+if __name__ == "__main__":
+    success = run_all_tests()
+    sys.exit(0 if success else 1)
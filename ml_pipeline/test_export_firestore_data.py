@@ -0,0 +1,524 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the Firestore exporter
+Runs the paged, resumable exports against an in-process fake client
+"""
+
+import io
+import os
+import random
+import sys
+import tempfile
+from contextlib import redirect_stdout
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+import pandas as pd
+
+from export_firestore_data import (
+    ID_ALPHABET,
+    advance_mark,
+    export_delta,
+    export_sharded,
+    export_snapshot,
+    export_training_data,
+    fetch_pages,
+    id_range_shards,
+    load_checkpoint,
+    load_store_manifest,
+    paginate,
+    remove_orphan_parts,
+)
+from training_store import list_parts, read_dataset
+
+# ==================== FAKE FIRESTORE ====================
+
+class FakeDoc:
+    def __init__(self, doc_id, data):
+        self.id = doc_id
+        self._data = data
+
+    def to_dict(self):
+        return dict(self._data)
+
+
+class FakeQuery:
+    """Immutable query over a fake collection (where/order_by/cursors/limit/stream)"""
+
+    def __init__(self, client, filters=(), order=(), after=None, at=None, before=None, limit=None):
+        self.client = client
+        self.filters = filters
+        self.order = order
+        self.after = after
+        self.at = at
+        self.before = before
+        self.page_limit = limit
+
+    def _with(self, **changes):
+        fields = dict(filters=self.filters, order=self.order, after=self.after, at=self.at,
+                      before=self.before, limit=self.page_limit)
+        fields.update(changes)
+        return FakeQuery(self.client, **fields)
+
+    def where(self, field, op, value):
+        assert op == '>=', f"Fake only supports >=, got {op}"
+        return self._with(filters=self.filters + ((field, value),))
+
+    def order_by(self, field):
+        return self._with(order=self.order + (field,))
+
+    def start_after(self, cursor):
+        return self._with(after=cursor)
+
+    def start_at(self, cursor):
+        return self._with(at=cursor)
+
+    def end_before(self, cursor):
+        return self._with(before=cursor)
+
+    def limit(self, n):
+        return self._with(limit=n)
+
+    def _key(self, doc, fields):
+        return tuple(doc.id if f == '__name__' else doc.to_dict().get(f) for f in fields)
+
+    def _cursor_key(self, cursor):
+        fields = [f for f in self.order if f in cursor]
+        return fields, tuple(cursor[f] for f in fields)
+
+    def stream(self):
+        self.client.streams.append(self)
+        if self.client.fail_on_stream is not None and len(self.client.streams) >= self.client.fail_on_stream:
+            raise ConnectionError("simulated network failure")
+        if self.client.fail_query is not None and self.client.fail_query(self):
+            raise ConnectionError(f"simulated failure reading {self.at} - {self.before}")
+
+        docs = [d for d in self.client.docs if all((d.to_dict().get(f) or '') >= v for f, v in self.filters)]
+        docs.sort(key=lambda d: self._key(d, self.order or ('__name__',)))
+        if self.after is not None:
+            fields, key = self._cursor_key(self.after)
+            docs = [d for d in docs if self._key(d, fields) > key]
+        if self.at is not None:
+            fields, key = self._cursor_key(self.at)
+            docs = [d for d in docs if self._key(d, fields) >= key]
+        if self.before is not None:
+            fields, key = self._cursor_key(self.before)
+            docs = [d for d in docs if self._key(d, fields) < key]
+        return iter(docs[:self.page_limit])
+
+
+class FakeFirestore:
+    """Just enough of firestore.Client for the exporter: collection() queries"""
+
+    def __init__(self, docs):
+        self.docs = list(docs)
+        self.streams = []            # every query that was streamed, in order
+        self.fail_on_stream = None   # raise on this (1-based) stream call and later ones
+        self.fail_query = None       # raise on queries this predicate matches
+
+    def collection(self, name):
+        assert name == 'ml_training_data'
+        return FakeQuery(self)
+
+
+def make_docs(n, start=datetime(2024, 5, 1, 8), users=('uA', 'uB', 'uC'), seed=0):
+    """n valid app-format documents, one every 30 minutes"""
+    docs = []
+    for i in range(n):
+        ts = start + timedelta(minutes=30 * i)
+        doc_id = f"{users[(i + seed) % len(users)]}_habit{i % 4}_{int(ts.timestamp() * 1000)}"
+        docs.append(FakeDoc(doc_id, {
+            'hourOfDay': ts.hour,
+            'dayOfWeek': ts.isoweekday(),
+            'streakAtTime': i % 30,
+            'failuresLast7Days': i % 7,
+            'hoursFromReminder': (i % 10) / 4,
+            'completed': i % 3 != 0,
+            'completedAt': ts.isoformat(),
+        }))
+    return docs
+
+
+def expect_exit(fn, *args, **kwargs):
+    """Run an export that must end in sys.exit(1)"""
+    try:
+        fn(*args, **kwargs)
+    except SystemExit as e:
+        assert e.code == 1, f"Expected exit code 1, got {e.code}"
+        return
+    assert False, "Export should have exited"
+
+# ==================== PAGING ====================
+
+def test_multi_page_paging():
+    """Test that fetch_pages chains cursors through every page exactly once"""
+    print("\n=== TEST: Multi-Page Paging ===")
+
+    for n, page_size in ((23, 5), (20, 5), (3, 10), (0, 5)):
+        db = FakeFirestore(make_docs(n))
+        pages = list(fetch_pages(db, page_size))
+        ids = [doc.id for page in pages for doc in page]
+
+        assert ids == sorted(doc.id for doc in db.docs), f"Pages must cover every doc once in id order (n={n})"
+        assert all(len(page) == page_size for page in pages[:-1])
+        # A short page ends paging; a full last page costs one extra (empty) read
+        expected_streams = n // page_size + 1
+        assert len(db.streams) == expected_streams, f"{len(db.streams)} reads for n={n}, page_size={page_size}"
+        for query, previous in zip(db.streams[1:], pages):
+            assert query.after == {'__name__': previous[-1].id}, "Each page must start after the previous one"
+        print(f"n={n}, page_size={page_size}: {len(pages)} pages, {len(db.streams)} reads")
+
+    # Resuming from a document id skips everything up to and including it
+    db = FakeFirestore(make_docs(12))
+    ordered = sorted(doc.id for doc in db.docs)
+    resumed = [doc.id for page in fetch_pages(db, 5, start_after=ordered[6]) for doc in page]
+    assert resumed == ordered[7:]
+
+    print("✅ PASSED: Cursor paging covers the collection without gaps or repeats")
+    return True
+
+def test_csv_resume_after_interruption():
+    """Test that an interrupted CSV export resumes from its checkpoint and truncates unrecorded rows"""
+    print("\n=== TEST: CSV Resume After Interruption ===")
+
+    docs = make_docs(120)
+    with tempfile.TemporaryDirectory() as tmp:
+        clean_path = os.path.join(tmp, 'clean.csv')
+        export_training_data(FakeFirestore(docs), page_size=10, output_path=clean_path)
+
+        output_path = os.path.join(tmp, 'training_data.csv')
+        db = FakeFirestore(docs)
+        db.fail_on_stream = 5
+        expect_exit(export_training_data, db, page_size=10, output_path=output_path)
+
+        checkpoint = load_checkpoint(output_path + '.checkpoint.json')
+        assert checkpoint['pages'] == 4 and checkpoint['records'] == 40
+        assert checkpoint['last_doc_id'] == sorted(d.id for d in docs)[39]
+        assert not os.path.exists(output_path), "Unfinished exports must not replace the CSV"
+
+        # A crash between writing a page and checkpointing it leaves extra rows behind
+        with open(output_path + '.partial', 'a') as f:
+            f.write("1,2,3,4,5.0,False\n" * 10)
+
+        db = FakeFirestore(docs)
+        export_training_data(db, page_size=10, output_path=output_path)
+        assert db.streams[0].after == {'__name__': checkpoint['last_doc_id']}, "Resume must start at the cursor"
+        assert len(db.streams) == 9, "Only the remaining 8 pages (+1 empty read) are fetched"
+
+        with open(clean_path) as f:
+            clean = f.read()
+        with open(output_path) as f:
+            assert f.read() == clean, "Resumed export must equal an uninterrupted one"
+        assert len(pd.read_csv(output_path)) == 120
+        assert not os.path.exists(output_path + '.checkpoint.json')
+        assert not os.path.exists(output_path + '.partial')
+
+    print("✅ PASSED: Resume truncates to the checkpoint and continues after the last page")
+    return True
+
+def test_restart_ignores_checkpoint():
+    """Test that resume=False (--restart) drops the checkpoint and exports from the beginning"""
+    print("\n=== TEST: Restart Ignores Checkpoint ===")
+
+    docs = make_docs(80)
+    with tempfile.TemporaryDirectory() as tmp:
+        output_path = os.path.join(tmp, 'training_data.csv')
+        db = FakeFirestore(docs)
+        db.fail_on_stream = 3
+        expect_exit(export_training_data, db, page_size=10, output_path=output_path)
+        assert load_checkpoint(output_path + '.checkpoint.json')['pages'] == 2
+
+        db = FakeFirestore(docs)
+        export_training_data(db, page_size=10, resume=False, output_path=output_path)
+        assert db.streams[0].after is None, "--restart must start from the first document"
+        assert len(pd.read_csv(output_path)) == 80, "Rows from the abandoned run must not be kept"
+
+        # Parquet snapshot: --restart discards the staging directory as well
+        store_dir = os.path.join(tmp, 'training_store')
+        db = FakeFirestore(docs)
+        db.fail_on_stream = 4
+        expect_exit(export_snapshot, db, page_size=10, store_dir=store_dir)
+        assert load_checkpoint(os.path.join(store_dir + '.staging', '_checkpoint.json'))['pages'] == 3
+
+        db = FakeFirestore(docs)
+        export_snapshot(db, page_size=10, resume=False, store_dir=store_dir)
+        assert db.streams[0].after is None
+        stored = read_dataset(store_dir)
+        assert len(stored) == 80 and stored['docId'].is_unique
+        assert not os.path.exists(store_dir + '.staging')
+
+    print("✅ PASSED: Restart exports everything once")
+    return True
+
+def test_snapshot_resume_after_interruption():
+    """Test that an interrupted Parquet snapshot resumes and publishes every document once"""
+    print("\n=== TEST: Snapshot Resume After Interruption ===")
+
+    docs = make_docs(95)
+    with tempfile.TemporaryDirectory() as tmp:
+        store_dir = os.path.join(tmp, 'training_store')
+        db = FakeFirestore(docs)
+        db.fail_on_stream = 6
+        expect_exit(export_snapshot, db, page_size=10, store_dir=store_dir)
+        staging = store_dir + '.staging'
+        checkpoint = load_checkpoint(os.path.join(staging, '_checkpoint.json'))
+        assert checkpoint['pages'] == 5 and not os.path.exists(store_dir)
+
+        # A part written after the last checkpoint is an orphan and must be dropped
+        orphan = os.path.join(staging, os.path.dirname(checkpoint['parts'][0]), 'part-00006.parquet')
+        pd.DataFrame({'docId': ['stray']}).to_parquet(orphan)
+
+        export_snapshot(FakeFirestore(docs), page_size=10, store_dir=store_dir)
+        stored = read_dataset(store_dir)
+        assert sorted(stored['docId']) == sorted(d.id for d in docs), "Every document exactly once"
+        assert len(stored) == 95
+
+    print("✅ PASSED: Snapshot resume drops orphans and completes the store")
+    return True
+
+# ==================== DELTA EXPORT ====================
+
+def stored_doc_ids(store_dir):
+    """docIds of every row in every part, duplicates included"""
+    return [doc_id for part in list_parts(store_dir) for doc_id in read_dataset(part)['docId']]
+
+def test_advance_mark_lookback():
+    """Test that the high-water mark only moves forward and boundary ids are pruned to the lookback"""
+    print("\n=== TEST: Advance Mark Lookback ===")
+
+    lookback = timedelta(hours=48)
+    manifest = load_store_manifest('/nonexistent')
+    assert manifest['high_water_mark'] is None
+
+    advance_mark(manifest, [], lookback)
+    assert manifest['high_water_mark'] is None, "No documents, no mark"
+
+    docs = [FakeDoc(f'd{i}', {'completedAt': ts}) for i, ts in enumerate(
+        ('2024-05-01T11:59:59', '2024-05-01T12:00:00', '2024-05-03T12:00:00', '2024-05-03T12:00:00'))]
+    docs.append(FakeDoc('no_ts', {'completedAt': None}))
+    advance_mark(manifest, docs, lookback)
+    assert manifest['high_water_mark'] == '2024-05-03T12:00:00'
+    # Exactly 48h before the mark is still inside the window
+    assert manifest['boundary'] == {'d1': '2024-05-01T12:00:00', 'd2': '2024-05-03T12:00:00',
+                                    'd3': '2024-05-03T12:00:00'}
+
+    # A late document older than the mark keeps the mark where it is
+    advance_mark(manifest, [FakeDoc('late', {'completedAt': '2024-05-02T18:00:00'})], lookback)
+    assert manifest['high_water_mark'] == '2024-05-03T12:00:00'
+    assert 'late' in manifest['boundary']
+
+    # Moving the mark forward drops ids that fell out of the window
+    advance_mark(manifest, [FakeDoc('next', {'completedAt': '2024-05-05T00:00:00'})], lookback)
+    assert manifest['high_water_mark'] == '2024-05-05T00:00:00'
+    assert set(manifest['boundary']) == {'d2', 'd3', 'next'}
+
+    print("✅ PASSED: Mark advances monotonically and the boundary covers exactly the lookback")
+    return True
+
+def test_delta_dedups_boundary_ids():
+    """Test that reruns skip stored ids at an equal completedAt and pick up late arrivals inside the lookback"""
+    print("\n=== TEST: Delta Boundary Dedup ===")
+
+    docs = make_docs(60)
+    mark = docs[-1].to_dict()['completedAt']
+    # Several documents share the final timestamp and straddle a page boundary
+    docs += [FakeDoc(f'uZ_habit{k}_tie', dict(docs[-1].to_dict())) for k in range(4)]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store_dir = os.path.join(tmp, 'training_store')
+        db = FakeFirestore(docs)
+        assert export_delta(db, page_size=7, store_dir=store_dir) == 64, "First run backfills everything"
+        manifest = load_store_manifest(store_dir)
+        assert manifest['high_water_mark'] == mark and manifest['records'] == 64
+
+        # Nothing new: the lookback re-reads the last 48h but writes nothing
+        db = FakeFirestore(docs)
+        assert export_delta(db, page_size=7, store_dir=store_dir) == 0
+        assert db.streams[0].filters == (('completedAt', (datetime.fromisoformat(mark) - timedelta(hours=48)).isoformat()),)
+        assert len(load_store_manifest(store_dir)['parts']) == len(manifest['parts'])
+
+        # New documents: one more at the tied timestamp, one late arrival inside
+        # the lookback, one late arrival outside it, and one after the mark
+        late_ts = (datetime.fromisoformat(mark) - timedelta(hours=47)).isoformat()
+        stale_ts = (datetime.fromisoformat(mark) - timedelta(hours=49)).isoformat()
+        after_ts = (datetime.fromisoformat(mark) + timedelta(minutes=5)).isoformat()
+        extra = [
+            FakeDoc('uZ_habit9_tie', dict(docs[-1].to_dict())),
+            FakeDoc('uY_habit0_late', dict(docs[0].to_dict(), completedAt=late_ts)),
+            FakeDoc('uY_habit0_stale', dict(docs[0].to_dict(), completedAt=stale_ts)),
+            FakeDoc('uY_habit1_new', dict(docs[0].to_dict(), completedAt=after_ts)),
+        ]
+        db = FakeFirestore(docs + extra)
+        assert export_delta(db, page_size=7, store_dir=store_dir) == 3
+
+        ids = stored_doc_ids(store_dir)
+        assert len(ids) == len(set(ids)) == 67, "No document may be stored twice"
+        assert 'uY_habit0_stale' not in ids, "Arrivals older than the lookback are out of scope"
+        assert {'uZ_habit9_tie', 'uY_habit0_late', 'uY_habit1_new'} <= set(ids)
+        assert load_store_manifest(store_dir)['high_water_mark'] == after_ts
+
+    print("✅ PASSED: Delta reruns store each document once")
+    return True
+
+def test_remove_orphan_parts():
+    """Test that parts missing from the manifest are deleted and recorded parts are kept"""
+    print("\n=== TEST: Remove Orphan Parts ===")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store_dir = os.path.join(tmp, 'training_store')
+        export_delta(FakeFirestore(make_docs(30)), page_size=10, store_dir=store_dir)
+        manifest = load_store_manifest(store_dir)
+        assert len(manifest['parts']) == 3
+
+        # A run that died after writing a part but before saving the manifest
+        partition = os.path.dirname(manifest['parts'][0])
+        orphan = os.path.join(store_dir, partition, 'part-999999999999-00001.parquet')
+        other_day = os.path.join(store_dir, 'export_date=2000-01-01')
+        os.makedirs(other_day)
+        pd.DataFrame({'docId': ['stray']}).to_parquet(orphan)
+        pd.DataFrame({'docId': ['stray2']}).to_parquet(os.path.join(other_day, 'part-x-00001.parquet'))
+
+        assert remove_orphan_parts(store_dir, manifest) == 2
+        assert not os.path.exists(orphan)
+        assert all(os.path.exists(os.path.join(store_dir, part)) for part in manifest['parts'])
+        assert os.path.exists(os.path.join(store_dir, '_manifest.json')), "Only part files are touched"
+        assert remove_orphan_parts(store_dir, manifest) == 0
+
+        # export_delta cleans up before it appends
+        pd.DataFrame({'docId': ['stray']}).to_parquet(orphan)
+        export_delta(FakeFirestore(make_docs(30)), page_size=10, store_dir=store_dir)
+        assert not os.path.exists(orphan)
+        assert sorted(stored_doc_ids(store_dir)) == sorted(d.id for d in make_docs(30))
+
+    print("✅ PASSED: Orphaned parts are removed")
+    return True
+
+# ==================== SHARDED EXPORT ====================
+
+def make_random_id_docs(n, seed=0):
+    """Docs whose uids start anywhere in (and just outside) the Firebase uid alphabet"""
+    rng = random.Random(seed)
+    template = make_docs(1)[0].to_dict()
+    first_chars = ID_ALPHABET + '-_~'   # '-' sorts before '0', '_' between 'Z' and 'a', '~' after 'z'
+    docs = []
+    for i in range(n):
+        uid = first_chars[i % len(first_chars)] + ''.join(rng.choice(ID_ALPHABET) for _ in range(27))
+        docs.append(FakeDoc(f"{uid}_habit{i % 5}_{1714550400000 + i}", dict(template, streakAtTime=i % 40)))
+    return docs
+
+def test_id_range_shards_cover_ids_once():
+    """Test that id-range shards partition the id space with no gaps and no overlap"""
+    print("\n=== TEST: Id Range Shard Coverage ===")
+
+    docs = make_random_id_docs(400)
+    docs += [FakeDoc(c, make_docs(1)[0].to_dict()) for c in ID_ALPHABET]   # ids equal to a bound
+    all_ids = sorted(doc.id for doc in docs)
+
+    for shards in (1, 2, 3, 4, 7, 16, 61, 62, 100):
+        db = FakeFirestore(docs)
+        queries = id_range_shards(db, shards)
+        assert len(queries) == shards
+        seen = []
+        for query in queries:
+            shard_ids = [doc.id for page in paginate(query, ['__name__'], 37) for doc in page]
+            assert shard_ids == sorted(shard_ids)
+            seen.append(shard_ids)
+
+        merged = [doc_id for shard_ids in seen for doc_id in shard_ids]
+        assert sorted(merged) == all_ids, f"{shards} shards: every id exactly once"
+        # Shards are consecutive, non-overlapping ranges
+        non_empty = [ids for ids in seen if ids]
+        assert all(a[-1] < b[0] for a, b in zip(non_empty, non_empty[1:])), f"{shards} shards overlap"
+        assert queries[0].at is None and queries[-1].before is None, "Outer shards must be open-ended"
+        print(f"{shards} shards: sizes {[len(ids) for ids in seen][:8]}{'...' if shards > 8 else ''}")
+
+    print("✅ PASSED: Shards cover the id space exactly once")
+    return True
+
+def test_export_sharded_store():
+    """Test that a sharded export stores every document once with a merged manifest"""
+    print("\n=== TEST: Sharded Export ===")
+
+    docs = make_random_id_docs(300)
+    with tempfile.TemporaryDirectory() as tmp:
+        store_dir = os.path.join(tmp, 'training_store')
+        export_sharded(FakeFirestore(docs), workers=4, page_size=20, store_dir=store_dir)
+
+        stored = stored_doc_ids(store_dir)
+        assert sorted(stored) == sorted(d.id for d in docs), "Every document exactly once"
+        manifest = load_store_manifest(store_dir)
+        assert manifest['records'] == 300 and len(manifest['parts']) == len(set(manifest['parts']))
+        assert manifest['high_water_mark'] == max(d.to_dict()['completedAt'] for d in docs)
+        assert not os.path.exists(store_dir + '.staging')
+
+    print("✅ PASSED: Sharded export matches the collection")
+    return True
+
+def test_export_sharded_failing_shard():
+    """Test that an exception in one shard fails the run and leaves the published store untouched"""
+    print("\n=== TEST: Sharded Export Failing Shard ===")
+
+    docs = make_random_id_docs(300)
+    with tempfile.TemporaryDirectory() as tmp:
+        store_dir = os.path.join(tmp, 'training_store')
+        export_sharded(FakeFirestore(docs[:100]), workers=4, page_size=20, store_dir=store_dir)
+        before = sorted(stored_doc_ids(store_dir))
+
+        db = FakeFirestore(docs)
+        failing_shard = id_range_shards(db, 4)[2]
+        db.fail_query = lambda query: query.at == failing_shard.at and query.after is not None
+        output = io.StringIO()
+        with redirect_stdout(output):
+            expect_exit(export_sharded, db, workers=4, page_size=20, store_dir=store_dir)
+
+        message = f"simulated failure reading {failing_shard.at} - {failing_shard.before}"
+        assert f"❌ Error exporting data: {message}" in output.getvalue(), output.getvalue()
+        assert sorted(stored_doc_ids(store_dir)) == before, "A failed run must not publish"
+        assert load_store_manifest(store_dir)['records'] == 100
+
+    print("✅ PASSED: The failing shard's error is reported and nothing is published")
+    return True
+
+def run_all_tests():
+    """Run all tests"""
+    print("\n" + "="*60)
+    print("RUNNING FIRESTORE EXPORTER TEST SUITE")
+    print("="*60)
+
+    tests = [
+        test_multi_page_paging,
+        test_csv_resume_after_interruption,
+        test_restart_ignores_checkpoint,
+        test_snapshot_resume_after_interruption,
+        test_advance_mark_lookback,
+        test_delta_dedups_boundary_ids,
+        test_remove_orphan_parts,
+        test_id_range_shards_cover_ids_once,
+        test_export_sharded_store,
+        test_export_sharded_failing_shard,
+    ]
+
+    passed = 0
+    failed = 0
+
+    for test in tests:
+        try:
+            if test():
+                passed += 1
+        except AssertionError as e:
+            print(f"❌ FAILED: {e}")
+            failed += 1
+        except Exception as e:
+            print(f"❌ ERROR: {e}")
+            failed += 1
+
+    print("\n" + "="*60)
+    print(f"TEST RESULTS: {passed} passed, {failed} failed")
+    print("="*60)
+
+    return failed == 0
+
+if __name__ == "__main__":
+    success = run_all_tests()
+    sys.exit(0 if success else 1)
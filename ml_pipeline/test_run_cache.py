@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the training run cache
+Tests cache keys, save/restore round trips, pruning and cache hits in train_model
+"""
+
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+from run_cache import (
+    cache_key,
+    code_fingerprint,
+    data_fingerprint,
+    load_export,
+    load_run,
+    prune,
+    restore_files,
+    save_export,
+    save_run,
+)
+
+def write_file(path, content):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w') as f:
+        f.write(content)
+    return path
+
+def read_file(path):
+    with open(path) as f:
+        return f.read()
+
+# ==================== KEYS ====================
+
+def test_cache_key_stability():
+    """Test that keys depend only on content, not on dict order or the process"""
+    print("\n=== TEST: Cache Key Stability ===")
+
+    key = cache_key('abc', {'b': 2, 'a': [1, 'x']}, None)
+    # Pinned: a change here invalidates every cache entry on disk
+    assert key == '66579d850365f2709d3fd49f', key
+    assert cache_key('abc', {'a': [1, 'x'], 'b': 2}, None) == key, "Dict order must not matter"
+    assert cache_key('abc', {'a': [1, 'x'], 'b': 3}, None) != key
+    assert cache_key('abd', {'a': [1, 'x'], 'b': 2}, None) != key
+    assert cache_key({'a': [1, 'x'], 'b': 2}, 'abc', None) != key, "Part order matters"
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = os.path.join(tmp, 'store')
+        part = write_file(os.path.join(store, 'export_date=2024-05-01', 'part-1.csv'), 'a,b\n1,2\n')
+        write_file(os.path.join(store, '_manifest.json'), '{}')
+        first = data_fingerprint(store)
+        assert data_fingerprint(store) == first
+
+        # Files that are not parts (manifest, checkpoints) do not matter
+        write_file(os.path.join(store, '_manifest.json'), '{"records": 1}')
+        assert data_fingerprint(store) == first
+
+        # Content and part names do
+        write_file(part, 'a,b\n1,3\n')
+        assert data_fingerprint(store) != first
+        write_file(part, 'a,b\n1,2\n')
+        assert data_fingerprint(store) == first
+        os.rename(part, part.replace('part-1', 'part-2'))
+        assert data_fingerprint(store) != first
+
+        flat = write_file(os.path.join(tmp, 'data.csv'), 'a,b\n1,2\n')
+        assert data_fingerprint(flat) == data_fingerprint(write_file(os.path.join(tmp, 'copy.csv'), 'a,b\n1,2\n'))
+
+    assert code_fingerprint() == code_fingerprint()
+
+    print("✅ PASSED: Keys are stable and content-addressed")
+    return True
+
+# ==================== ENTRIES ====================
+
+def test_save_restore_round_trip():
+    """Test that runs and exports come back byte for byte with their metadata"""
+    print("\n=== TEST: Save/Restore Round Trip ===")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cache_dir = os.path.join(tmp, 'cache')
+        src = os.path.join(tmp, 'models')
+        baseline = write_file(os.path.join(src, 'baseline.joblib'), 'baseline')
+        keras_dir = os.path.join(src, 'keras_model.keras')
+        write_file(os.path.join(keras_dir, 'weights.bin'), 'weights')   # directory-format model
+
+        assert load_run('run1', cache_dir) is None
+        save_run('run1', [baseline, keras_dir], {'sklearn_accuracy': 0.8}, cache_dir)
+        metrics, models_dir = load_run('run1', cache_dir)
+        assert metrics['sklearn_accuracy'] == 0.8 and metrics['models'] == ['baseline.joblib', 'keras_model.keras']
+        assert 'created' in metrics
+
+        # Restoring overwrites what is at the destination
+        dest = os.path.join(tmp, 'restored')
+        write_file(os.path.join(dest, 'baseline.joblib'), 'old')
+        write_file(os.path.join(dest, 'keras_model.keras', 'stale.bin'), 'old')
+        restored = restore_files(models_dir, metrics['models'], dest)
+        assert restored == [os.path.join(dest, 'baseline.joblib'), os.path.join(dest, 'keras_model.keras')]
+        assert read_file(restored[0]) == 'baseline'
+        assert os.listdir(restored[1]) == ['weights.bin']
+
+        # Cached entries are copies: later changes to the sources do not reach them
+        write_file(baseline, 'retrained')
+        assert read_file(os.path.join(models_dir, 'baseline.joblib')) == 'baseline'
+
+        # Exports live under their run
+        assets = os.path.join(tmp, 'assets')
+        exported = [write_file(os.path.join(assets, 'logistic_model.json'), '{"w": 1}')]
+        assert load_export('run1', 'exp1', cache_dir) is None
+        save_export('run1', 'exp1', exported, {'shipped': 'logistic', 'size_mb': None}, cache_dir)
+        meta, export_dir = load_export('run1', 'exp1', cache_dir)
+        assert meta == {'shipped': 'logistic', 'size_mb': None, 'files': ['logistic_model.json']}
+        assert read_file(os.path.join(export_dir, 'logistic_model.json')) == '{"w": 1}'
+
+        # An export of a run that is not cached (pruned meanwhile) is not stored
+        save_export('gone', 'exp1', exported, {'shipped': 'logistic', 'size_mb': None}, cache_dir)
+        assert load_export('gone', 'exp1', cache_dir) is None
+        assert not any(name.startswith('.') for name in os.listdir(cache_dir)), "Staging dirs must not remain"
+
+    print("✅ PASSED: Runs and exports round-trip")
+    return True
+
+def test_prune_least_recently_used():
+    """Test that pruning keeps the most recently used entries and ignores staging dirs"""
+    print("\n=== TEST: Prune ===")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cache_dir = os.path.join(tmp, 'cache')
+        model = write_file(os.path.join(tmp, 'baseline.joblib'), 'm')
+        now = time.time()
+        for i in range(5):
+            save_run(f'run{i}', [model], {}, cache_dir)
+            os.utime(os.path.join(cache_dir, f'run{i}'), (now - 100 + i, now - 100 + i))
+        staging = os.path.join(cache_dir, '.run-inprogress')
+        os.makedirs(staging)
+        os.utime(staging, (now - 1000, now - 1000))
+
+        # Using the oldest entry makes it the most recent
+        assert load_run('run0', cache_dir) is not None
+        prune(cache_dir, max_entries=3)
+
+        assert sorted(os.listdir(cache_dir)) == ['.run-inprogress', 'run0', 'run3', 'run4']
+        assert load_run('run1', cache_dir) is None and load_run('run2', cache_dir) is None
+
+        prune(cache_dir, max_entries=0)
+        assert os.listdir(cache_dir) == ['.run-inprogress']
+
+    print("✅ PASSED: Least recently used entries are pruned")
+    return True
+
+# ==================== TRAIN_MODEL INTEGRATION ====================
+
+def test_restore_cached_run_hit_and_miss():
+    """Test cache misses, export hits and misses, and that a hit replaces every saved model"""
+    print("\n=== TEST: restore_cached_run Hit/Miss ===")
+    import numpy as np
+    import run_cache
+    import train_model
+    from sklearn.linear_model import LogisticRegression
+    from sklearn.preprocessing import StandardScaler
+    from train_model import build_parser, restore_cached_run, save_baseline
+
+    parser, _ = build_parser()
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(100, 5))
+    y = (X[:, 0] > 0).astype(int)
+    scaler = StandardScaler().fit(X)
+    model = LogisticRegression().fit(scaler.transform(X), y)
+
+    dirs = train_model.MODELS_DIR, train_model.ASSETS_DIR, run_cache.CACHE_DIR
+    with tempfile.TemporaryDirectory() as tmp:
+        train_model.MODELS_DIR = os.path.join(tmp, 'models')
+        train_model.ASSETS_DIR = os.path.join(tmp, 'assets')
+        run_cache.CACHE_DIR = os.path.join(tmp, 'cache')
+        try:
+            args = parser.parse_args(['train', '--export', 'logistic'])
+            assert restore_cached_run(args, 'nokey', 'noexport') is False, "Miss must train"
+
+            # A logistic-only run is cached...
+            save_baseline(model, scaler, 0.8)
+            baseline = os.path.join(train_model.MODELS_DIR, 'baseline.joblib')
+            save_run('run1', [baseline], {'sklearn_accuracy': 0.8, 'keras_accuracy': None})
+
+            # ...and a later Keras run leaves its models behind
+            stale = [write_file(os.path.join(train_model.MODELS_DIR, name), 'stale')
+                     for name in ('keras_model.keras', 'keras.joblib')]
+
+            # Export miss: the restored models are exported and the export is cached
+            assert restore_cached_run(args, 'run1', 'exp1') is True
+            assert os.listdir(train_model.MODELS_DIR) == ['baseline.joblib'], "Stale Keras files must go"
+            logistic = train_model.logistic_export_path()
+            with open(logistic) as f:
+                assert len(json.load(f)['features']) == 5
+            meta, _ = load_export('run1', 'exp1')
+            assert meta['shipped'] == 'logistic' and meta['files'] == ['logistic_model.json']
+
+            # Export hit: files come from the cache, stale models are cleared again
+            os.remove(logistic)
+            for path in stale:
+                write_file(path, 'stale')
+            assert restore_cached_run(args, 'run1', 'exp1') is True
+            assert os.listdir(train_model.MODELS_DIR) == ['baseline.joblib']
+            assert os.path.exists(logistic)
+        finally:
+            train_model.MODELS_DIR, train_model.ASSETS_DIR, run_cache.CACHE_DIR = dirs
+
+    print("✅ PASSED: Cache hits restore exactly the cached run")
+    return True
+
+def run_all_tests():
+    """Run all tests"""
+    print("\n" + "="*60)
+    print("RUNNING RUN CACHE TEST SUITE")
+    print("="*60)
+
+    tests = [
+        test_cache_key_stability,
+        test_save_restore_round_trip,
+        test_prune_least_recently_used,
+        test_restore_cached_run_hit_and_miss,
+    ]
+
+    passed = 0
+    failed = 0
+
+    for test in tests:
+        try:
+            if test():
+                passed += 1
+        except AssertionError as e:
+            print(f"❌ FAILED: {e}")
+            failed += 1
+        except Exception as e:
+            print(f"❌ ERROR: {e}")
+            failed += 1
+
+    print("\n" + "="*60)
+    print(f"TEST RESULTS: {passed} passed, {failed} failed")
+    print("="*60)
+
+    return failed == 0
+
+if __name__ == "__main__":
+    success = run_all_tests()
+    sys.exit(0 if success else 1)
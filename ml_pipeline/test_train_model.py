@@ -0,0 +1,422 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the training pipeline
+Tests data splits, model folding and export selection without touching ../assets
+"""
+
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+import numpy as np
+import pandas as pd
+
+from training_store import FEATURES, LABEL, write_part
+
+def write_numbered_rows(path, n, seed=0):
+    """Valid rows whose streakAtTime is the row number, so split membership can be traced"""
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        'hourOfDay': rng.integers(0, 24, n),
+        'dayOfWeek': rng.integers(1, 8, n),
+        'streakAtTime': np.arange(n),
+        'failuresLast7Days': rng.integers(0, 8, n),
+        'hoursFromReminder': rng.normal(0, 2, n),
+        LABEL: rng.random(n) < 0.3,
+    })
+    write_part(df, path)
+    return df
+
+# ==================== SPLITS ====================
+
+def test_iter_split_deterministic_and_disjoint():
+    """Test that iter_split yields the same disjoint train/test split on every pass and chunking"""
+    print("\n=== TEST: iter_split Determinism ===")
+    from train_model import TEST_SIZE, iter_split, split_sizes
+
+    n = 5000
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'data.parquet')
+        data = write_numbered_rows(path, n)
+
+        def rows(split, chunk_rows=512, seed=42):
+            chunks = list(iter_split(path, split, chunk_rows, seed=seed))
+            X = np.concatenate([X for X, _ in chunks])
+            y = np.concatenate([y for _, y in chunks])
+            return X, y
+
+        X_train, y_train = rows('train')
+        X_test, y_test = rows('test')
+        train_ids = X_train[:, FEATURES.index('streakAtTime')].astype(int)
+        test_ids = X_test[:, FEATURES.index('streakAtTime')].astype(int)
+
+        assert not set(train_ids) & set(test_ids), "Train and test must not share rows"
+        assert sorted(np.concatenate([train_ids, test_ids])) == list(range(n)), "Every row in one split"
+        assert abs(len(test_ids) / n - TEST_SIZE) < 0.03, f"Test share {len(test_ids) / n:.3f}"
+        assert (y_test == data[LABEL].to_numpy(dtype=int)[test_ids]).all(), "Labels stay with their rows"
+
+        # Repeated passes, any chunk size: identical split
+        for chunk_rows in (512, 7, 1000, n):
+            X_again, y_again = rows('test', chunk_rows)
+            assert np.array_equal(X_again, X_test) and np.array_equal(y_again, y_test), f"chunk_rows={chunk_rows}"
+        assert np.array_equal(rows('train', 333)[0], X_train)
+        assert split_sizes(path, 100) == (len(train_ids), len(test_ids))
+
+        # Another seed is another (still disjoint) split
+        other_test = rows('test', seed=7)[0][:, FEATURES.index('streakAtTime')].astype(int)
+        assert set(other_test) != set(test_ids)
+        assert not set(other_test) & set(rows('train', seed=7)[0][:, FEATURES.index('streakAtTime')].astype(int))
+
+    print(f"✅ PASSED: {len(train_ids)} train / {len(test_ids)} test rows, identical on every pass")
+    return True
+
+def test_in_memory_split_matches_streaming():
+    """Test that the loaded and the streamed trainer hold out the same rows"""
+    print("\n=== TEST: Shared Train/Test Split ===")
+    from train_model import iter_split, load_training_data, sample_split, split_arrays
+
+    def streamed(path, split):
+        chunks = list(iter_split(path, split, 97))
+        return np.concatenate([X for X, _ in chunks]), np.concatenate([y for _, y in chunks])
+
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_path = os.path.join(tmp, 'training_data.csv')
+        write_numbered_rows(csv_path, 3000)
+
+        # A store whose third part re-exports documents of the first (read_dataset keeps the last copy)
+        store_dir = os.path.join(tmp, 'training_store')
+        os.makedirs(os.path.join(store_dir, 'export_date=2024-05-01'))
+        for i in range(3):
+            part = os.path.join(store_dir, 'export_date=2024-05-01', f'part-{i}.parquet')
+            df = write_numbered_rows(part, 1000, seed=i).assign(streakAtTime=np.arange(1000) + 1000 * i)
+            df.insert(0, 'docId', [f'doc{(j if i == 2 and j < 50 else 1000 * i + j)}' for j in range(1000)])
+            write_part(df, part)
+
+        for path, n in ((csv_path, 3000), (store_dir, 2950)):
+            X, y, _ = load_training_data(path)
+            assert len(y) == n
+            X_train, X_test, y_train, y_test = split_arrays(X, y)
+            for split, (X_mem, y_mem) in (('train', (X_train, y_train)), ('test', (X_test, y_test))):
+                X_stream, y_stream = streamed(path, split)
+                assert np.array_equal(X_mem, X_stream) and np.array_equal(y_mem, y_stream), f"{path}: {split} differs"
+
+            # The benchmark's held-out sample comes from the trainer's test rows
+            sample, _ = sample_split(path, 'test', 200, 97)
+            test_rows = {tuple(row) for row in X_test}
+            assert len(sample) == 200 and all(tuple(row) in test_rows for row in sample)
+            print(f"{os.path.basename(path)}: {len(X_train)} train / {len(X_test)} test rows on both paths")
+
+    print("✅ PASSED: One split for loaded and streamed training")
+    return True
+
+def test_single_class_test_split():
+    """Test that a small, imbalanced export whose test split holds one class still trains and reports"""
+    print("\n=== TEST: Single-Class Test Split ===")
+    from train_model import split_arrays, train_sklearn_model
+
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(40, len(FEATURES)))
+    y = np.zeros(40, dtype=int)
+    X_train, X_test, y_train, y_test = split_arrays(X, y)
+    y_train[:3] = 1   # the few abandoned records all landed in the train split
+    assert len(set(y_test)) == 1 and len(set(y_train)) == 2
+
+    _, _, accuracy = train_sklearn_model(X_train, X_test, y_train, y_test)
+    assert 0 <= accuracy <= 1
+
+    print(f"✅ PASSED: {len(y_test)} test rows of one class evaluate")
+    return True
+
+def test_make_dataset_reshuffles_rows():
+    """Test that each epoch of the in-memory pipeline batches a new permutation of every row"""
+    print("\n=== TEST: make_dataset Row Shuffle ===")
+    from train_model import make_dataset
+
+    n, batch_size = 200, 16
+    X = np.arange(n, dtype=np.float64).reshape(-1, 1)
+    y = np.arange(n) % 2
+
+    def epochs(ds, count):
+        it = iter(ds.repeat(count))
+        batches_per_epoch = -(-n // batch_size)
+        return [[frozenset(next(it)[0].numpy()[:, 0].astype(int)) for _ in range(batches_per_epoch)]
+                for _ in range(count)]
+
+    first, second = epochs(make_dataset(X, y, batch_size, shuffle=True), 2)
+    for batches in (first, second):
+        assert sorted(row for batch in batches for row in batch) == list(range(n)), "Every row once per epoch"
+    assert set(first) != set(second), "Batch compositions must change between epochs"
+    assert set(first) != set(epochs(make_dataset(X, y, batch_size), 1)[0]), "Rows must be shuffled"
+
+    # Labels stay with their rows, and without shuffle the order is kept
+    features, labels = next(iter(make_dataset(X, y, batch_size, shuffle=True)))
+    assert (labels.numpy() == features.numpy()[:, 0] % 2).all()
+    in_order = np.concatenate([f.numpy()[:, 0] for f, _ in make_dataset(X, y, batch_size)])
+    assert (in_order == np.arange(n)).all()
+
+    print("✅ PASSED: Rows are reshuffled before batching each epoch")
+    return True
+
+# ==================== SWEEP ====================
+
+def sweep_result(name, accuracy, recall, p50_us=10.0, size_bytes=4000):
+    return {'hidden': name, 'accuracy': accuracy, 'recall': recall, 'p50_us': p50_us, 'size_bytes': size_bytes}
+
+def test_rank_candidates():
+    """Test that ranking puts recall (capped at the target) first and the objective second"""
+    print("\n=== TEST: Rank Candidates ===")
+    from train_model import rank_candidates
+
+    # Some candidates reach the target: they lead, ordered by objective
+    ranked = rank_candidates([
+        sweep_result('majority', 0.82, 0.05),
+        sweep_result('big', 0.78, 0.90, p50_us=40.0, size_bytes=16000),   # 2 doublings each: -0.04
+        sweep_result('small', 0.76, 0.72),
+        sweep_result('close', 0.79, 0.69),
+    ], recall_target=0.7)
+    assert [r['hidden'] for r in ranked] == ['small', 'big', 'close', 'majority']
+    assert [r['meets_recall'] for r in ranked] == [True, True, False, False]
+    assert abs(ranked[1]['objective'] - (0.78 - 0.04)) < 1e-12
+
+    # None reaches it: highest recall wins, not the near-majority-class model
+    ranked = rank_candidates([
+        sweep_result('majority', 0.81, 0.02),
+        sweep_result('weighted', 0.70, 0.55),
+        sweep_result('middle', 0.77, 0.30),
+        sweep_result('weighted_slow', 0.74, 0.55, p50_us=20.0),   # same recall: objective decides
+    ], recall_target=0.7)
+    assert [r['hidden'] for r in ranked] == ['weighted_slow', 'weighted', 'middle', 'majority']
+    assert not any(r['meets_recall'] for r in ranked)
+
+    print("✅ PASSED: Recall shortfall ranks before the objective")
+    return True
+
+# ==================== EXPORT ====================
+
+def test_fold_scaler_matches_scaler_transform():
+    """Test that folding the scaler into the first Dense layer preserves the model's outputs"""
+    print("\n=== TEST: Fold Scaler ===")
+    from sklearn.preprocessing import StandardScaler
+    from train_model import build_network, fold_scaler, load_tensorflow
+    tf, keras = load_tensorflow()
+    keras.utils.set_random_seed(0)
+
+    rng = np.random.default_rng(0)
+    X = np.column_stack([
+        rng.integers(0, 24, 2000),
+        rng.integers(1, 8, 2000),
+        rng.integers(0, 400, 2000),
+        np.full(2000, 3),              # constant column: sklearn uses scale 1
+        rng.normal(-1, 6, 2000),
+    ]).astype(np.float64)
+    scaler = StandardScaler().fit(X[:1500])
+    X_new = X[1500:]
+
+    for hidden in ((16, 8), ()):
+        model = build_network(X.shape[1], hidden)
+        weights = [w.copy() for w in model.get_weights()]
+        folded = fold_scaler(model, scaler)
+
+        # The first Dense layer: raw input through the folded weights == scaled input through the original
+        kernel, bias = weights[0], weights[1]
+        folded_kernel, folded_bias = folded.get_weights()[:2]
+        expected = scaler.transform(X_new) @ kernel.astype(np.float64) + bias
+        actual = X_new @ folded_kernel.astype(np.float64) + folded_bias
+        assert np.max(np.abs(actual - expected)) < 1e-4, "Folded Dense layer must reproduce the scaled one"
+
+        # End to end, in float32 as exported
+        original = model(scaler.transform(X_new).astype(np.float32), training=False).numpy()
+        raw = folded(X_new.astype(np.float32), training=False).numpy()
+        max_diff = float(np.max(np.abs(raw - original)))
+        assert max_diff < 1e-6, f"hidden={hidden}: outputs differ by {max_diff:.2e}"
+
+        assert all(np.array_equal(a, b) for a, b in zip(model.get_weights(), weights)), "Original must be untouched"
+        assert all(np.array_equal(a, b) for a, b in zip(folded.get_weights()[2:], weights[2:])), \
+            "Only the first Dense layer changes"
+        print(f"hidden={hidden}: max |diff| {max_diff:.2e}")
+
+    print("✅ PASSED: fold_scaler matches scaler.transform + Dense")
+    return True
+
+def small_models(n=600, seed=0):
+    """(sklearn model, scaler, accuracy, keras model, split) on random data, for export tests"""
+    from train_model import build_network, train_sklearn_model
+    rng = np.random.default_rng(seed)
+    X = np.column_stack([rng.integers(0, 24, n), rng.integers(1, 8, n), rng.integers(0, 60, n),
+                         rng.integers(0, 8, n), rng.normal(0, 2, n)]).astype(np.float64)
+    y = (X[:, 3] + rng.normal(0, 2, n) > 4).astype(int)
+    split = (X[:480], X[480:], y[:480], y[480:])
+    sklearn_model, scaler, accuracy = train_sklearn_model(*split)
+    return sklearn_model, scaler, accuracy, build_network(X.shape[1]), split
+
+def test_reexport_removes_stale_int8():
+    """Test that exporting without --int8 removes the int8 model of an earlier --int8 export"""
+    print("\n=== TEST: Stale int8 Export ===")
+    import train_model
+    from train_model import build_parser, export_models, int8_export_path, remove_stale_exports
+
+    parser, _ = build_parser()
+    sklearn_model, scaler, accuracy, keras_model, split = small_models()
+    assets_dir = train_model.ASSETS_DIR
+    with tempfile.TemporaryDirectory() as tmp:
+        train_model.ASSETS_DIR = tmp
+        try:
+            args = parser.parse_args(['export', '--export', 'tflite', '--int8'])
+            _, files, _ = export_models(args, sklearn_model, scaler, accuracy, keras_model, scaler, 0.9, split)
+            assert int8_export_path() in files and os.path.exists(int8_export_path())
+
+            for argv in (['export', '--export', 'tflite'], ['export', '--export', 'logistic', '--int8']):
+                open(int8_export_path(), 'wb').close()
+                args = parser.parse_args(argv)
+                _, files, _ = export_models(args, sklearn_model, scaler, accuracy, keras_model, scaler, 0.9, split)
+                assert not os.path.exists(int8_export_path()), f"{argv}: stale int8 model left behind"
+                assert all(os.path.exists(f) for f in files)
+
+            # Exports restored from the run cache replay the same deletion
+            for argv, kept in ((['export'], False), (['export', '--int8'], True),
+                               (['export', '--export', 'logistic'], False)):
+                open(int8_export_path(), 'wb').close()
+                remove_stale_exports(parser.parse_args(argv), 'tflite')
+                assert os.path.exists(int8_export_path()) == kept, argv
+
+            # Older app builds always load scaler_params.json: no export or replay removes it
+            assert os.path.exists(os.path.join(tmp, 'scaler_params.json'))
+        finally:
+            train_model.ASSETS_DIR = assets_dir
+
+    print("✅ PASSED: predictor_int8.tflite only survives --int8 exports")
+    return True
+
+def pubspec_assets():
+    """Asset entries of the app's pubspec.yaml (directories end with '/')"""
+    import re
+    with open(os.path.join(os.path.dirname(__file__), '..', 'pubspec.yaml')) as f:
+        return re.findall(r'^\s+- (assets/\S+)\s*$', f.read(), re.MULTILINE)
+
+def test_export_files_declared_in_pubspec():
+    """Test that every file the export stage writes is bundled by a pubspec asset entry"""
+    print("\n=== TEST: Export Files in pubspec.yaml ===")
+    import train_model
+    from train_model import build_parser, export_models
+
+    entries = pubspec_assets()
+    repo_dir = os.path.join(os.path.dirname(__file__), '..')
+    assets_dir = os.path.relpath(train_model.ASSETS_DIR, repo_dir).replace(os.sep, '/')
+
+    def declared(name):
+        # Flutter bundles a listed file, or the files directly inside a listed directory
+        path = f"{assets_dir}/{name}"
+        return path in entries or f"{assets_dir}/" in entries
+
+    parser, _ = build_parser()
+    sklearn_model, scaler, accuracy, keras_model, split = small_models()
+    original_assets_dir = train_model.ASSETS_DIR
+    with tempfile.TemporaryDirectory() as tmp:
+        train_model.ASSETS_DIR = tmp
+        try:
+            written = set()
+            for argv in (['export', '--export', 'logistic'], ['export', '--export', 'tflite', '--int8'],
+                         ['export', '--export', 'tflite', '--no-fold-scaler']):
+                _, files, _ = export_models(parser.parse_args(argv), sklearn_model, scaler, accuracy,
+                                            keras_model, scaler, 0.9, split)
+                written.update(os.path.relpath(path, tmp) for path in files)
+        finally:
+            train_model.ASSETS_DIR = original_assets_dir
+
+    assert {'logistic_model.json', 'predictor.tflite', 'predictor_int8.tflite', 'scaler_params.json'} <= written
+    missing = sorted(name for name in written if not declared(name))
+    assert not missing, f"Not in pubspec.yaml assets: {missing}"
+
+    print(f"✅ PASSED: {sorted(written)} are bundled by {assets_dir}/")
+    return True
+
+def test_refuse_unsupported_feature_set():
+    """Test that models of a feature set the app cannot feed are not exported without --allow-feature-set"""
+    print("\n=== TEST: Unsupported Feature Set Export ===")
+    import io
+    import json
+    from contextlib import redirect_stderr
+    from sklearn.linear_model import LogisticRegression
+    from sklearn.preprocessing import StandardScaler
+    import train_model
+    from train_model import build_parser, export_saved_models, feature_columns, main, save_baseline
+
+    # train refuses before loading any data
+    stderr = io.StringIO()
+    try:
+        with redirect_stderr(stderr):
+            main(['train', '--feature-set', 'v2', '--data', '/nonexistent'])
+        assert False, "train --feature-set v2 should be refused"
+    except SystemExit as e:
+        assert e.code == 2 and '--allow-feature-set' in stderr.getvalue(), stderr.getvalue()
+
+    parser, _ = build_parser()
+    n_features = len(feature_columns('v2'))
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(200, n_features))
+    y = (X[:, 0] > 0).astype(int)
+    scaler = StandardScaler().fit(X)
+    model = LogisticRegression().fit(scaler.transform(X), y)
+
+    dirs = train_model.MODELS_DIR, train_model.ASSETS_DIR
+    with tempfile.TemporaryDirectory() as tmp:
+        train_model.MODELS_DIR = os.path.join(tmp, 'models')
+        train_model.ASSETS_DIR = os.path.join(tmp, 'assets')
+        try:
+            save_baseline(model, scaler, 0.9, 'v2')
+            assert export_saved_models(parser.parse_args(['export', '--export', 'logistic'])) is None
+            assert not os.path.exists(train_model.ASSETS_DIR), "Nothing may reach the app assets"
+
+            result = export_saved_models(parser.parse_args(['export', '--export', 'logistic', '--allow-feature-set']))
+            assert result is not None and result[2] == 'logistic'
+            with open(train_model.logistic_export_path()) as f:
+                assert len(json.load(f)['features']) == n_features
+        finally:
+            train_model.MODELS_DIR, train_model.ASSETS_DIR = dirs
+
+    print("✅ PASSED: Non-v1 exports need --allow-feature-set")
+    return True
+
+def run_all_tests():
+    """Run all tests"""
+    print("\n" + "="*60)
+    print("RUNNING TRAINING PIPELINE TEST SUITE")
+    print("="*60)
+
+    tests = [
+        test_iter_split_deterministic_and_disjoint,
+        test_in_memory_split_matches_streaming,
+        test_single_class_test_split,
+        test_make_dataset_reshuffles_rows,
+        test_rank_candidates,
+        test_fold_scaler_matches_scaler_transform,
+        test_reexport_removes_stale_int8,
+        test_export_files_declared_in_pubspec,
+        test_refuse_unsupported_feature_set,
+    ]
+
+    passed = 0
+    failed = 0
+
+    for test in tests:
+        try:
+            if test():
+                passed += 1
+        except AssertionError as e:
+            print(f"❌ FAILED: {e}")
+            failed += 1
+        except Exception as e:
+            print(f"❌ ERROR: {e}")
+            failed += 1
+
+    print("\n" + "="*60)
+    print(f"TEST RESULTS: {passed} passed, {failed} failed")
+    print("="*60)
+
+    return failed == 0
+
+if __name__ == "__main__":
+    success = run_all_tests()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the columnar training store
+Tests page validation and the store readers
+"""
+
+import os
+import sys
+import tempfile
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+import numpy as np
+import pandas as pd
+
+from training_store import (
+    FEATURES,
+    ID_COLUMN,
+    LABEL,
+    VALID_RANGES,
+    iter_batches,
+    list_parts,
+    read_dataset,
+    validate_page,
+)
+
+def valid_columns(n):
+    """n rows of in-range raw feature columns"""
+    return {
+        'hourOfDay': np.full(n, 9.0),
+        'dayOfWeek': np.full(n, 3.0),
+        'streakAtTime': np.full(n, 4.0),
+        'failuresLast7Days': np.full(n, 1.0),
+        'hoursFromReminder': np.full(n, 0.5),
+    }
+
+# ==================== VALIDATION ====================
+
+def test_validate_page_range_bounds():
+    """Test that every range bound is inclusive and values just outside it are rejected"""
+    print("\n=== TEST: Validation Range Bounds ===")
+
+    cases = {
+        'dayOfWeek': ([1, 7], [0, 8]),
+        'hourOfDay': ([0, 23], [-1, 24]),
+        'streakAtTime': ([0, 5000], [-1]),
+        'failuresLast7Days': ([0, 7], [-1]),
+    }
+    assert set(cases) == set(VALID_RANGES), "Every validated feature needs a case"
+
+    for feature, (inside, outside) in cases.items():
+        values = inside + outside
+        columns = valid_columns(len(values))
+        columns[feature] = np.array(values, dtype=np.float64)
+        keep, rejected = validate_page(columns)
+        assert keep.tolist() == [True] * len(inside) + [False] * len(outside), f"{feature}: {keep}"
+        assert rejected == {f'{feature}_out_of_range': len(outside)}, f"{feature}: {rejected}"
+        print(f"{feature}: kept {inside}, rejected {outside}")
+
+    # hoursFromReminder is unbounded (negative means before the reminder)
+    columns = valid_columns(2)
+    columns['hoursFromReminder'] = np.array([-30.0, 500.0])
+    keep, rejected = validate_page(columns)
+    assert keep.all() and rejected == {}
+
+    print("✅ PASSED: Range bounds are inclusive")
+    return True
+
+def test_validate_page_reject_reasons():
+    """Test that a rejected row is counted once, under its first failing rule"""
+    print("\n=== TEST: Validation Reject Reasons ===")
+
+    columns = valid_columns(6)
+    columns['hourOfDay'][0] = np.nan                                # missing
+    columns['hourOfDay'][1] = np.nan; columns['dayOfWeek'][1] = 0   # missing wins over range
+    columns['dayOfWeek'][2] = 8; columns['hourOfDay'][2] = 24       # hourOfDay is checked first
+    columns['streakAtTime'][3] = np.nan
+    columns['failuresLast7Days'][4] = -2
+    keep, rejected = validate_page(columns)
+
+    assert keep.tolist() == [False, False, False, False, False, True]
+    assert rejected == {
+        'missing_hourOfDay': 2,
+        'hourOfDay_out_of_range': 1,
+        'missing_streakAtTime': 1,
+        'failuresLast7Days_out_of_range': 1,
+    }, rejected
+    assert sum(rejected.values()) == (~keep).sum()
+
+    print("✅ PASSED: Each rejected row has exactly one reason")
+    return True
+
+def test_page_to_frame_malformed_fields():
+    """Test non-numeric, missing and null fields and labels in raw documents"""
+    print("\n=== TEST: Malformed Fields ===")
+    from export_firestore_data import page_to_frame
+    from test_export_firestore_data import FakeDoc
+
+    base = {'hourOfDay': 9, 'dayOfWeek': 3, 'streakAtTime': 4, 'failuresLast7Days': 1,
+            'hoursFromReminder': 0.5, 'completed': True}
+    without = lambda field: {k: v for k, v in base.items() if k != field}
+    docs = [
+        FakeDoc('hour_text', dict(base, hourOfDay='nine')),   # non-numeric
+        FakeDoc('hour_null', dict(base, hourOfDay=None)),
+        FakeDoc('hour_str_num', dict(base, hourOfDay='21')),  # numeric string is coerced
+        FakeDoc('no_dow', without('dayOfWeek')),
+        FakeDoc('dow_zero', dict(base, dayOfWeek=0)),
+        FakeDoc('no_label', without('completed')),            # absent flag counts as completed
+        FakeDoc('null_label', dict(base, completed=None)),    # falsy flag counts as abandoned
+        FakeDoc('abandoned', dict(base, completed=False)),
+    ]
+    df, rejected = page_to_frame(docs, keep_ids=True)
+
+    assert rejected == {'missing_hourOfDay': 2, 'missing_dayOfWeek': 1, 'dayOfWeek_out_of_range': 1}, rejected
+    assert df['docId'].tolist() == ['hour_str_num', 'no_label', 'null_label', 'abandoned']
+    assert df['hourOfDay'].tolist() == [21.0, 9.0, 9.0, 9.0]
+    assert df['abandoned'].tolist() == [False, False, True, True]
+
+    print("✅ PASSED: Malformed fields are rejected with the right reason")
+    return True
+
+def test_validate_data_missing_values():
+    """Test that validate_data reports rows with a missing label or feature instead of crashing"""
+    print("\n=== TEST: validate_data Missing Values ===")
+    from train_model import validate_data
+
+    rows = [f"{h % 24},{h % 7 + 1},{h},{h % 8},0.5,{h % 3 == 0}" for h in range(60)]
+    header = ','.join(FEATURES + [LABEL])
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'training_data.csv')
+        for broken, ok in (
+            (None, True),
+            ("1,2,3,4,0.5,", False),     # missing label
+            (",2,3,4,0.5,True", False),  # missing hour
+            ("1,8,3,4,0.5,True", False),  # dayOfWeek out of range
+        ):
+            with open(path, 'w') as f:
+                f.write('\n'.join([header] + rows + ([broken] if broken else [])) + '\n')
+            assert validate_data(path) is ok, f"validate_data should return {ok} for {broken!r}"
+
+        assert read_dataset(path)[LABEL].dtype == bool
+
+        # Missing values survive the typed reads as nulls
+        with open(path, 'w') as f:
+            f.write('\n'.join([header] + rows + ["1,2,3,4,0.5,", ",2,3,4,0.5,True"]) + '\n')
+        df = read_dataset(path)
+        assert df[LABEL].isna().sum() == 1 and df['hourOfDay'].isna().sum() == 1
+        assert df[LABEL].dtype == 'boolean' and df['hourOfDay'].dtype == 'UInt8'
+
+    print("✅ PASSED: validate_data flags missing values")
+    return True
+
+# ==================== READERS ====================
+
+def test_iter_batches_dedups_like_read_dataset():
+    """Test that streaming a store yields the same deduplicated rows as read_dataset"""
+    print("\n=== TEST: iter_batches Dedup ===")
+    from export_firestore_data import export_delta
+    from test_export_firestore_data import FakeDoc, FakeFirestore, make_docs
+
+    docs = make_docs(40)
+    with tempfile.TemporaryDirectory() as tmp:
+        store_dir = os.path.join(tmp, 'training_store')
+        export_delta(FakeFirestore(docs), page_size=8, store_dir=store_dir)
+
+        # Days later, with the mark well past it, an old record is edited:
+        # the lookback query sees it again and the delta stores a second copy
+        mark = datetime.fromisoformat(docs[-1].to_dict()['completedAt'])
+        later = [FakeDoc(f'uD_habit0_{i}', dict(docs[0].to_dict(), completedAt=(mark + timedelta(days=3 + i)).isoformat()))
+                 for i in range(3)]
+        export_delta(FakeFirestore(docs + later), page_size=8, store_dir=store_dir)
+        edited = dict(docs[5].to_dict(), completedAt=(mark + timedelta(days=6)).isoformat(), streakAtTime=99)
+        docs[5] = FakeDoc(docs[5].id, edited)
+        export_delta(FakeFirestore(docs + later), page_size=8, store_dir=store_dir)
+
+        raw = pd.concat([read_dataset(part) for part in list_parts(store_dir)], ignore_index=True)
+        assert raw[ID_COLUMN].duplicated().sum() == 1, "Scenario must store one document twice"
+
+        expected = read_dataset(store_dir).set_index(ID_COLUMN).sort_index()
+        assert len(expected) == 43 and expected.loc[docs[5].id, 'streakAtTime'] == 99
+
+        for batch_rows in (3, 8, 1000):
+            streamed = pd.concat(list(iter_batches(store_dir, batch_rows=batch_rows)), ignore_index=True)
+            assert all(len(batch) <= batch_rows for batch in iter_batches(store_dir, batch_rows=batch_rows))
+            streamed = streamed.set_index(ID_COLUMN).sort_index()
+            pd.testing.assert_frame_equal(streamed[expected.columns], expected)
+
+            # Projections without the id column drop the same rows
+            projected = pd.concat(list(iter_batches(store_dir, FEATURES + [LABEL], batch_rows)))
+            assert len(projected) == 43 and list(projected.columns) == FEATURES + [LABEL]
+            assert (projected['streakAtTime'] == 99).sum() == (expected['streakAtTime'] == 99).sum()
+
+        # A single part file is streamed as-is
+        part = list_parts(store_dir)[0]
+        assert len(pd.concat(list(iter_batches(part, batch_rows=3)))) == len(read_dataset(part))
+
+    print("✅ PASSED: iter_batches keeps the last copy of each doc id")
+    return True
+
+def run_all_tests():
+    """Run all tests"""
+    print("\n" + "="*60)
+    print("RUNNING TRAINING STORE TEST SUITE")
+    print("="*60)
+
+    tests = [
+        test_validate_page_range_bounds,
+        test_validate_page_reject_reasons,
+        test_page_to_frame_malformed_fields,
+        test_validate_data_missing_values,
+        test_iter_batches_dedups_like_read_dataset,
+    ]
+
+    passed = 0
+    failed = 0
+
+    for test in tests:
+        try:
+            if test():
+                passed += 1
+        except AssertionError as e:
+            print(f"❌ FAILED: {e}")
+            failed += 1
+        except Exception as e:
+            print(f"❌ ERROR: {e}")
+            failed += 1
+
+    print("\n" + "="*60)
+    print(f"TEST RESULTS: {passed} passed, {failed} failed")
+    print("="*60)
+
+    return failed == 0
+
+if __name__ == "__main__":
+    success = run_all_tests()
+    sys.exit(0 if success else 1)
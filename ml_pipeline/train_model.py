@@ -3,52 +3,127 @@
 Train ML model for habit abandonment prediction.
 
 This script:
-1. Loads training data from CSV
+1. Loads training data from the columnar store (or a legacy CSV)
 2. Trains LogisticRegression model with StandardScaler
 3. Converts to equivalent Keras model
-4. Exports to TFLite format for mobile deployment
-5. Saves scaler parameters for inference normalization
+4. Exports to TFLite format for mobile deployment (optionally also full-integer int8)
+5. Saves scaler parameters (and the feature set the model was trained on) for inference
 
 Usage:
-    python train_model.py
+    python train_model.py [train] [--data data/training_store | data/training_data.csv]
+    python train_model.py --feature-set v2   # raw + derived temporal features (see build_features.py)
+    python train_model.py --streaming   # out-of-core: datasets larger than RAM
+    python train_model.py --int8        # also export predictor_int8.tflite and compare
+    python train_model.py --sweep       # cross-validated architecture search, exports the winner
+    python train_model.py --export logistic   # ship JSON logistic weights, skip Keras/TFLite
+    python train_model.py validate      # check the data only
+    python train_model.py baseline      # sklearn baseline only
+    python train_model.py export        # re-export the models saved by the last train/baseline run
+    python train_model.py --no-cache    # retrain even if this data and config are in the run cache
+
+TensorFlow is imported only by the stages that need it (Keras training and
+TFLite conversion), so validate, baseline and logistic exports start fast.
+
+train runs are cached by data fingerprint and config (run_cache.py): an
+unchanged rerun restores the saved models and exported files without training.
 """
 
+import time
+
+_IMPORT_STARTED = time.perf_counter()   # startup is reported from here, before the heavy imports
+
+import argparse
+import itertools
+import multiprocessing
 import os
+import shutil
 import sys
 import json
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+import joblib
 import numpy as np
 import pandas as pd
-from sklearn.model_selection import train_test_split
+from sklearn.model_selection import StratifiedKFold
 from sklearn.preprocessing import StandardScaler
-from sklearn.linear_model import LogisticRegression
-from sklearn.metrics import accuracy_score, classification_report, confusion_matrix
-import tensorflow as tf
-from tensorflow import keras
+from sklearn.linear_model import LogisticRegression, SGDClassifier
+from sklearn.metrics import accuracy_score, classification_report, confusion_matrix, recall_score
+
+from build_features import (DEFAULT_FEATURE_SET, FEATURE_SETS, build_feature_frame, feature_columns,
+                            is_materialized, needs_derived)
+from logistic_model import save_logistic
+from run_cache import (cache_key, code_fingerprint, data_fingerprint, load_export, load_run, restore_files,
+                       save_export, save_run)
+from training_store import FEATURES, LABEL, iter_batches, validate_page
+
+try:
+    import resource
+except ImportError:  # Windows: no peak RSS report
+    resource = None
+
+MIN_RECORDS = 50
+TEST_SIZE = 0.2
+STREAM_CHUNK_ROWS = 65536
+REPRESENTATIVE_SAMPLES = 500   # calibration rows for int8 quantization
+QUANT_EVAL_ROWS = 20000        # held-out rows used to compare float vs int8
+
+# Sweep (--sweep): every combination is cross-validated
+SWEEP_GRID = {
+    'hidden': [(), (8,), (16, 8), (32, 16)],   # () = logistic regression
+    'l2': [0.0, 1e-4, 1e-3],
+    'class_weight': [None, 'balanced'],
+}
+SWEEP_FOLDS = 5
+SWEEP_EPOCHS = 30
+SWEEP_BATCH_SIZE = 256
+SWEEP_LATENCY_ROWS = 1000
+RECALL_TARGET = 0.7            # recall on the abandoned class a winner must reach
+LATENCY_WEIGHT = 0.01          # accuracy traded per doubling of TFLite latency
+SIZE_WEIGHT = 0.01             # accuracy traded per doubling of TFLite size
+LOGISTIC_TOLERANCE = 0.01      # --export auto ships the logistic JSON within this accuracy of Keras
+MODELS_DIR = os.path.join(os.path.dirname(__file__), 'data', 'models')   # trained models between commands
+ASSETS_DIR = os.path.join(os.path.dirname(__file__), '..', 'assets', 'ml_models')   # files the app ships
+
 
+def load_tensorflow():
+    """(tf, keras), imported on first use so sklearn-only commands never pay TensorFlow's startup."""
+    import tensorflow as tf
+    from tensorflow import keras
+    return tf, keras
 
-def load_training_data():
-    """Load and validate training data from CSV."""
-    data_path = os.path.join(os.path.dirname(__file__), 'data', 'training_data.csv')
+
+def default_data_path():
+    """The columnar store if an export has produced one, else the legacy CSV."""
+    data_dir = os.path.join(os.path.dirname(__file__), 'data')
+    store_dir = os.path.join(data_dir, 'training_store')
+    return store_dir if os.path.isdir(store_dir) else os.path.join(data_dir, 'training_data.csv')
+
+
+def load_training_data(data_path=None, feature_set=DEFAULT_FEATURE_SET):
+    """Load and validate training data (columns of a registered feature set) from the store or a CSV."""
+    if data_path is None:
+        data_path = default_data_path()
     
     if not os.path.exists(data_path):
-        print("❌ Error: training_data.csv not found")
+        print(f"❌ Error: {os.path.basename(data_path)} not found")
         print("   Run export_firestore_data.py first to generate training data")
         sys.exit(1)
     
-    print(f"📥 Loading training data from {data_path}...")
-    df = pd.read_csv(data_path)
+    print(f"📥 Loading training data from {data_path} (feature set {feature_set})...")
+    # Only the model's columns are decoded; derived features are computed unless already materialized
+    df = build_feature_frame(data_path, feature_set)
     
     # Validate minimum rows
-    if len(df) < 50:
-        print(f"❌ Error: Need at least 50 records, found {len(df)}")
+    if len(df) < MIN_RECORDS:
+        print(f"❌ Error: Need at least {MIN_RECORDS} records, found {len(df)}")
         sys.exit(1)
     
     print(f"✅ Loaded {len(df)} training records")
     
     # Prepare features and labels
-    feature_cols = ['hourOfDay', 'dayOfWeek', 'streakAtTime', 'failuresLast7Days', 'hoursFromReminder']
-    X = df[feature_cols].values
-    y = df['abandoned'].values.astype(int)
+    feature_cols = feature_columns(feature_set)
+    X = df[feature_cols].to_numpy(dtype=np.float64)
+    y = df[LABEL].to_numpy(dtype=int)
     
     print(f"\nClass distribution:")
     print(f"  - Abandoned (1): {y.sum()} ({y.sum()/len(y)*100:.1f}%)")
@@ -77,14 +152,183 @@ def train_sklearn_model(X_train, X_test, y_train, y_test):
     print(f"\n✅ Model trained successfully")
     print(f"   Accuracy: {accuracy:.2%}")
     print(f"\nClassification Report:")
-    print(classification_report(y_test, y_pred, target_names=['Completed', 'Abandoned']))
+    # labels=: the unstratified split can leave a small export's test rows with one class
+    print(classification_report(y_test, y_pred, labels=[0, 1], target_names=['Completed', 'Abandoned'],
+                                zero_division=0))
     print(f"\nConfusion Matrix:")
-    print(confusion_matrix(y_test, y_pred))
+    print(confusion_matrix(y_test, y_pred, labels=[0, 1]))
     
     return model, scaler, accuracy
 
 
-def create_keras_model(sklearn_model, scaler, n_features):
+def holdout_mask(rng, n_rows):
+    """True for each of the next n_rows that goes to the test split (probability TEST_SIZE).
+
+    The one split rule of both training paths: split_arrays() draws for all
+    rows at once, iter_split() chunk by chunk, and a generator yields the
+    same sequence either way, so with the same seed a row lands in the same
+    split whether it was loaded or streamed (the benchmark relies on this).
+    """
+    return rng.random(n_rows) < TEST_SIZE
+
+
+def split_arrays(X, y, seed=42):
+    """In-memory (X_train, X_test, y_train, y_test): the split iter_split() streams."""
+    is_test = holdout_mask(np.random.default_rng(seed), len(y))
+    return X[~is_test], X[is_test], y[~is_test], y[is_test]
+
+
+def iter_split(data_path, split, chunk_rows=STREAM_CHUNK_ROWS, seed=42, features=FEATURES):
+    """Stream (X, y) chunks of the 'train' or 'test' split.
+
+    Rows are assigned with holdout_mask() from a seeded generator that
+    consumes the same draws for both splits, so every pass over the data
+    (at any chunk size) sees an identical, disjoint split.
+
+    Derived features need each record's history, so they can only be
+    streamed from a file build_features.py has materialized.
+    """
+    features = list(features)
+    if needs_derived(features) and not is_materialized(data_path, features):
+        raise ValueError(f"{data_path} has no derived feature columns; stream a build_features.py output instead")
+    rng = np.random.default_rng(seed)
+    for df in iter_batches(data_path, features + [LABEL], chunk_rows):
+        is_test = holdout_mask(rng, len(df))
+        mask = is_test if split == 'test' else ~is_test
+        yield df.loc[mask, features].to_numpy(dtype=np.float64), df.loc[mask, LABEL].to_numpy(dtype=int)
+
+
+def split_sizes(data_path, chunk_rows=STREAM_CHUNK_ROWS, seed=42):
+    """(train rows, test rows) of the iter_split() split, reading only the label column."""
+    rng = np.random.default_rng(seed)
+    n_rows = n_test = 0
+    for df in iter_batches(data_path, [LABEL], chunk_rows):
+        n_rows += len(df)
+        n_test += int(holdout_mask(rng, len(df)).sum())
+    return n_rows - n_test, n_test
+
+
+def train_sklearn_streaming(data_path, chunk_rows=STREAM_CHUNK_ROWS, epochs=5, features=FEATURES):
+    """Out-of-core baseline: StandardScaler.partial_fit + SGD logistic regression.
+
+    Needs one pass for the scaler, `epochs` passes for the model and one for
+    evaluation; memory use is bounded by chunk_rows.
+    """
+    print(f"\n📊 Training streaming SGD logistic regression (chunks of {chunk_rows} rows)...")
+
+    # Pass 1: scaler statistics and class counts
+    scaler = StandardScaler()
+    n_train = n_abandoned = 0
+    for X, y in iter_split(data_path, 'train', chunk_rows, features=features):
+        if len(X):
+            scaler.partial_fit(X)
+        n_train += len(y)
+        n_abandoned += int(y.sum())
+
+    if n_train < MIN_RECORDS:
+        print(f"❌ Error: Need at least {MIN_RECORDS} records, found {n_train}")
+        sys.exit(1)
+    print(f"✅ Streamed {n_train} training records")
+    print(f"  - Abandoned (1): {n_abandoned} ({n_abandoned/n_train*100:.1f}%)")
+    print(f"  - Completed (0): {n_train - n_abandoned} ({(n_train - n_abandoned)/n_train*100:.1f}%)")
+
+    model = SGDClassifier(loss='log_loss', random_state=42)
+    for epoch in range(epochs):
+        for X, y in iter_split(data_path, 'train', chunk_rows, features=features):
+            if len(X):
+                model.partial_fit(scaler.transform(X), y, classes=[0, 1])
+
+    # Evaluate on the held-out split, accumulating the confusion matrix
+    matrix = np.zeros((2, 2), dtype=np.int64)
+    for X, y in iter_split(data_path, 'test', chunk_rows, features=features):
+        if len(X):
+            matrix += confusion_matrix(y, model.predict(scaler.transform(X)), labels=[0, 1])
+    accuracy = np.trace(matrix) / max(matrix.sum(), 1)
+
+    print(f"\n✅ Model trained successfully")
+    print(f"   Accuracy: {accuracy:.2%} on {matrix.sum()} held-out records")
+    print(f"\nConfusion Matrix:")
+    print(matrix)
+
+    return model, scaler, accuracy
+
+
+def streaming_dataset(data_path, split, scaler, batch_size=32, chunk_rows=STREAM_CHUNK_ROWS, shuffle=False,
+                      rows=None, features=FEATURES):
+    """tf.data pipeline over one split: scaled chunks -> rows -> (shuffled) batches.
+
+    rows, when known, declares the split size so Keras sees a finite epoch.
+    """
+    tf, keras = load_tensorflow()
+    def chunks():
+        for X, y in iter_split(data_path, split, chunk_rows, features=features):
+            yield scaler.transform(X).astype(np.float32), y.astype(np.float32)
+
+    ds = tf.data.Dataset.from_generator(
+        chunks,
+        output_signature=(
+            tf.TensorSpec(shape=(None, len(features)), dtype=tf.float32),
+            tf.TensorSpec(shape=(None,), dtype=tf.float32),
+        ),
+    ).unbatch()
+    if rows is not None:
+        ds = ds.apply(tf.data.experimental.assert_cardinality(rows))
+    if shuffle:
+        ds = ds.shuffle(10_000, seed=42, reshuffle_each_iteration=True)
+    return ds.batch(batch_size).prefetch(tf.data.AUTOTUNE)
+
+
+def train_keras_streaming(model, data_path, scaler, chunk_rows=STREAM_CHUNK_ROWS, batch_size=32,
+                          features=FEATURES):
+    """Train the Keras model from tf.data pipelines over the store (never fully in memory)."""
+    tf, keras = load_tensorflow()
+    print("\n📊 Training Keras model (streaming)...")
+
+    n_train, n_test = split_sizes(data_path, chunk_rows)
+    train_ds = streaming_dataset(data_path, 'train', scaler, batch_size, chunk_rows, shuffle=True, rows=n_train,
+                                 features=features)
+    test_ds = streaming_dataset(data_path, 'test', scaler, batch_size, chunk_rows, rows=n_test, features=features)
+
+    early_stopping = keras.callbacks.EarlyStopping(
+        monitor='val_loss',
+        patience=10,
+        restore_best_weights=True
+    )
+
+    model.fit(
+        train_ds,
+        validation_data=test_ds,
+        epochs=100,
+        callbacks=[early_stopping],
+        verbose=0
+    )
+
+    loss, accuracy = model.evaluate(test_ds, verbose=0)
+
+    print(f"✅ Keras model trained")
+    print(f"   Accuracy: {accuracy:.2%}")
+    print(f"   Loss: {loss:.4f}")
+
+    return model, accuracy
+
+
+def build_network(n_features, hidden=(16, 8), dropout=0.2, l2=0.0):
+    """Uncompiled MLP: ReLU hidden layers (dropout after the first), sigmoid output.
+
+    hidden=() is a plain logistic regression; l2 adds a kernel penalty to every Dense layer.
+    """
+    tf, keras = load_tensorflow()
+    regularizer = keras.regularizers.l2(l2) if l2 else None
+    layers = [keras.layers.Input(shape=(n_features,))]
+    for i, units in enumerate(hidden):
+        layers.append(keras.layers.Dense(units, activation='relu', kernel_regularizer=regularizer))
+        if i == 0 and dropout:
+            layers.append(keras.layers.Dropout(dropout))
+    layers.append(keras.layers.Dense(1, activation='sigmoid', kernel_regularizer=regularizer))
+    return keras.Sequential(layers)
+
+
+def create_keras_model(sklearn_model, scaler, n_features, hidden=(16, 8), dropout=0.2, l2=0.0):
     """Create equivalent Keras model for TFLite export."""
     print("\n🔄 Converting to Keras model...")
     
@@ -94,13 +338,7 @@ def create_keras_model(sklearn_model, scaler, n_features):
     
     # Create Keras model with similar architecture
     # Using a slightly deeper network for better mobile performance
-    model = keras.Sequential([
-        keras.layers.Input(shape=(n_features,)),
-        keras.layers.Dense(16, activation='relu'),
-        keras.layers.Dropout(0.2),
-        keras.layers.Dense(8, activation='relu'),
-        keras.layers.Dense(1, activation='sigmoid')
-    ])
+    model = build_network(n_features, hidden, dropout, l2)
     
     # Compile model
     model.compile(
@@ -114,13 +352,50 @@ def create_keras_model(sklearn_model, scaler, n_features):
     return model
 
 
-def train_keras_model(model, X_train, X_test, y_train, y_test, scaler):
-    """Train the Keras model."""
-    print("\n📊 Training Keras model...")
-    
-    # Normalize data
-    X_train_scaled = scaler.transform(X_train)
-    X_test_scaled = scaler.transform(X_test)
+def normalization_layer(scaler):
+    """Keras Normalization layer reproducing scaler.transform exactly."""
+    tf, keras = load_tensorflow()
+    # scale_**2 rather than var_: sklearn uses scale 1 for constant features
+    return keras.layers.Normalization(mean=scaler.mean_, variance=scaler.scale_ ** 2)
+
+
+def make_dataset(X, y, batch_size=32, shuffle=False, seed=42):
+    """In-memory tf.data pipeline: cache -> (shuffle rows) -> batch -> prefetch.
+
+    Rows are reshuffled over the whole training set each epoch before they
+    are batched (as streaming_dataset() does), so batch compositions change
+    from epoch to epoch like model.fit(shuffle=True).
+    """
+    tf, keras = load_tensorflow()
+    ds = tf.data.Dataset.from_tensor_slices((X.astype(np.float32), y.astype(np.float32))).cache()
+    if shuffle:
+        ds = ds.shuffle(len(X), seed=seed, reshuffle_each_iteration=True)
+    return ds.batch(batch_size).prefetch(tf.data.AUTOTUNE)
+
+
+def with_normalization(model, scaler, n_features):
+    """Training wrapper: raw features -> Normalization -> model (layers are shared with model)."""
+    tf, keras = load_tensorflow()
+    wrapper = keras.Sequential([
+        keras.layers.Input(shape=(n_features,)),
+        normalization_layer(scaler),
+        model,
+    ])
+    wrapper.compile(optimizer='adam', loss='binary_crossentropy', metrics=['accuracy'])
+    return wrapper
+
+
+def train_keras_model(model, X_train, X_test, y_train, y_test, scaler, batch_size=32, pipeline='tf.data',
+                      class_weight=None):
+    """Train the Keras model.
+
+    pipeline='tf.data' feeds raw features through a cached, prefetched
+    tf.data pipeline and normalizes inside the graph (Normalization layer);
+    pipeline='numpy' is the original host-side scaler.transform + arrays path.
+    The returned model is the un-normalized core either way.
+    """
+    tf, keras = load_tensorflow()
+    print(f"\n📊 Training Keras model ({pipeline}, batch size {batch_size})...")
     
     # Train with early stopping
     early_stopping = keras.callbacks.EarlyStopping(
@@ -129,17 +404,39 @@ def train_keras_model(model, X_train, X_test, y_train, y_test, scaler):
         restore_best_weights=True
     )
     
-    history = model.fit(
-        X_train_scaled, y_train,
-        validation_data=(X_test_scaled, y_test),
-        epochs=100,
-        batch_size=32,
-        callbacks=[early_stopping],
-        verbose=0
-    )
-    
-    # Evaluate
-    loss, accuracy = model.evaluate(X_test_scaled, y_test, verbose=0)
+    if pipeline == 'numpy':
+        # Normalize data
+        X_train_scaled = scaler.transform(X_train)
+        X_test_scaled = scaler.transform(X_test)
+        
+        history = model.fit(
+            X_train_scaled, y_train,
+            validation_data=(X_test_scaled, y_test),
+            epochs=100,
+            batch_size=batch_size,
+            class_weight=class_weight,
+            callbacks=[early_stopping],
+            verbose=0
+        )
+        
+        # Evaluate
+        loss, accuracy = model.evaluate(X_test_scaled, y_test, verbose=0)
+    else:
+        trainer = with_normalization(model, scaler, X_train.shape[1])
+        train_ds = make_dataset(X_train, y_train, batch_size, shuffle=True)
+        test_ds = make_dataset(X_test, y_test, batch_size)
+        
+        history = trainer.fit(
+            train_ds,
+            validation_data=test_ds,
+            epochs=100,
+            class_weight=class_weight,
+            callbacks=[early_stopping],
+            verbose=0
+        )
+        
+        # Evaluate
+        loss, accuracy = trainer.evaluate(test_ds, verbose=0)
     
     print(f"✅ Keras model trained")
     print(f"   Accuracy: {accuracy:.2%}")
@@ -148,20 +445,104 @@ def train_keras_model(model, X_train, X_test, y_train, y_test, scaler):
     return model, accuracy
 
 
-def export_tflite(keras_model, scaler):
-    """Convert Keras model to TFLite and save with scaler params."""
+def epoch_timer():
+    """Keras callback recording wall-clock seconds per epoch in .times."""
+    tf, keras = load_tensorflow()
+
+    class EpochTimer(keras.callbacks.Callback):
+        def on_train_begin(self, logs=None):
+            self.times = []
+
+        def on_epoch_begin(self, epoch, logs=None):
+            self._start = time.perf_counter()
+
+        def on_epoch_end(self, epoch, logs=None):
+            self.times.append(time.perf_counter() - self._start)
+
+    return EpochTimer()
+
+
+def compare_input_pipelines(sklearn_model, scaler, X_train, y_train, batch_sizes=(32, 256, 1024), epochs=5):
+    """Time epochs of the numpy path vs the tf.data path on fresh models.
+
+    The first epoch (graph tracing, cache fill) is reported separately from
+    the median of the remaining epochs.
+    """
+    tf, keras = load_tensorflow()
+    X_train_scaled = scaler.transform(X_train)
+    results = {}
+    for batch_size in batch_sizes:
+        for pipeline in ('numpy', 'tf.data'):
+            tf.keras.utils.set_random_seed(42)
+            model = create_keras_model(sklearn_model, scaler, X_train.shape[1])
+            timer = epoch_timer()
+            if pipeline == 'numpy':
+                model.fit(X_train_scaled, y_train, epochs=epochs, batch_size=batch_size,
+                          callbacks=[timer], verbose=0)
+            else:
+                trainer = with_normalization(model, scaler, X_train.shape[1])
+                trainer.fit(make_dataset(X_train, y_train, batch_size, shuffle=True), epochs=epochs,
+                            callbacks=[timer], verbose=0)
+            steady = float(np.median(timer.times[1:])) if len(timer.times) > 1 else timer.times[0]
+            results[(pipeline, batch_size)] = (timer.times[0], steady)
+    
+    print(f"\n⏱️  Epoch time: numpy arrays vs tf.data ({len(X_train)} rows, {epochs} epochs)")
+    print(f"   {'pipeline':<10}{'batch':>7}{'first (s)':>12}{'median (s)':>12}")
+    for (pipeline, batch_size), (first, steady) in results.items():
+        print(f"   {pipeline:<10}{batch_size:>7}{first:>12.3f}{steady:>12.3f}")
+    
+    results = {key: steady for key, (_, steady) in results.items()}
+    baseline = results[('numpy', 32)] if ('numpy', 32) in results else None
+    if baseline:
+        best = min(results, key=results.get)
+        print(f"   Fastest: {best[0]} @ batch {best[1]} ({baseline / results[best]:.1f}x vs numpy @ 32)")
+    return results
+
+
+def fold_scaler(model, scaler):
+    """Copy of model that takes raw features: the scaler is folded into the first Dense layer.
+
+    Dense(W, b) applied to (x - mean) / scale equals Dense(W / scale[:, None],
+    b - (mean / scale) @ W) applied to x, so the exported graph needs no extra ops.
+    """
+    tf, keras = load_tensorflow()
+    folded = keras.models.clone_model(model)
+    folded.set_weights(model.get_weights())
+    dense = next(layer for layer in folded.layers if isinstance(layer, keras.layers.Dense))
+    kernel, bias = dense.get_weights()
+    dense.set_weights([
+        kernel / scaler.scale_[:, None],
+        bias - (scaler.mean_ / scaler.scale_) @ kernel,
+    ])
+    return folded
+
+
+def export_tflite(keras_model, scaler, fold=True, feature_set=DEFAULT_FEATURE_SET):
+    """Convert Keras model to TFLite and save with scaler params.
+
+    With fold=True the scaler is folded into the model, so the app feeds raw
+    features. scaler_params.json is still written for older app builds that
+    always normalize (pubspec.yaml also declares it): it holds an identity
+    transform (mean 0, scale 1) flagged with normalized_in_model, plus the
+    training statistics for reference.
+    It also names the feature set (and its column order) the model expects.
+    """
+    tf, keras = load_tensorflow()
     print("\n📦 Exporting to TFLite format...")
     
+    if fold:
+        keras_model = fold_scaler(keras_model, scaler)
+        print("   Scaler folded into the first Dense layer (model takes raw features)")
+    
     # Convert to TFLite
     converter = tf.lite.TFLiteConverter.from_keras_model(keras_model)
     converter.optimizations = [tf.lite.Optimize.DEFAULT]
     tflite_model = converter.convert()
     
     # Save TFLite model
-    assets_dir = os.path.join(os.path.dirname(__file__), '..', 'assets', 'ml_models')
-    os.makedirs(assets_dir, exist_ok=True)
+    os.makedirs(ASSETS_DIR, exist_ok=True)
     
-    tflite_path = os.path.join(assets_dir, 'predictor.tflite')
+    tflite_path = os.path.join(ASSETS_DIR, 'predictor.tflite')
     with open(tflite_path, 'wb') as f:
         f.write(tflite_model)
     
@@ -170,12 +551,24 @@ def export_tflite(keras_model, scaler):
     print(f"   Size: {tflite_size_mb:.2f} MB")
     
     # Save scaler parameters
-    scaler_params = {
-        'mean': scaler.mean_.tolist(),
-        'scale': scaler.scale_.tolist(),
-    }
+    scaler_path = os.path.join(ASSETS_DIR, 'scaler_params.json')
+    if fold:
+        n_features = len(scaler.mean_)
+        scaler_params = {
+            'mean': [0.0] * n_features,
+            'scale': [1.0] * n_features,
+            'normalized_in_model': True,
+            'training_mean': scaler.mean_.tolist(),
+            'training_scale': scaler.scale_.tolist(),
+        }
+    else:
+        scaler_params = {
+            'mean': scaler.mean_.tolist(),
+            'scale': scaler.scale_.tolist(),
+        }
+    scaler_params['feature_set'] = feature_set
+    scaler_params['features'] = feature_columns(feature_set)
     
-    scaler_path = os.path.join(assets_dir, 'scaler_params.json')
     with open(scaler_path, 'w') as f:
         json.dump(scaler_params, f, indent=2)
     
@@ -184,20 +577,602 @@ def export_tflite(keras_model, scaler):
     return tflite_path, scaler_path, tflite_size_mb
 
 
-def main():
-    """Main execution function."""
+def logistic_export_path():
+    return os.path.join(ASSETS_DIR, 'logistic_model.json')
+
+
+def int8_export_path():
+    return os.path.join(ASSETS_DIR, 'predictor_int8.tflite')
+
+
+def export_logistic(sklearn_model, scaler, accuracy, feature_set=DEFAULT_FEATURE_SET):
+    """Ship the logistic baseline as JSON weights on raw features (see logistic_model.py)."""
+    print("\n📦 Exporting logistic model (JSON)...")
+    
+    path = logistic_export_path()
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    save_logistic(sklearn_model, scaler, path, feature_columns(feature_set), accuracy, feature_set)
+    
+    print(f"✅ Logistic model saved to {path}")
+    print(f"   Size: {os.path.getsize(path)} bytes")
+    
+    return path
+
+
+def remove_stale_export(path):
+    if os.path.exists(path):
+        os.remove(path)
+        print(f"🗑️  Removed stale {path}")
+
+
+def remove_logistic_export():
+    remove_stale_export(logistic_export_path())
+
+
+def unsupported_feature_set(args):
+    """Why exporting args.feature_set into the app assets is refused, or None when it is allowed."""
+    if args.feature_set == DEFAULT_FEATURE_SET or args.allow_feature_set:
+        return None
+    return (f"the app only builds the {DEFAULT_FEATURE_SET} inputs ({', '.join(feature_columns(DEFAULT_FEATURE_SET))}), "
+            f"so models of feature set {args.feature_set} would make every prediction fail; "
+            f"pass --allow-feature-set to export them anyway")
+
+
+def choose_export(sklearn_accuracy, keras_accuracy, tolerance=LOGISTIC_TOLERANCE):
+    """'logistic' when the baseline is within tolerance of the Keras model, else 'tflite'."""
+    gap = keras_accuracy - sklearn_accuracy
+    shipped = 'logistic' if gap <= tolerance else 'tflite'
+    print(f"\n⚖️  Keras leads logistic by {gap * 100:+.2f} pts (tolerance {tolerance * 100:.2f}) "
+          f"-> shipping {shipped}")
+    return shipped
+
+
+def sample_split(data_path, split, n_rows, chunk_rows=STREAM_CHUNK_ROWS, seed=42, features=FEATURES):
+    """Uniform random sample of n_rows (X, y) rows of a streamed split, in bounded memory.
+
+    Every row gets a random key and the n_rows smallest keys are kept, so the
+    sample is not biased towards the oldest partitions.
+    """
+    rng = np.random.default_rng(seed)
+    X = np.empty((0, len(features)))
+    y = np.empty(0, dtype=int)
+    keys = np.empty(0)
+    for X_chunk, y_chunk in iter_split(data_path, split, chunk_rows, features=features):
+        X = np.concatenate([X, X_chunk])
+        y = np.concatenate([y, y_chunk])
+        keys = np.concatenate([keys, rng.random(len(X_chunk))])
+        if len(keys) > n_rows:
+            keep = np.argpartition(keys, n_rows)[:n_rows]
+            X, y, keys = X[keep], y[keep], keys[keep]
+    return X, y
+
+
+def representative_dataset(X, samples=REPRESENTATIVE_SAMPLES, seed=42):
+    """Calibration generator for the int8 converter: single raw-feature rows drawn from X."""
+    rng = np.random.default_rng(seed)
+    rows = X[rng.choice(len(X), min(samples, len(X)), replace=False)].astype(np.float32)
+
+    def generator():
+        for row in rows:
+            yield [row[None, :]]
+    return generator
+
+
+def export_int8_tflite(keras_model, scaler, representative_X, fold=True):
+    """Full-integer (int8 weights, activations, input and output) TFLite export.
+
+    Written next to the float model as predictor_int8.tflite; quantization
+    ranges are calibrated on representative_X (raw training features).
+    """
+    tf, keras = load_tensorflow()
+    print("\n📦 Exporting full-integer int8 TFLite model...")
+    
+    if fold:
+        keras_model = fold_scaler(keras_model, scaler)
+    else:
+        representative_X = scaler.transform(representative_X)
+    
+    converter = tf.lite.TFLiteConverter.from_keras_model(keras_model)
+    converter.optimizations = [tf.lite.Optimize.DEFAULT]
+    converter.representative_dataset = representative_dataset(representative_X)
+    converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS_INT8]
+    converter.inference_input_type = tf.int8
+    converter.inference_output_type = tf.int8
+    tflite_model = converter.convert()
+    
+    int8_path = int8_export_path()
+    os.makedirs(os.path.dirname(int8_path), exist_ok=True)
+    with open(int8_path, 'wb') as f:
+        f.write(tflite_model)
+    
+    print(f"✅ int8 TFLite model saved to {int8_path}")
+    
+    return int8_path
+
+
+def quantize_input(X, detail):
+    """Raw float features -> the interpreter's input dtype (int8 uses the tensor's scale/zero point)."""
+    X = X.astype(np.float32)
+    if detail['dtype'] == np.int8:
+        scale, zero_point = detail['quantization']
+        X = np.clip(np.round(X / scale + zero_point), -128, 127).astype(np.int8)
+    return X
+
+
+def dequantize_output(raw, detail):
+    """Interpreter output -> float probabilities."""
+    probs = np.asarray(raw, dtype=np.float64)
+    if detail['dtype'] == np.int8:
+        scale, zero_point = detail['quantization']
+        probs = (probs - zero_point) * scale
+    return probs
+
+
+def tflite_predict(model, X):
+    """Run a TFLite model (file path or flatbuffer bytes) one row at a time, as the app does.
+
+    Returns (probabilities, per-inference seconds). int8 inputs and outputs
+    are quantized/dequantized with the tensor's scale and zero point outside
+    the timed region.
+    """
+    tf, keras = load_tensorflow()
+    if isinstance(model, bytes):
+        interpreter = tf.lite.Interpreter(model_content=model)
+    else:
+        interpreter = tf.lite.Interpreter(model_path=model)
+    interpreter.allocate_tensors()
+    inp = interpreter.get_input_details()[0]
+    out = interpreter.get_output_details()[0]
+    
+    X = quantize_input(X, inp)
+    
+    raw = np.empty(len(X), dtype=out['dtype'])
+    latencies = np.empty(len(X))
+    for i, row in enumerate(X):
+        start = time.perf_counter()
+        interpreter.set_tensor(inp['index'], row[None, :])
+        interpreter.invoke()
+        raw[i] = interpreter.get_tensor(out['index'])[0, 0]
+        latencies[i] = time.perf_counter() - start
+    
+    return dequantize_output(raw, out), latencies
+
+
+def compare_tflite_models(float_path, int8_path, X_test, y_test):
+    """Print size, per-inference latency and held-out accuracy of the float and int8 models."""
+    if len(X_test) > QUANT_EVAL_ROWS:
+        keep = np.random.default_rng(42).choice(len(X_test), QUANT_EVAL_ROWS, replace=False)
+        X_test, y_test = X_test[keep], y_test[keep]
+    
+    print(f"\n⚖️  Float vs int8 TFLite ({len(X_test)} held-out rows)")
+    print(f"   {'model':8} {'size (KB)':>10} {'p50 (µs)':>10} {'mean (µs)':>10} {'accuracy':>9}")
+    results = {}
+    for name, path in (('float', float_path), ('int8', int8_path)):
+        probs, latencies = tflite_predict(path, X_test)
+        accuracy = accuracy_score(y_test, probs >= 0.5)
+        results[name] = (probs, accuracy)
+        print(f"   {name:8} {os.path.getsize(path) / 1024:10.1f} {np.median(latencies) * 1e6:10.1f} "
+              f"{latencies.mean() * 1e6:10.1f} {accuracy:9.2%}")
+    
+    (float_probs, float_acc), (int8_probs, int8_acc) = results['float'], results['int8']
+    agreement = np.mean((float_probs >= 0.5) == (int8_probs >= 0.5))
+    print(f"   Accuracy delta: {(int8_acc - float_acc) * 100:+.2f} pts, "
+          f"max |Δp| {np.abs(float_probs - int8_probs).max():.4f}, "
+          f"label agreement {agreement:.2%}")
+    return int8_acc - float_acc
+
+
+def balanced_class_weight(y):
+    """Keras class_weight dict weighting each class by n / (2 * count), like sklearn's 'balanced'."""
+    counts = np.bincount(y, minlength=2)
+    return {label: len(y) / (2 * count) for label, count in enumerate(counts) if count}
+
+
+def sweep_candidates(grid=SWEEP_GRID):
+    """Every combination of the grid's values, as dicts."""
+    keys = list(grid)
+    return [dict(zip(keys, values)) for values in itertools.product(*(grid[k] for k in keys))]
+
+
+_sweep_data = None
+
+
+def _init_sweep_worker(X, y):
+    """Process pool initializer: ship the training split once per worker, one TF thread each."""
+    tf, keras = load_tensorflow()
+    global _sweep_data
+    tf.config.threading.set_intra_op_parallelism_threads(1)
+    tf.config.threading.set_inter_op_parallelism_threads(1)
+    _sweep_data = (X, y)
+
+
+def evaluate_candidate(candidate, folds=SWEEP_FOLDS, seed=42):
+    """Stratified k-fold CV of one candidate; runs in a sweep worker.
+
+    Each fold fits its own scaler on the fold's training rows. The last
+    fold's model is returned exported the way export_tflite ships it (scaler
+    folded in, dynamic-range quantized) for size and latency measurement.
+    """
+    tf, keras = load_tensorflow()
+    X, y = _sweep_data
+    keras.utils.set_random_seed(seed)
+    accuracies, recalls = [], []
+    splits = StratifiedKFold(n_splits=folds, shuffle=True, random_state=seed).split(X, y)
+    for train_idx, val_idx in splits:
+        scaler = StandardScaler().fit(X[train_idx])
+        X_fit, X_val = scaler.transform(X[train_idx]), scaler.transform(X[val_idx])
+        model = build_network(X.shape[1], candidate['hidden'], l2=candidate['l2'])
+        model.compile(optimizer='adam', loss='binary_crossentropy')
+        class_weight = balanced_class_weight(y[train_idx]) if candidate['class_weight'] == 'balanced' else None
+        model.fit(
+            X_fit, y[train_idx],
+            validation_data=(X_val, y[val_idx]),
+            epochs=SWEEP_EPOCHS,
+            batch_size=SWEEP_BATCH_SIZE,
+            class_weight=class_weight,
+            callbacks=[keras.callbacks.EarlyStopping(monitor='val_loss', patience=3, restore_best_weights=True)],
+            verbose=0
+        )
+        y_pred = model.predict(X_val, batch_size=4096, verbose=0)[:, 0] >= 0.5
+        accuracies.append(accuracy_score(y[val_idx], y_pred))
+        recalls.append(recall_score(y[val_idx], y_pred))
+    
+    converter = tf.lite.TFLiteConverter.from_keras_model(fold_scaler(model, scaler))
+    converter.optimizations = [tf.lite.Optimize.DEFAULT]
+    tflite_model = converter.convert()
+    
+    return {
+        **candidate,
+        'accuracy': float(np.mean(accuracies)),
+        'recall': float(np.mean(recalls)),
+        'tflite_model': tflite_model,
+    }
+
+
+def rank_candidates(results, recall_target=RECALL_TARGET, latency_weight=LATENCY_WEIGHT,
+                    size_weight=SIZE_WEIGHT):
+    """Sort sweep results best first.
+
+    objective = CV accuracy - latency_weight * log2(latency / fastest)
+                            - size_weight * log2(size / smallest)
+    Candidates are ranked by recall capped at recall_target, then by
+    objective: those reaching the target rank ahead of the rest and among
+    themselves by objective; when none does, the highest recall wins rather
+    than a near-majority-class model with the best accuracy.
+    """
+    fastest = min(r['p50_us'] for r in results)
+    smallest = min(r['size_bytes'] for r in results)
+    for r in results:
+        r['meets_recall'] = r['recall'] >= recall_target
+        r['objective'] = (r['accuracy']
+                          - latency_weight * np.log2(r['p50_us'] / fastest)
+                          - size_weight * np.log2(r['size_bytes'] / smallest))
+    return sorted(results, key=lambda r: (min(r['recall'], recall_target), r['objective']), reverse=True)
+
+
+def run_sweep(X_train, y_train, folds=SWEEP_FOLDS, workers=None, recall_target=RECALL_TARGET, grid=SWEEP_GRID):
+    """Cross-validate every grid candidate across a process pool; returns ranked results."""
+    candidates = sweep_candidates(grid)
+    workers = workers or os.cpu_count()
+    print(f"\n🔎 Sweeping {len(candidates)} candidates, {folds}-fold stratified CV, {workers} workers...")
+    
+    start = time.perf_counter()
+    # spawn: TensorFlow is not fork-safe once initialized
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'),
+                             initializer=_init_sweep_worker, initargs=(X_train, y_train)) as pool:
+        results = list(pool.map(partial(evaluate_candidate, folds=folds), candidates))
+    
+    # Latency is timed here, one model at a time, so workers do not skew it
+    for r in results:
+        tflite_model = r.pop('tflite_model')
+        _, latencies = tflite_predict(tflite_model, X_train[:SWEEP_LATENCY_ROWS])
+        r['size_bytes'] = len(tflite_model)
+        r['p50_us'] = float(np.median(latencies) * 1e6)
+    ranked = rank_candidates(results, recall_target)
+    
+    print(f"   {'hidden':>9} {'l2':>7} {'weights':>9} {'accuracy':>9} {'recall':>7} {'size (KB)':>10} "
+          f"{'p50 (µs)':>9} {'objective':>10}")
+    for r in ranked:
+        hidden = '-'.join(map(str, r['hidden'])) or 'logistic'
+        mark = '✓' if r['meets_recall'] else ' '
+        print(f"   {hidden:>9} {r['l2']:7g} {r['class_weight'] or 'none':>9} {r['accuracy']:9.2%} "
+              f"{r['recall']:6.2%}{mark} {r['size_bytes'] / 1024:10.1f} {r['p50_us']:9.1f} {r['objective']:10.4f}")
+    
+    best = ranked[0]
+    if not best['meets_recall']:
+        print(f"⚠️  No candidate reached recall {recall_target:.0%}; picking the highest recall "
+              f"({best['recall']:.2%})")
+    print(f"✅ Sweep done in {time.perf_counter() - start:.1f}s, winner: hidden={best['hidden']}, "
+          f"l2={best['l2']}, class_weight={best['class_weight']}")
+    return ranked
+
+
+def validate_data(data_path=None, chunk_rows=STREAM_CHUNK_ROWS):
+    """Stream the dataset through the exporter's validation rules; True when it is fit to train on."""
+    if data_path is None:
+        data_path = default_data_path()
+    if not os.path.exists(data_path):
+        print(f"❌ Error: {os.path.basename(data_path)} not found")
+        print("   Run export_firestore_data.py first to generate training data")
+        return False
+    
+    print(f"🔍 Validating {data_path}...")
+    rows = abandoned = missing_labels = 0
+    rejected = {}
+    for df in iter_batches(data_path, FEATURES + [LABEL], chunk_rows):
+        columns = {f: df[f].to_numpy(dtype=np.float64, na_value=np.nan) for f in FEATURES}
+        _, page_rejected = validate_page(columns)
+        for reason, count in page_rejected.items():
+            rejected[reason] = rejected.get(reason, 0) + count
+        labels = df[LABEL]
+        missing_labels += int(labels.isna().sum())
+        abandoned += int(labels.fillna(False).astype(bool).sum())
+        rows += len(df)
+    
+    invalid = sum(rejected.values())
+    print(f"   Rows: {rows} ({invalid} failing validation, {missing_labels} without a label)")
+    for reason, count in sorted(rejected.items(), key=lambda item: -item[1]):
+        print(f"   - {reason}: {count}")
+    if rows:
+        print(f"   Abandoned: {abandoned} ({abandoned / rows * 100:.1f}%)")
+    
+    problems = []
+    if rows < MIN_RECORDS:
+        problems.append(f"need at least {MIN_RECORDS} records, found {rows}")
+    if invalid or missing_labels:
+        problems.append("some rows fail validation")
+    if rows and abandoned in (0, rows - missing_labels):
+        problems.append("only one class present")
+    for problem in problems:
+        print(f"❌ {problem}")
+    if not problems:
+        print("✅ Data is valid")
+    return not problems
+
+
+def save_baseline(sklearn_model, scaler, accuracy, feature_set=DEFAULT_FEATURE_SET, models_dir=None):
+    """Persist the sklearn baseline, its scaler and feature set for the export command."""
+    models_dir = models_dir or MODELS_DIR
+    os.makedirs(models_dir, exist_ok=True)
+    joblib.dump({'model': sklearn_model, 'scaler': scaler, 'accuracy': float(accuracy),
+                 'feature_set': feature_set, 'features': feature_columns(feature_set)},
+                os.path.join(models_dir, 'baseline.joblib'))
+
+
+def save_keras(keras_model, scaler, accuracy, feature_set=DEFAULT_FEATURE_SET, models_dir=None):
+    """Persist the Keras model with the scaler it was trained against (baseline runs may refit theirs)."""
+    models_dir = models_dir or MODELS_DIR
+    os.makedirs(models_dir, exist_ok=True)
+    keras_model.save(os.path.join(models_dir, 'keras_model.keras'))
+    joblib.dump({'scaler': scaler, 'accuracy': float(accuracy),
+                 'feature_set': feature_set, 'features': feature_columns(feature_set)},
+                os.path.join(models_dir, 'keras.joblib'))
+
+
+def load_baseline(models_dir=None):
+    """(model, scaler, accuracy, feature set) saved by the baseline or train command."""
+    path = os.path.join(models_dir or MODELS_DIR, 'baseline.joblib')
+    if not os.path.exists(path):
+        print(f"❌ Error: {path} not found; run the baseline or train command first")
+        sys.exit(1)
+    saved = joblib.load(path)
+    # Models saved before feature sets were versioned used the raw features
+    return saved['model'], saved['scaler'], saved['accuracy'], saved.get('feature_set', 'v1')
+
+
+def load_keras(models_dir=None):
+    """(keras model, scaler, accuracy, feature set) saved by the train command, or all None."""
+    models_dir = models_dir or MODELS_DIR
+    path = os.path.join(models_dir, 'keras_model.keras')
+    if not os.path.exists(path):
+        return None, None, None, None
+    tf, keras = load_tensorflow()
+    saved = joblib.load(os.path.join(models_dir, 'keras.joblib'))
+    return keras.models.load_model(path), saved['scaler'], saved['accuracy'], saved.get('feature_set', 'v1')
+
+
+def training_config(args):
+    """Options that change the trained models (part of the run cache key)."""
+    config = {
+        'feature_set': args.feature_set,
+        'streaming': args.streaming,
+        'keras': args.export != 'logistic',
+        'batch_size': args.batch_size,
+        'pipeline': args.pipeline,
+        'sweep': args.sweep,
+    }
+    if args.streaming:
+        config['chunk_rows'] = args.chunk_rows   # changes the SGD updates
+    if args.sweep:
+        config.update(folds=args.folds, recall_target=args.recall_target)
+    return config
+
+
+def export_config(args):
+    """Options that change the exported files of a trained run."""
+    return {
+        'export': args.export,
+        'tolerance': args.tolerance,
+        'int8': args.int8,
+        'no_fold_scaler': args.no_fold_scaler,
+    }
+
+
+def run_cache_keys(args):
+    """(training key, export key), or (None, None) when the run should not use the cache."""
+    data_path = args.data or default_data_path()
+    if args.no_cache or args.compare_pipelines or not os.path.exists(data_path):
+        return None, None
+    train_key = cache_key(data_fingerprint(data_path), training_config(args), code_fingerprint())
+    return train_key, cache_key(export_config(args))
+
+
+def saved_model_files(keras_trained):
+    names = ['baseline.joblib'] + (['keras_model.keras', 'keras.joblib'] if keras_trained else [])
+    return [os.path.join(MODELS_DIR, name) for name in names]
+
+
+def clear_saved_models():
+    """Delete every model file a run can save, so a restored run is not mixed with an older one."""
+    for path in saved_model_files(keras_trained=True):
+        if os.path.isdir(path):
+            shutil.rmtree(path)
+        elif os.path.exists(path):
+            os.remove(path)
+
+
+def remove_stale_exports(args, shipped):
+    """Replay the deletions of the export stage when its files come from the run cache."""
+    if shipped != 'logistic':
+        remove_logistic_export()
+    if not args.int8 or args.export == 'logistic':
+        remove_stale_export(int8_export_path())
+
+
+def restore_cached_run(args, train_key, export_key):
+    """Serve a train run from the run cache; False when it has to be trained."""
+    cached = load_run(train_key)
+    if cached is None:
+        print(f"🗄️  Run cache miss ({train_key}): training\n")
+        return False
+    metrics, models_src = cached
+    print(f"♻️  Run cache hit ({train_key}, trained {metrics['created']}): skipping training")
+    # A logistic-only run must not leave an older Keras model for the export command to pick up
+    clear_saved_models()
+    restore_files(models_src, metrics['models'], MODELS_DIR)
+    
+    exported = load_export(train_key, export_key)
+    if exported is None:
+        print("   Export options changed: exporting the cached models")
+        result = export_saved_models(args)
+        if result is None:
+            return False
+        sklearn_accuracy, keras_accuracy, shipped, output_files, size_mb = result
+        save_export(train_key, export_key, output_files, {'shipped': shipped, 'size_mb': size_mb})
+    else:
+        export_meta, export_src = exported
+        output_files = restore_files(export_src, export_meta['files'], ASSETS_DIR)
+        shipped, size_mb = export_meta['shipped'], export_meta['size_mb']
+        remove_stale_exports(args, shipped)
+        sklearn_accuracy, keras_accuracy = metrics['sklearn_accuracy'], metrics['keras_accuracy']
+    
+    print_summary("Training Complete! (cached)", sklearn_accuracy, keras_accuracy, shipped, output_files, size_mb)
+    return True
+
+
+def quantization_data(args, split=None):
+    """(representative rows, held-out X, held-out y) for --int8.
+
+    split is the in-memory (X_train, X_test, y_train, y_test) when the caller
+    has one; otherwise the data is sampled or reloaded with the same split.
+    """
+    if split is None:
+        if args.streaming:
+            data_path = args.data or default_data_path()
+            features = feature_columns(args.feature_set)
+            representative_X, _ = sample_split(data_path, 'train', REPRESENTATIVE_SAMPLES, args.chunk_rows,
+                                               features=features)
+            X_test, y_test = sample_split(data_path, 'test', QUANT_EVAL_ROWS, args.chunk_rows, features=features)
+            return representative_X, X_test, y_test
+        X, y, _ = load_training_data(args.data, args.feature_set)
+        split = split_arrays(X, y)
+    X_train, X_test, _, y_test = split
+    return X_train, X_test, y_test
+
+
+def export_models(args, sklearn_model, scaler, sklearn_accuracy, keras_model=None, keras_scaler=None,
+                  keras_accuracy=None, split=None):
+    """Export stage shared by train and export: returns (shipped model, output files, TFLite MB)."""
+    shipped = args.export
+    if shipped == 'auto':
+        shipped = 'logistic' if keras_model is None else choose_export(sklearn_accuracy, keras_accuracy,
+                                                                      args.tolerance)
+    output_files = []
+    if args.feature_set != DEFAULT_FEATURE_SET:
+        # Only reached with --allow-feature-set (main() and export_saved_models() refuse otherwise)
+        print(f"\n⚠️  Feature set {args.feature_set}: the app only builds the {DEFAULT_FEATURE_SET} inputs "
+              f"({', '.join(feature_columns(DEFAULT_FEATURE_SET))})")
+    
+    # The app prefers logistic_model.json, so it must not outlive a switch back to TFLite
+    if shipped == 'logistic':
+        output_files.append(export_logistic(sklearn_model, scaler, sklearn_accuracy, args.feature_set))
+    else:
+        remove_logistic_export()
+    
+    # Export to TFLite (still written in auto mode for app builds without the logistic path)
+    size_mb = None
+    if keras_model is not None and args.export != 'logistic':
+        fold = not args.no_fold_scaler
+        tflite_path, scaler_path, size_mb = export_tflite(
+            keras_model, keras_scaler, fold=fold, feature_set=args.feature_set
+        )
+        output_files.append(tflite_path)
+        
+        if args.int8:
+            representative_X, X_test, y_test = quantization_data(args, split)
+            int8_path = export_int8_tflite(keras_model, keras_scaler, representative_X, fold=fold)
+            if not fold:
+                X_test = keras_scaler.transform(X_test)
+            compare_tflite_models(tflite_path, int8_path, X_test, y_test)
+            output_files.append(int8_path)
+        
+        output_files.append(scaler_path)
+    
+    # An int8 model from an earlier --int8 export no longer matches predictor.tflite
+    if int8_export_path() not in output_files:
+        remove_stale_export(int8_export_path())
+    
+    return shipped, output_files, size_mb
+
+
+def print_summary(title, sklearn_accuracy, keras_accuracy=None, shipped=None, output_files=(), size_mb=None):
+    print("\n" + "=" * 60)
+    print(title)
     print("=" * 60)
-    print("ML Model Training Pipeline")
+    print(f"\n✅ Model Performance:")
+    print(f"   - Sklearn accuracy: {sklearn_accuracy:.2%}")
+    if keras_accuracy is not None:
+        print(f"   - Keras accuracy: {keras_accuracy:.2%}")
+    if size_mb is not None:
+        print(f"   - TFLite size: {size_mb:.2f} MB")
+    if shipped:
+        print(f"   - Shipped model: {shipped}")
+    print(f"\n📁 Output files:")
+    for path in output_files:
+        print(f"   - {path}")
+    if shipped:
+        print(f"\n🚀 Next steps:")
+        print(f"   1. Rebuild the app (pubspec.yaml bundles everything in assets/ml_models/)")
+        print(f"   2. Integrate AbandonmentPredictor service in Flutter")
+        print(f"   3. (Optional) Create GitHub release with model files")
     print("=" * 60)
-    print()
+
+
+def train_baseline(args):
+    """Load (or stream) the data and fit the sklearn baseline; returns (model, scaler, accuracy, split)."""
+    if args.streaming:
+        data_path = args.data or default_data_path()
+        if not os.path.exists(data_path):
+            print(f"❌ Error: {os.path.basename(data_path)} not found")
+            print("   Run export_firestore_data.py first to generate training data")
+            sys.exit(1)
+        features = feature_columns(args.feature_set)
+        if needs_derived(features) and not is_materialized(data_path, features):
+            print(f"❌ Error: feature set {args.feature_set} cannot be derived while streaming")
+            print(f"   Run build_features.py --feature-set {args.feature_set} and pass its output as --data")
+            sys.exit(1)
+        print(f"📥 Streaming training data from {data_path} (feature set {args.feature_set})...")
+        
+        sklearn_model, scaler, sklearn_accuracy = train_sklearn_streaming(data_path, args.chunk_rows,
+                                                                          features=features)
+        return sklearn_model, scaler, sklearn_accuracy, None
     
     # Load data
-    X, y, feature_cols = load_training_data()
+    X, y, feature_cols = load_training_data(args.data, args.feature_set)
     
     # Split data
-    X_train, X_test, y_train, y_test = train_test_split(
-        X, y, test_size=0.2, random_state=42, stratify=y
-    )
+    split = split_arrays(X, y)
+    X_train, X_test, y_train, y_test = split
     
     print(f"\n📊 Data split:")
     print(f"   Training: {len(X_train)} samples")
@@ -207,32 +1182,213 @@ def main():
     sklearn_model, scaler, sklearn_accuracy = train_sklearn_model(
         X_train, X_test, y_train, y_test
     )
+    return sklearn_model, scaler, sklearn_accuracy, split
+
+
+def run_validate(args):
+    return 0 if validate_data(args.data, args.chunk_rows) else 1
+
+
+def run_baseline(args):
+    sklearn_model, scaler, sklearn_accuracy, _ = train_baseline(args)
+    save_baseline(sklearn_model, scaler, sklearn_accuracy, args.feature_set)
+    print_summary("Baseline Complete!", sklearn_accuracy,
+                  output_files=[os.path.join(MODELS_DIR, 'baseline.joblib')])
+    return 0
+
+
+def run_train(args):
+    train_key, export_key = run_cache_keys(args)
+    if train_key and restore_cached_run(args, train_key, export_key):
+        return 0
+    
+    sklearn_model, scaler, sklearn_accuracy, split = train_baseline(args)
+    save_baseline(sklearn_model, scaler, sklearn_accuracy, args.feature_set)
+    features = feature_columns(args.feature_set)
+    
+    keras_model = keras_accuracy = None
+    if args.export != 'logistic':
+        if args.streaming:
+            data_path = args.data or default_data_path()
+            keras_model = create_keras_model(sklearn_model, scaler, len(features))
+            keras_model, keras_accuracy = train_keras_streaming(keras_model, data_path, scaler, args.chunk_rows,
+                                                                args.batch_size, features)
+        else:
+            X_train, X_test, y_train, y_test = split
+            if args.compare_pipelines:
+                compare_input_pipelines(sklearn_model, scaler, X_train, y_train)
+            
+            architecture = {}
+            class_weight = None
+            if args.sweep:
+                best = run_sweep(X_train, y_train, args.folds, args.workers, args.recall_target)[0]
+                architecture = {'hidden': best['hidden'], 'l2': best['l2']}
+                if best['class_weight'] == 'balanced':
+                    class_weight = balanced_class_weight(y_train)
+            
+            # Create and train Keras model
+            keras_model = create_keras_model(sklearn_model, scaler, len(features), **architecture)
+            keras_model, keras_accuracy = train_keras_model(
+                keras_model, X_train, X_test, y_train, y_test, scaler,
+                batch_size=args.batch_size, pipeline=args.pipeline, class_weight=class_weight
+            )
+        save_keras(keras_model, scaler, keras_accuracy, args.feature_set)
+    
+    shipped, output_files, size_mb = export_models(
+        args, sklearn_model, scaler, sklearn_accuracy, keras_model, scaler, keras_accuracy, split
+    )
     
-    # Create and train Keras model
-    keras_model = create_keras_model(sklearn_model, scaler, len(feature_cols))
-    keras_model, keras_accuracy = train_keras_model(
-        keras_model, X_train, X_test, y_train, y_test, scaler
+    if train_key:
+        save_run(train_key, saved_model_files(keras_model is not None),
+                 {'sklearn_accuracy': float(sklearn_accuracy),
+                  'keras_accuracy': None if keras_accuracy is None else float(keras_accuracy),
+                  'feature_set': args.feature_set})
+        save_export(train_key, export_key, output_files, {'shipped': shipped, 'size_mb': size_mb})
+        print(f"\n🗄️  Run cached as {train_key}")
+    
+    print_summary("Training Complete!", sklearn_accuracy, keras_accuracy, shipped, output_files, size_mb)
+    return 0
+
+
+def export_saved_models(args):
+    """Export the models saved in MODELS_DIR.
+
+    Returns (sklearn accuracy, keras accuracy, shipped, output files, TFLite MB), or None on error.
+    """
+    sklearn_model, scaler, sklearn_accuracy, feature_set = load_baseline()
+    args.feature_set = feature_set   # quantization data and exported metadata follow the saved models
+    problem = unsupported_feature_set(args)
+    if problem:
+        print(f"❌ Error: {problem}")
+        return None
+    keras_model = keras_scaler = keras_accuracy = None
+    if args.export != 'logistic':
+        keras_model, keras_scaler, keras_accuracy, keras_feature_set = load_keras()
+        if keras_model is None and args.export == 'tflite':
+            print("❌ Error: no trained Keras model; run the train command first")
+            return None
+        if keras_model is not None and keras_feature_set != args.feature_set:
+            print(f"❌ Error: the saved Keras model uses feature set {keras_feature_set}, the baseline "
+                  f"{args.feature_set}; run the train command again")
+            return None
+    
+    shipped, output_files, size_mb = export_models(
+        args, sklearn_model, scaler, sklearn_accuracy, keras_model, keras_scaler, keras_accuracy
     )
+    return sklearn_accuracy, keras_accuracy, shipped, output_files, size_mb
+
+
+def run_export(args):
+    result = export_saved_models(args)
+    if result is None:
+        return 1
+    print_summary("Export Complete!", *result)
+    return 0
+
+
+COMMANDS = {
+    'validate': run_validate,
+    'baseline': run_baseline,
+    'train': run_train,
+    'export': run_export,
+}
+
+
+def report_resources(command, started):
+    """Print startup time (module import to command start), run time and peak RSS."""
+    finished = time.perf_counter()
+    line = f"\n📏 {command}: startup {started - _IMPORT_STARTED:.2f}s, run {finished - started:.2f}s"
+    if resource is not None:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        peak_mb = peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024   # bytes vs KB
+        line += f", peak RSS {peak_mb:.0f} MB"
+    line += f", TensorFlow {'loaded' if 'tensorflow' in sys.modules else 'not loaded'}"
+    print(line)
+
+
+def build_parser():
+    data_args = argparse.ArgumentParser(add_help=False)
+    data_args.add_argument('--data', default=None,
+                           help='Store directory or CSV (default: data/training_store, else data/training_data.csv)')
+    data_args.add_argument('--streaming', action='store_true',
+                           help='Out-of-core training: stream the data in chunks instead of loading it')
+    data_args.add_argument('--chunk-rows', type=int, default=STREAM_CHUNK_ROWS,
+                           help='Rows per chunk in --streaming mode')
+    data_args.add_argument('--feature-set', choices=sorted(FEATURE_SETS), default=DEFAULT_FEATURE_SET,
+                           help='Registered feature set to train on (export uses the one saved with the models)')
     
-    # Export to TFLite
-    tflite_path, scaler_path, size_mb = export_tflite(keras_model, scaler)
+    export_args = argparse.ArgumentParser(add_help=False)
+    export_args.add_argument('--export', choices=['auto', 'tflite', 'logistic'], default='auto',
+                             help='Shipped model: logistic JSON, Keras TFLite, or logistic when within --tolerance')
+    export_args.add_argument('--tolerance', type=float, default=LOGISTIC_TOLERANCE,
+                             help='Max accuracy (fraction) the logistic model may trail Keras by in auto mode')
+    export_args.add_argument('--int8', action='store_true',
+                             help='Also export a full-integer int8 model and compare it with the float one')
+    export_args.add_argument('--no-fold-scaler', action='store_true',
+                             help='Export the model without the scaler folded in (app must normalize features)')
+    export_args.add_argument('--allow-feature-set', action='store_true',
+                             help=f'Export models of a feature set other than {DEFAULT_FEATURE_SET} into the app '
+                                  f'assets (the app cannot feed them)')
     
-    # Summary
-    print("\n" + "=" * 60)
-    print("Training Complete!")
+    parser = argparse.ArgumentParser(
+        description="Train the habit abandonment predictor",
+        epilog="Without a command, train runs (python train_model.py [train options]).",
+    )
+    commands = parser.add_subparsers(dest='command', metavar='{validate,baseline,train,export}')
+    commands.add_parser('validate', parents=[data_args],
+                        help='Check the training data against the export validation rules')
+    commands.add_parser('baseline', parents=[data_args],
+                        help='Train and save the sklearn baseline only (never imports TensorFlow)')
+    commands.add_parser('export', parents=[data_args, export_args],
+                        help='Export the models saved by baseline/train without retraining')
+    
+    train = commands.add_parser('train', parents=[data_args, export_args],
+                                help='Train the baseline and Keras models, save and export them (default)')
+    train.add_argument('--batch-size', type=int, default=32, help='Keras training batch size')
+    train.add_argument('--pipeline', choices=['tf.data', 'numpy'], default='tf.data',
+                       help='Keras input pipeline (numpy = original host-side scaling path)')
+    train.add_argument('--compare-pipelines', action='store_true',
+                       help='Also time epochs of the numpy and tf.data pipelines at several batch sizes')
+    train.add_argument('--sweep', action='store_true',
+                       help='Cross-validate a grid of architectures/regularization/class weights and export the winner')
+    train.add_argument('--folds', type=int, default=SWEEP_FOLDS, help='Stratified CV folds in --sweep mode')
+    train.add_argument('--workers', type=int, default=None, help='Sweep worker processes (default: CPU count)')
+    train.add_argument('--recall-target', type=float, default=RECALL_TARGET,
+                       help='Recall on abandoned habits the sweep winner must reach')
+    train.add_argument('--no-cache', action='store_true',
+                       help='Retrain even when this data and config are in the run cache (data/cache/), '
+                            'and do not cache the run')
+    return parser, {'train': train}
+
+
+def main(argv=None):
+    """Main execution function."""
+    argv = sys.argv[1:] if argv is None else list(argv)
+    # Bare `train_model.py [options]` keeps running the full training pipeline
+    if not argv or (argv[0] not in COMMANDS and argv[0] not in ('-h', '--help')):
+        argv = ['train'] + argv
+    parser, subparsers = build_parser()
+    args = parser.parse_args(argv)
+    
+    if args.command == 'train':
+        train = subparsers['train']
+        if args.sweep and args.streaming:
+            train.error('--sweep needs the data in memory and cannot be combined with --streaming')
+        if args.export == 'logistic' and (args.sweep or args.int8 or args.compare_pipelines):
+            train.error('--sweep, --int8 and --compare-pipelines need the Keras model (not --export logistic)')
+        problem = unsupported_feature_set(args)
+        if problem:
+            train.error(f"{problem} (the baseline command trains without exporting)")
+    
+    started = time.perf_counter()
     print("=" * 60)
-    print(f"\n✅ Model Performance:")
-    print(f"   - Sklearn accuracy: {sklearn_accuracy:.2%}")
-    print(f"   - Keras accuracy: {keras_accuracy:.2%}")
-    print(f"   - TFLite size: {size_mb:.2f} MB")
-    print(f"\n📁 Output files:")
-    print(f"   - {tflite_path}")
-    print(f"   - {scaler_path}")
-    print(f"\n🚀 Next steps:")
-    print(f"   1. Add both files to pubspec.yaml assets")
-    print(f"   2. Integrate AbandonmentPredictor service in Flutter")
-    print(f"   3. (Optional) Create GitHub release with model files")
+    print(f"ML Model Training Pipeline: {args.command}")
     print("=" * 60)
+    print()
+    
+    status = COMMANDS[args.command](args)
+    report_resources(args.command, started)
+    sys.exit(status)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+"""
+Columnar training data store shared by the exporter and the trainer.
+
+Layout (Hive-style partitions, one part file per exported page):
+    data/training_store/
+        _manifest.json
+        export_date=2024-05-01/part-<run>-00001.parquet
+        export_date=2024-05-02/part-<run>-00001.parquet
+
+Columns are written with explicit compact dtypes so reads skip text
+parsing and dtype inference. Older CSV parts and a flat CSV file are
+still readable.
+"""
+
+import glob
+import os
+
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+
+FEATURES = ['hourOfDay', 'dayOfWeek', 'streakAtTime', 'failuresLast7Days', 'hoursFromReminder']
+LABEL = 'abandoned'
+ID_COLUMN = 'docId'
+
+# Explicit on-disk dtypes (ranges come from CompletionRecord in the app)
+SCHEMA = {
+    ID_COLUMN: 'string',
+    'hourOfDay': np.uint8,          # 0-23
+    'dayOfWeek': np.uint8,          # 1-7 (DateTime.weekday)
+    'streakAtTime': np.uint16,      # days
+    'failuresLast7Days': np.uint8,  # 0-7
+    'hoursFromReminder': np.float32,
+    LABEL: np.bool_,
+}
+
+# Nullable stand-ins for columns with missing values, so validate_data() can report them
+NULLABLE = {np.uint8: 'UInt8', np.uint16: 'UInt16', np.bool_: 'boolean'}
+
+PART_FORMATS = ('parquet', 'csv')
+
+# Validation rules applied per page, in order; a rejected row is counted under its first failing rule
+VALID_RANGES = {
+    'hourOfDay': (0, 23),
+    'dayOfWeek': (1, 7),           # Dart DateTime.weekday: Monday=1 .. Sunday=7
+    'streakAtTime': (0, None),
+    'failuresLast7Days': (0, None),
+}
+
+
+def validate_page(columns):
+    """Vectorized validation of one page of raw feature columns.
+
+    columns maps each feature to a float array (NaN where the field was
+    missing). Returns (boolean keep mask, {reason: rejected row count}).
+    """
+    n = len(next(iter(columns.values())))
+    keep = np.ones(n, dtype=bool)
+    rejected = {}
+
+    def reject(reason, bad):
+        newly = bad & keep
+        count = int(newly.sum())
+        if count:
+            rejected[reason] = rejected.get(reason, 0) + count
+            keep[newly] = False
+
+    for feature in FEATURES:
+        reject(f'missing_{feature}', np.isnan(columns[feature]))
+    for feature, (low, high) in VALID_RANGES.items():
+        values = columns[feature]
+        with np.errstate(invalid='ignore'):
+            bad = values < low
+            if high is not None:
+                bad |= values > high
+        reject(f'{feature}_out_of_range', bad)
+
+    return keep, rejected
+
+
+def compact_frame(df):
+    """Cast a frame to the store schema (columns not in the schema are kept as-is).
+
+    A column with missing values gets the nullable version of its dtype.
+    """
+    dtypes = {}
+    for col, dtype in SCHEMA.items():
+        if col in df.columns:
+            dtypes[col] = NULLABLE.get(dtype, dtype) if df[col].isna().any() else dtype
+    return df.astype(dtypes)
+
+
+def _csv_dtypes(columns):
+    return {c: NULLABLE.get(SCHEMA[c], SCHEMA[c]) for c in columns or SCHEMA if c in SCHEMA}
+
+
+def write_part(df, path):
+    """Write one part file; the format follows the extension (.parquet or .csv)."""
+    df = compact_frame(df)
+    if path.endswith('.parquet'):
+        df.to_parquet(path, index=False)
+    else:
+        df.to_csv(path, index=False)
+
+
+def list_parts(store_dir):
+    """All part files under the store's export_date=* partitions, oldest partition first."""
+    parts = []
+    for fmt in PART_FORMATS:
+        parts.extend(glob.glob(os.path.join(store_dir, 'export_date=*', f'part-*.{fmt}')))
+    return sorted(parts)
+
+
+def _read_part(path, columns):
+    if path.endswith('.parquet'):
+        return pd.read_parquet(path, columns=columns)
+    return pd.read_csv(path, usecols=columns, dtype=_csv_dtypes(columns))
+
+
+def read_dataset(path, columns=None):
+    """Load a store directory, a single part file or a flat CSV.
+
+    columns projects the read (only those columns are decoded). Rows from a
+    store are deduplicated by doc id, keeping the most recently exported
+    copy; the id column is read for that even when not requested.
+    """
+    if os.path.isdir(path):
+        parts = list_parts(path)
+    else:
+        parts = [path]
+    if not parts:
+        return pd.DataFrame(columns=columns or list(SCHEMA))
+
+    read_cols = None if columns is None else list(columns)
+    dedup = os.path.isdir(path)
+    if dedup and read_cols is not None and ID_COLUMN not in read_cols:
+        read_cols.append(ID_COLUMN)
+
+    frames = []
+    for part in parts:
+        try:
+            frames.append(_read_part(part, read_cols))
+        except (ValueError, KeyError):
+            if columns is None or ID_COLUMN in columns:
+                raise
+            # Part predates the id column: nothing to dedup on
+            frames.append(_read_part(part, list(columns)))
+    df = compact_frame(pd.concat(frames, ignore_index=True))
+
+    if dedup and ID_COLUMN in df.columns:
+        # Rows keep their store order, the order iter_batches() streams them in
+        df = df[~(df[ID_COLUMN].notna() & df.duplicated(subset=ID_COLUMN, keep='last'))]
+    if columns is not None:
+        df = df[list(columns)]
+    return df.reset_index(drop=True)
+
+
+def _superseded_rows(parts):
+    """Per part index, positions of rows whose doc id has a later copy (read_dataset() keeps the last)."""
+    frames = []
+    for index, part in enumerate(parts):
+        try:
+            ids = _read_part(part, [ID_COLUMN])[ID_COLUMN]
+        except (ValueError, KeyError):
+            continue  # Part predates the id column: nothing to dedup on
+        frames.append(pd.DataFrame({'id': ids.to_numpy(), 'part': index, 'row': np.arange(len(ids))}))
+    if not frames:
+        return {}
+    ids = pd.concat(frames, ignore_index=True)
+    stale = ids[ids['id'].notna() & ids.duplicated(subset='id', keep='last')]
+    return {index: rows['row'].to_numpy() for index, rows in stale.groupby('part')}
+
+
+def iter_batches(path, columns=None, batch_rows=65536):
+    """Stream a store directory, part file or CSV as DataFrames of at most batch_rows rows.
+
+    Rows from a store are deduplicated by doc id like read_dataset(),
+    keeping the most recently exported copy, so both readers see the same
+    rows: the delta export's lookback can store a document again when it
+    changed after being exported. Finding the duplicates takes one pass over
+    the id column only; memory otherwise stays bounded by batch_rows.
+    """
+    if os.path.isdir(path):
+        parts = list_parts(path)
+        superseded = _superseded_rows(parts)
+    else:
+        parts, superseded = [path], {}
+    for index, part in enumerate(parts):
+        if part.endswith('.parquet'):
+            batches = (batch.to_pandas() for batch in
+                       pq.ParquetFile(part).iter_batches(batch_size=batch_rows, columns=columns))
+        else:
+            batches = pd.read_csv(part, usecols=columns, dtype=_csv_dtypes(columns), chunksize=batch_rows)
+        start = 0
+        for batch in batches:
+            if index in superseded:
+                rows = np.arange(start, start + len(batch))
+                start += len(batch)
+                batch = batch[~np.isin(rows, superseded[index])].reset_index(drop=True)
+                if not len(batch):
+                    continue
+            yield compact_frame(batch)
+
+
+def store_summary(store_dir):
+    """(partitions, part files, bytes on disk) for a store directory."""
+    parts = list_parts(store_dir)
+    partitions = {os.path.basename(os.path.dirname(p)) for p in parts}
+    return len(partitions), len(parts), sum(os.path.getsize(p) for p in parts)
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark for HabitSelector._smart_select
+Compares the heap-based per-category top-k against the previous
+sort-and-rescan implementation on the real catalog and a synthetic one
+"""
+
+import argparse
+import logging
+import random
+import time
+from typing import Dict, List, Tuple
+
+from generate_templates_v2 import HabitSelector, HabitScorer, enumerate_profile_space
+from habit_catalog import get_habits_for_intent
+from habit_records import Habit
+
+CATEGORIES = ["spiritual", "physical", "mental", "relational"]
+
+def legacy_smart_select(scored_habits: List[Tuple[float, Dict]], profile: Dict, count: int) -> List[Dict]:
+    """Previous implementation: full sort, then one list comprehension per category"""
+    scored_habits = sorted(scored_habits, reverse=True, key=lambda x: x[0])
+    intent = profile.get("intent")
+    selected = []
+    used_ids = set()
+    needs_relational = profile.get("supportLevel") == "weak"
+
+    def take(category, k):
+        return [h for s, h in scored_habits if h["category"] == category and h["id"] not in used_ids][:k]
+
+    if intent == "faithBased":
+        spiritual = take("spiritual", count - 1 if needs_relational else count)
+        selected.extend(spiritual)
+        used_ids.update(h["id"] for h in spiritual)
+    elif intent == "wellness":
+        selected.extend(take("physical", 2 if needs_relational else 3))
+        selected.extend(take("mental", 2))
+        used_ids.update(h["id"] for h in selected)
+    else:
+        selected.extend(take("spiritual", 2 if needs_relational else 3))
+        selected.extend(take("physical", 2))
+        selected.extend(take("mental", 1))
+        used_ids.update(h["id"] for h in selected)
+
+    if needs_relational and len(selected) < count:
+        selected.extend(take("relational", 1))
+
+    return selected[:count]
+
+def synthetic_catalog(size: int, seed: int = 42) -> List[Dict]:
+    """Random habits with integer priorities (plenty of score ties)"""
+    rng = random.Random(seed)
+    motivations = ["closerToGod", "understandBible", "prayerDiscipline", "overcomeHabits", "growInFaith",
+                   "timeManagement", "physicalHealth", "reduceStress", "productivity", "betterSleep"]
+    challenges = ["lackOfTime", "lackOfMotivation", "dontKnowStart", "givingUp"]
+    return [
+        {
+            "id": f"syn{i:05d}",
+            "nameKey": f"synthetic_{i}",
+            "category": rng.choice(CATEGORIES),
+            "emoji": "⭐",
+            "base_duration": rng.choice([5, 10, 15, 30]),
+            "priority": rng.randint(50, 100),
+            "motivation_match": rng.sample(motivations, 2),
+            "challenge_fit": {c: rng.choice([0.5, 0.7, 0.9, 1.0]) for c in challenges},
+            "support_boost": {"weak": 1.2} if rng.random() < 0.2 else {},
+        }
+        for i in range(size)
+    ]
+
+def bench(fn, cases, repeat: int) -> float:
+    """Mean seconds per call of fn over all (scored, profile, count) cases"""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for scored, profile, count in cases:
+            fn(scored, profile, count)
+    return (time.perf_counter() - start) / (repeat * len(cases))
+
+def run(cases, label: str, repeat: int):
+    """cases: (dict scored, record scored, profile, count); legacy uses dicts, current uses records"""
+    selector = HabitSelector.__new__(HabitSelector)
+    legacy_cases = [(dicts, profile, count) for dicts, _, profile, count in cases]
+    record_cases = [(records, profile, count) for _, records, profile, count in cases]
+
+    for (dicts, profile, count), (records, _, _) in zip(legacy_cases, record_cases):
+        expected = [h["id"] for h in legacy_smart_select(dicts, profile, count)]
+        assert [h.id for h in selector._smart_select(records, profile, count)] == expected, \
+            f"Selection differs for {profile}"
+
+    before = bench(legacy_smart_select, legacy_cases, repeat)
+    after = bench(selector._smart_select, record_cases, repeat)
+    print(f"{label:28s} before {before * 1e6:9.1f}µs  after {after * 1e6:9.1f}µs  ({before / after:.1f}x)")
+
+def scored_case(pool, profile):
+    dicts = [(HabitScorer.score_habit(h, profile), h) for h in pool]
+    records = [(score, Habit.from_dict(h)) for score, h in dicts]
+    count = 5 if profile.get("supportLevel") != "weak" else 6
+    return dicts, records, profile, count
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark habit selection latency")
+    parser.add_argument('--profiles', type=int, default=200, help='Profiles sampled from the profile space')
+    parser.add_argument('--synthetic-size', type=int, default=10000, help='Habits in the synthetic catalog')
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+
+    rng = random.Random(0)
+    profiles = rng.sample(enumerate_profile_space(), args.profiles)
+
+    catalog_cases = [
+        scored_case(HabitScorer.filter_by_maturity(get_habits_for_intent(p["intent"]), p.get("maturity")), p)
+        for p in profiles
+    ]
+
+    synthetic = synthetic_catalog(args.synthetic_size)
+    synthetic_cases = [scored_case(synthetic, p) for p in profiles[:20]]
+
+    print("Per-profile _smart_select latency")
+    run(catalog_cases, "45-habit catalog", repeat=20)
+    run(synthetic_cases, f"{args.synthetic_size}-habit synthetic", repeat=3)
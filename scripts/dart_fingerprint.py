@@ -0,0 +1,103 @@
+# dart_fingerprint.py
+# In-process port of Dart's String.hashCode (Dart VM) used for template fingerprints
+# Single source of truth: generator, verifiers and tests all hash through here
+
+import os
+import subprocess
+import tempfile
+from typing import Dict, Iterable, List
+
+# Dart VM stores string hashes in 30 bits (String::kHashBits)
+DART_HASH_BITS = 30
+DART_HASH_MASK = (1 << DART_HASH_BITS) - 1
+_UINT32 = 0xFFFFFFFF
+
+def dart_string_hash(s: str) -> int:
+    """Compute Dart's String.hashCode for s
+
+    Mirrors the Dart VM: Jenkins one-at-a-time over UTF-16 code units with
+    uint32 arithmetic, finalized and masked to 30 bits. A zero hash is
+    reported as 1, exactly like the VM.
+    """
+    h = 0
+    data = s.encode("utf-16-le")
+    for i in range(0, len(data), 2):
+        h = (h + (data[i] | (data[i + 1] << 8))) & _UINT32
+        h = (h + (h << 10)) & _UINT32
+        h ^= h >> 6
+    h = (h + (h << 3)) & _UINT32
+    h ^= h >> 11
+    h = (h + (h << 15)) & _UINT32
+    h &= DART_HASH_MASK
+    return h or 1
+
+def fingerprint_key(profile: Dict) -> str:
+    """Build the string hashed by OnboardingProfile.cacheFingerprint
+
+    CRITICAL: Must match onboarding_models.dart:
+    final key = '${primaryIntent.name}_${spiritualMaturity ?? ''}_${motivations.join('_')}_$challenge';
+    """
+    intent = profile["intent"]
+    maturity = profile.get("maturity") or ""  # Empty string for wellness (no maturity), handle None
+    # DO NOT sort motivations (Dart doesn't sort)
+    motivations = "_".join(profile["motivations"])
+    challenge = profile["challenge"]
+
+    return f"{intent}_{maturity}_{motivations}_{challenge}"
+
+def fingerprint(profile: Dict) -> str:
+    """Cache fingerprint for a profile, as Dart's cacheFingerprint returns it"""
+    return str(dart_string_hash(fingerprint_key(profile)))
+
+def _dart_literal(key: str) -> str:
+    """Quote key as a raw Dart string literal"""
+    if "'" in key or "\n" in key:
+        raise ValueError(f"Key cannot be embedded in a Dart literal: {key!r}")
+    return f"r'{key}'"
+
+def dart_hash_codes(keys: Iterable[str], dart: str = "dart") -> List[int]:
+    """Ask the real Dart runtime for the hashCode of every key in ONE run
+
+    Emits a single program listing all keys, so the VM starts once no matter
+    how many keys are checked. Used only for cross-checking the Python port.
+    """
+    keys = list(keys)
+    if not keys:
+        return []
+
+    literals = ",\n  ".join(_dart_literal(k) for k in keys)
+    dart_code = (
+        f"const keys = <String>[\n  {literals}\n];\n"
+        "void main() { for (final k in keys) { print(k.hashCode); } }\n"
+    )
+
+    with tempfile.NamedTemporaryFile(mode='w', suffix='.dart', delete=False) as f:
+        f.write(dart_code)
+        temp_path = f.name
+
+    try:
+        result = subprocess.run(
+            [dart, temp_path],
+            capture_output=True,
+            text=True
+        )
+
+        if result.returncode != 0:
+            raise RuntimeError(f"Dart hashCode calculation failed: {result.stderr}")
+
+        lines = result.stdout.split()
+        if len(lines) != len(keys):
+            raise RuntimeError(f"Dart printed {len(lines)} hashes for {len(keys)} keys")
+        return [int(line) for line in lines]
+    finally:
+        os.unlink(temp_path)
+
+def dart_crosscheck(keys: Iterable[str], dart: str = "dart") -> List[Dict]:
+    """Compare the Python port against the Dart runtime, returning mismatches"""
+    keys = list(keys)
+    mismatches = []
+    for key, dart_hash in zip(keys, dart_hash_codes(keys, dart=dart)):
+        python_hash = dart_string_hash(key)
+        if python_hash != dart_hash:
+            mismatches.append({"key": key, "python": python_hash, "dart": dart_hash})
+    return mismatches
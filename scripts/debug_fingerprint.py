@@ -1,6 +1,7 @@
 #!/usr/bin/env python3
 import json
 import sys
+from dart_fingerprint import dart_string_hash
 
 # Read one template
 with open('habit_templates_v2/1689162142.json', 'r') as f:
@@ -16,18 +17,8 @@ challenge = profile['challenge']
 
 key = f"{intent}_{maturity}_{motivations}_{challenge}"
 
-# Calculate Jenkins hash
-h = 0
-for char in key:
-    h = (h + ord(char)) & 0xFFFFFFFF
-    h = (h + (h << 10)) & 0xFFFFFFFF
-    h = (h ^ (h >> 6)) & 0xFFFFFFFF
-h = (h + (h << 3)) & 0xFFFFFFFF
-h = (h ^ (h >> 11)) & 0xFFFFFFFF
-h = (h + (h << 15)) & 0xFFFFFFFF
-
-if h >= 0x80000000:
-    h = h - 0x100000000
+# Calculate Jenkins hash (shared Dart String.hashCode engine)
+h = dart_string_hash(key)
 
 # Write results to file
 with open('fingerprint_debug.txt', 'w') as f:
@@ -5,10 +5,19 @@
 import json
 import os
 import logging
-from typing import List, Dict, Tuple, Optional
-from habit_catalog import HABIT_CATALOG, get_habits_for_intent
+from typing import Callable, List, Dict, Tuple, Optional
+from habit_catalog import HABIT_CATALOG, CATALOG_INDEX, CatalogIndex, on_catalog_change
+from habit_records import Habit, encode_profile
+from template_bundle import pack_directory
+from dart_fingerprint import fingerprint, fingerprint_key, dart_crosscheck, dart_hash_codes
 import hashlib
 import argparse
+import time
+import heapq
+from functools import lru_cache
+from operator import itemgetter
+from itertools import combinations, permutations, product
+from concurrent.futures import ProcessPoolExecutor
 
 # Configure logging
 logging.basicConfig(
@@ -99,6 +108,47 @@ TEMPLATE_MATRIX = {
     ]
 }
 
+# ==================== PROFILE SPACE ====================
+# Every answer the adaptive onboarding can produce (onboarding_questions.dart).
+# Mirrors the value sets in generate_habit_templates.py, which cannot be
+# imported without an API key and an interactive prompt.
+
+FAITH_MOTIVATIONS = ["closerToGod", "understandBible", "prayerDiscipline", "overcomeHabits", "growInFaith"]
+FAITH_MATURITY = ["new", "growing", "mature", "passionate"]
+WELLNESS_GOALS = ["timeManagement", "physicalHealth", "reduceStress", "productivity", "betterSleep"]
+CHALLENGES = ["lackOfTime", "lackOfMotivation", "dontKnowStart", "givingUp"]
+# cacheFingerprint ignores supportLevel, so profiles differing only here share
+# a template file; --all-profiles writes one chosen level (--support-level)
+SUPPORT_LEVELS = ["normal", "weak", "strong"]
+DEFAULT_SUPPORT_LEVEL = "normal"
+MAX_MOTIVATIONS = 3  # maxSelections on each multi-choice question
+
+def _motivation_selections(options: List[str], all_orders: bool) -> List[List[str]]:
+    """1..MAX_MOTIVATIONS selections from options
+
+    Subsets keep the on-screen option order; all_orders adds every tap order,
+    since Dart joins motivations in the order they were selected.
+    """
+    pick = permutations if all_orders else combinations
+    return [list(sel) for n in range(1, MAX_MOTIVATIONS + 1) for sel in pick(options, n)]
+
+def enumerate_profile_space(all_orders: bool = False) -> List[Dict]:
+    """Every valid intent x maturity x motivations x challenge x supportLevel profile"""
+    faith = _motivation_selections(FAITH_MOTIVATIONS, all_orders)
+    wellness = _motivation_selections(WELLNESS_GOALS, all_orders)
+
+    profiles = []
+    for motivations, maturity, challenge, support in product(faith, FAITH_MATURITY, CHALLENGES, SUPPORT_LEVELS):
+        profiles.append({"intent": "faithBased", "maturity": maturity, "motivations": motivations,
+                         "challenge": challenge, "supportLevel": support})
+    for motivations, challenge, support in product(wellness, CHALLENGES, SUPPORT_LEVELS):
+        profiles.append({"intent": "wellness", "motivations": motivations,
+                         "challenge": challenge, "supportLevel": support})
+    for spiritual, goals, maturity, challenge, support in product(faith, wellness, FAITH_MATURITY, CHALLENGES, SUPPORT_LEVELS):
+        profiles.append({"intent": "both", "maturity": maturity, "motivations": spiritual + goals,
+                         "challenge": challenge, "supportLevel": support})
+    return profiles
+
 # ==================== SCORING ENGINE ====================
 
 class HabitScorer:
@@ -127,6 +177,28 @@ class HabitScorer:
 
         return score
 
+    @staticmethod
+    def score_record(habit: Habit, codes: Tuple[Tuple[int, ...], int, bool]) -> float:
+        """score_habit for a Habit record and an encode_profile() result
+
+        Same arithmetic in the same order, with tuple indexing and bit tests
+        instead of list scans and dict lookups.
+        """
+        motivation_bits, challenge, weak = codes
+        score = habit.priority
+
+        mask = habit.motivation_mask
+        for bit in motivation_bits:
+            if mask & bit:
+                score += 20
+
+        score *= habit.challenge_fit[challenge]
+
+        if weak:
+            score *= habit.weak_boost
+
+        return score
+
     @staticmethod
     def filter_by_maturity(habits: List[Dict], maturity: Optional[str]) -> List[Dict]:
         """Filter habits that are appropriate for maturity level"""
@@ -147,112 +219,167 @@ class HabitScorer:
 class HabitSelector:
     """Selects optimal habits for a profile"""
 
-    def __init__(self, catalog: Dict):
+    def __init__(self, catalog: Dict, compiled: bool = False, cache_size: Optional[int] = 4096):
         self.catalog = catalog
+        self.index = CATALOG_INDEX if catalog is HABIT_CATALOG else CatalogIndex(catalog)
         self.scorer = HabitScorer()
+        # Compiled mode scores through NumPy arrays (optional dependency)
+        self.compiled = None
+        if compiled:
+            from score_matrix import CompiledHabitScorer
+            self.compiled = CompiledHabitScorer(catalog)
+
+        # Memoized selections keyed by profile_key(); cache_size=0 disables
+        self._select_cached = lru_cache(maxsize=cache_size)(self._select_for_key)
+        if catalog is HABIT_CATALOG:
+            on_catalog_change(self.invalidate)
+
+    @staticmethod
+    def profile_key(profile: Dict, count: int) -> Tuple:
+        """Canonical cache key: every field selection depends on, with defaults applied
+
+        Motivations are sorted because scoring only counts matches, so tap
+        order never changes the selected habits.
+        """
+        return (
+            profile.get("intent"),
+            profile.get("maturity"),
+            tuple(sorted(profile.get("motivations", []))),
+            profile.get("challenge", "dontKnowStart"),
+            profile.get("supportLevel", "normal"),
+            count,
+        )
 
     def select_habits(self, profile: Dict, count: int = 5) -> List[Dict]:
-        """Main selection pipeline"""
+        """Main selection pipeline (memoized on profile_key)
+
+        The cache holds immutable (Habit, minutes) pairs; every call builds
+        new dicts, so callers may mutate the result (nested lists included).
+        """
+        cached = self._select_cached(self.profile_key(profile, count))
+        return [dict(habit.to_dict(), target_minutes=minutes) for habit, minutes in cached]
+
+    def cache_stats(self) -> Dict[str, int]:
+        """Hit/miss counters of the selection cache"""
+        info = self._select_cached.cache_info()
+        return {"hits": info.hits, "misses": info.misses, "size": info.currsize}
+
+    def invalidate(self):
+        """Drop cached selections; call after the catalog changed
+
+        Selectors over HABIT_CATALOG are invalidated by
+        habit_catalog.invalidate_catalog() automatically.
+        """
+        if self.index is not CATALOG_INDEX:
+            self.index.rebuild()
+        if self.compiled is not None:
+            self.compiled = type(self.compiled)(self.catalog)
+        self._select_cached.cache_clear()
+
+    def _select_for_key(self, key: Tuple) -> Tuple[Tuple[Habit, int], ...]:
+        intent, maturity, motivations, challenge, support, count = key
+        profile = {"motivations": list(motivations), "challenge": challenge, "supportLevel": support}
+        if intent is not None:
+            profile["intent"] = intent
+        if maturity is not None:
+            profile["maturity"] = maturity
+        return tuple(self._select_uncached(profile, count))
+
+    def _select_uncached(self, profile: Dict, count: int) -> List[Tuple[Habit, int]]:
+        """Selection pipeline without the cache: (habit, target minutes) pairs"""
         intent = profile.get("intent", "faithBased")
         logger.info(f"Selecting habits for intent={intent}, maturity={profile.get('maturity')}, count={count}")
 
-        # Step 1: Get appropriate pool
-        pool = get_habits_for_intent(intent)
-        logger.debug(f"Initial pool size: {len(pool)}")
-
-        # Step 2: Filter by maturity
+        # Step 1-2: Precomputed pool for intent, filtered by maturity
         maturity = profile.get("maturity")
-        filtered = self.scorer.filter_by_maturity(pool, maturity)
-        logger.debug(f"After maturity filter: {len(filtered)}")
+        filtered = self.index.record_pool(intent, maturity)
+        logger.debug(f"Pool size after maturity filter: {len(filtered)}")
 
         # Step 3: Score all habits
-        scored = [(self.scorer.score_habit(h, profile), h) for h in filtered]
-        scored.sort(reverse=True, key=lambda x: x[0])
-        logger.debug(f"Top 3 scored habits: {[(h['id'], s) for s, h in scored[:3]]}")
+        if self.compiled is not None:
+            row = self.compiled.score_profile(profile)
+            scored = [(float(row[self.compiled.index[h.id]]), h) for h in filtered]
+        else:
+            codes = encode_profile(profile)
+            scored = [(self.scorer.score_record(h, codes), h) for h in filtered]
+        if logger.isEnabledFor(logging.DEBUG):
+            top3 = heapq.nlargest(3, scored, key=lambda x: x[0])
+            logger.debug(f"Top 3 scored habits: {[(h.id, s) for s, h in top3]}")
 
         # Step 4: Smart selection by category
         selected = self._smart_select(scored, profile, count)
-        logger.info(f"Selected {len(selected)} habits: {[h['id'] for h in selected]}")
+        logger.info(f"Selected {len(selected)} habits: {[h.id for h in selected]}")
 
         # Step 5: Adjust durations
         adjusted = self._adjust_durations(selected, profile)
 
         return adjusted
 
-    def _smart_select(self, scored_habits: List[Tuple[float, Dict]],
-                      profile: Dict, count: int) -> List[Dict]:
+    @staticmethod
+    def _top_by_category(scored_habits: List[Tuple[float, Habit]],
+                         quotas: Dict[str, int]) -> Dict[str, List[Habit]]:
+        """Top-k habits per category, bucketed in one pass over the scores
+
+        Ties break on position in the pool (catalog order), so selection is
+        stable across runs and identical to a stable descending sort.
+        """
+        buckets = {category: [] for category in quotas}
+        for item in scored_habits:
+            bucket = buckets.get(item[1].category)
+            if bucket is not None:
+                bucket.append(item)
+
+        # nlargest is stable: equal scores keep their pool order
+        return {
+            category: [h for _, h in heapq.nlargest(k, buckets[category], key=itemgetter(0))]
+            for category, k in quotas.items()
+        }
+
+    def _smart_select(self, scored_habits: List[Tuple[float, Habit]],
+                      profile: Dict, count: int) -> List[Habit]:
         """Select habits ensuring category balance"""
         intent = profile.get("intent")
-        selected = []
-        used_ids = set()
+        needs_relational = profile.get("supportLevel") == "weak"
 
         if intent == "faithBased":
             # 4-5 spiritual + 0-1 support (relational if weak support)
-            max_spiritual = count - 1 if profile.get("supportLevel") == "weak" else count
-            spiritual = [h for s, h in scored_habits if h["category"] == "spiritual" and h["id"] not in used_ids][:max_spiritual]
-            selected.extend(spiritual)
-            used_ids.update(h["id"] for h in spiritual)
-
-            # Add relational if weak support
-            if profile.get("supportLevel") == "weak" and len(selected) < count:
-                relational = [h for s, h in scored_habits if h["category"] == "relational" and h["id"] not in used_ids][:1]
-                selected.extend(relational)
-
+            quotas = [("spiritual", count - 1 if needs_relational else count)]
         elif intent == "wellness":
             # 3 physical + 2 mental + (1 relational if weak support)
-            needs_relational = profile.get("supportLevel") == "weak"
-            max_physical = 3 if not needs_relational else 2
-            max_mental = 2 if not needs_relational else 2
-
-            physical = [h for s, h in scored_habits if h["category"] == "physical" and h["id"] not in used_ids][:max_physical]
-            mental = [h for s, h in scored_habits if h["category"] == "mental" and h["id"] not in used_ids][:max_mental]
-            selected.extend(physical)
-            selected.extend(mental)
-            used_ids.update(h["id"] for h in selected)
-
-            if needs_relational and len(selected) < count:
-                relational = [h for s, h in scored_habits if h["category"] == "relational" and h["id"] not in used_ids][:1]
-                selected.extend(relational)
-
+            quotas = [("physical", 2 if needs_relational else 3), ("mental", 2)]
         else:  # both
             # 3 spiritual + 2 physical + 1 mental (+ relational if weak support)
-            needs_relational = profile.get("supportLevel") == "weak"
-            max_spiritual = 3 if not needs_relational else 2
-            max_physical = 2 if not needs_relational else 2
-            max_mental = 1
-
-            spiritual = [h for s, h in scored_habits if h["category"] == "spiritual" and h["id"] not in used_ids][:max_spiritual]
-            physical = [h for s, h in scored_habits if h["category"] == "physical" and h["id"] not in used_ids][:max_physical]
-            mental = [h for s, h in scored_habits if h["category"] == "mental" and h["id"] not in used_ids][:max_mental]
-            selected.extend(spiritual)
-            selected.extend(physical)
-            selected.extend(mental)
-            used_ids.update(h["id"] for h in selected)
-
-            if needs_relational and len(selected) < count:
-                relational = [h for s, h in scored_habits if h["category"] == "relational" and h["id"] not in used_ids][:1]
-                selected.extend(relational)
+            quotas = [("spiritual", 2 if needs_relational else 3), ("physical", 2), ("mental", 1)]
+
+        if needs_relational:
+            quotas.append(("relational", 1))
+
+        top = self._top_by_category(scored_habits, dict(quotas))
+        selected = []
+        for category, _ in quotas:
+            # Relational only fills a remaining slot
+            if category == "relational" and len(selected) >= count:
+                continue
+            selected.extend(top[category])
 
         return selected[:count]
 
-    def _adjust_durations(self, habits: List[Dict], profile: Dict) -> List[Dict]:
+    def _adjust_durations(self, habits: List[Habit], profile: Dict) -> List[Tuple[Habit, int]]:
         """Adjust habit durations based on maturity and challenge"""
         adjusted = []
+        maturity = profile.get("maturity")
+        challenge = profile.get("challenge", "dontKnowStart")
 
         for habit in habits:
-            h = habit.copy()
-            base = h["base_duration"]
+            base = habit.base_duration
 
             # Apply maturity multiplier
-            maturity = profile.get("maturity")
-            if maturity and h.get("maturity_multiplier"):
-                mult = h["maturity_multiplier"].get(maturity, 1.0)
-                duration = int(base * mult)
+            if maturity and habit.maturity_multiplier is not None:
+                duration = int(base * habit.multiplier_for(maturity))
             else:
                 duration = base
 
             # Challenge adjustments
-            challenge = profile.get("challenge", "dontKnowStart")
             if challenge == "lackOfTime":
                 duration = min(duration, 15)  # Max 15 min
             elif challenge == "givingUp":
@@ -260,8 +387,7 @@ class HabitSelector:
             elif challenge == "dontKnowStart":
                 duration = int(duration * 0.7)  # 30% easier
 
-            h["target_minutes"] = max(duration, 5)  # Never less than 5 min
-            adjusted.append(h)
+            adjusted.append((habit, max(duration, 5)))  # Never less than 5 min
 
         return adjusted
 
@@ -277,9 +403,6 @@ def generate_template_id(profile: Dict) -> str:
 
     return f"{intent}_{maturity}_{challenge}_{support}_{motivations}"
 
-import subprocess
-import tempfile
-
 def generate_fingerprint(profile: Dict) -> str:
     """Generate cache fingerprint matching Dart's OnboardingProfile.cacheFingerprint exactly
 
@@ -288,38 +411,21 @@ def generate_fingerprint(profile: Dict) -> str:
       final key = '${primaryIntent.name}_${spiritualMaturity ?? ''}_${motivations.join('_')}_$challenge';
       return key.hashCode.toString();
     }
-    
-    Uses Dart directly to compute the hash to ensure 100% accuracy across Dart versions.
+
+    Computed in-process by dart_fingerprint (no Dart SDK needed); use
+    --dart-crosscheck to confirm against the real runtime.
     """
-    intent = profile["intent"]
-    maturity = profile.get("maturity") or ""  # Empty string for wellness (no maturity), handle None
-    # DO NOT sort motivations (Dart doesn't sort)
-    motivations = "_".join(profile["motivations"])
-    challenge = profile["challenge"]
+    return fingerprint(profile)
 
-    key = f"{intent}_{maturity}_{motivations}_{challenge}"
+def generate_fingerprints(profiles: List[Dict], use_dart: bool = False) -> List[str]:
+    """Fingerprint many profiles at once, in input order
 
-    # Call Dart to get the actual hashCode using a temp file
-    dart_code = f"void main() {{ print('{key}'.hashCode); }}"
-    
-    with tempfile.NamedTemporaryFile(mode='w', suffix='.dart', delete=False) as f:
-        f.write(dart_code)
-        temp_path = f.name
-    
-    try:
-        result = subprocess.run(
-            ['dart', temp_path],
-            capture_output=True,
-            text=True
-        )
-        
-        if result.returncode != 0:
-            raise RuntimeError(f"Dart hashCode calculation failed: {result.stderr}")
-        
-        fingerprint = result.stdout.strip()
-        return fingerprint
-    finally:
-        os.unlink(temp_path)
+    With use_dart, all keys are hashed by the real Dart runtime in exactly one
+    subprocess (for cross-checking); otherwise the in-process engine is used.
+    """
+    if not use_dart:
+        return [fingerprint(p) for p in profiles]
+    return [str(h) for h in dart_hash_codes(fingerprint_key(p) for p in profiles)]
 
 def validate_template(template: Dict) -> bool:
     """Ensure template has required structure and minimum quality"""
@@ -344,9 +450,18 @@ def validate_template(template: Dict) -> bool:
 
     return True
 
+_shared_selector = None
+
+def get_shared_selector() -> HabitSelector:
+    """Process-wide selector, so batch runs share one selection cache"""
+    global _shared_selector
+    if _shared_selector is None:
+        _shared_selector = HabitSelector(HABIT_CATALOG)
+    return _shared_selector
+
 def generate_template(profile: Dict) -> Dict:
     """Generate single template from profile"""
-    selector = HabitSelector(HABIT_CATALOG)
+    selector = get_shared_selector()
 
     # Select habits
     habits = selector.select_habits(profile, count=5 if profile.get("supportLevel") != "weak" else 6)
@@ -381,56 +496,283 @@ def generate_template(profile: Dict) -> Dict:
 
     return template
 
+# ==================== INCREMENTAL BUILD ====================
+
+# Bump whenever selection or template-building logic changes output
+SELECTOR_VERSION = 1
+
+def manifest_path(output_dir: str) -> str:
+    """Manifest lives next to (not inside) the output dir so it never ships as an asset"""
+    return os.path.normpath(output_dir) + ".manifest.json"
+
+def load_manifest(output_dir: str) -> Dict[str, str]:
+    """fingerprint -> input hash of the last build (empty if none)"""
+    try:
+        with open(manifest_path(output_dir), 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+    if manifest.get("selector_version") != SELECTOR_VERSION:
+        return {}
+    return manifest.get("templates", {})
+
+def save_manifest(output_dir: str, templates: Dict[str, str]):
+    """Replace the manifest atomically, so an interrupted write never leaves it truncated"""
+    path = manifest_path(output_dir)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump({"selector_version": SELECTOR_VERSION, "templates": templates}, f, indent=0, sort_keys=True)
+    os.replace(tmp_path, path)
+
+def _pool_digests() -> Callable[[str, Optional[str]], str]:
+    """digest(intent, maturity) of each habit pool a selection can read, computed once per build"""
+    cache = {}
+
+    def digest(intent, maturity):
+        key = (intent, maturity)
+        if key not in cache:
+            pool = CATALOG_INDEX.pool(intent, maturity)
+            payload = json.dumps(list(pool), sort_keys=True, ensure_ascii=False)
+            cache[key] = hashlib.sha1(payload.encode("utf-8")).hexdigest()
+        return cache[key]
+
+    return digest
+
+def profile_input_hash(profile: Dict, pool_digest: Callable[[str, Optional[str]], str]) -> str:
+    """Hash of everything a template depends on: its profile, its habit pool and the selector version"""
+    count = 5 if profile.get("supportLevel") != "weak" else 6
+    key = HabitSelector.profile_key(profile, count)
+    # profile_key sorts motivations; the stored profile and fingerprint keep tap order
+    payload = json.dumps([SELECTOR_VERSION, pool_digest(profile.get("intent", "faithBased"), profile.get("maturity")),
+                          key, profile.get("motivations", [])])
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+def plan_incremental(profiles: List[Dict], output_dir: str,
+                     skip_unchanged: bool = True) -> Tuple[List[Tuple[Dict, str, str]], int, Dict[str, str]]:
+    """Split profiles into those needing a rebuild and those unchanged
+
+    Returns ([(profile, fingerprint, input_hash) to build], skipped, manifest).
+    A template is rebuilt when its input hash changed or its file is missing;
+    with skip_unchanged=False everything is rebuilt (but still hashed, so the
+    manifest stays current for the next incremental run). The manifest is
+    always loaded, so entries of templates outside this run are kept.
+    """
+    manifest = load_manifest(output_dir)
+    existing = set(os.listdir(output_dir)) if skip_unchanged and os.path.isdir(output_dir) else set()
+    pool_digest = _pool_digests()
+
+    to_build = []
+    skipped = 0
+    for profile in profiles:
+        fp = generate_fingerprint(profile)
+        input_hash = profile_input_hash(profile, pool_digest)
+        if manifest.get(fp) == input_hash and f"{fp}.json" in existing:
+            skipped += 1
+        else:
+            to_build.append((profile, fp, input_hash))
+    return to_build, skipped, manifest
+
 # ==================== BATCH GENERATOR ====================
 
-def generate_all_templates(output_dir: str = "habit_templates_v2", max_templates: int = 60):
-    """Generate up to max_templates templates"""
+def generate_all_templates(output_dir: str = "habit_templates_v2", max_templates: int = 60,
+                           dart_crosscheck_keys: bool = False, incremental: bool = False,
+                           bundle_path: Optional[str] = None):
+    """Generate up to max_templates templates
+
+    With dart_crosscheck_keys, every fingerprint key written is re-hashed by
+    the Dart runtime in a single batched run and mismatches count as failures.
+    With incremental, templates whose inputs are unchanged since the last
+    build (see the manifest) are skipped. With bundle_path, the output
+    directory is also packed into a single bundle file (template_bundle.py).
+    """
     os.makedirs(output_dir, exist_ok=True)
     generated = 0
     failed = 0
+    written_keys = []
 
     logger.info(f"Starting template generation (max: {max_templates})")
 
-    for intent, profiles in TEMPLATE_MATRIX.items():
-        for profile in profiles:
-            if generated >= max_templates:
-                break
+    profiles = [dict(p, intent=intent) for intent, ps in TEMPLATE_MATRIX.items() for p in ps][:max_templates]
+    to_build, skipped, manifest = plan_incremental(profiles, output_dir, skip_unchanged=incremental)
 
-            profile["intent"] = intent
+    for profile, fp, input_hash in to_build:
+        try:
+            template = generate_template(profile)
 
-            try:
-                template = generate_template(profile)
+            # Validate template
+            if not validate_template(template):
+                logger.error(f"Validation failed for profile: {profile}")
+                failed += 1
+                continue
 
-                # Validate template
-                if not validate_template(template):
-                    logger.error(f"Validation failed for profile: {profile}")
-                    failed += 1
-                    continue
+            # Save template using fingerprint as filename
+            filename = f"{template['fingerprint']}.json"
+            filepath = os.path.join(output_dir, filename)
 
-                # Save template using fingerprint as filename
-                filename = f"{template['fingerprint']}.json"
-                filepath = os.path.join(output_dir, filename)
+            with open(filepath, 'w', encoding='utf-8') as f:
+                json.dump(template, f, indent=2, ensure_ascii=False)
 
-                with open(filepath, 'w', encoding='utf-8') as f:
-                    json.dump(template, f, indent=2, ensure_ascii=False)
+            generated += 1
+            written_keys.append(fingerprint_key(profile))
+            manifest[fp] = input_hash
+            logger.info(f"✅ [{generated:02d}/{len(to_build)}] {template['template_id']} -> {filename}")
 
-                generated += 1
-                logger.info(f"✅ [{generated:02d}/{max_templates}] {template['template_id']} -> {filename}")
+        except Exception as e:
+            logger.error(f"Failed to generate template for {profile}: {e}")
+            failed += 1
+            continue
 
-            except Exception as e:
-                logger.error(f"Failed to generate template for {profile}: {e}")
-                failed += 1
-                continue
+    save_manifest(output_dir, manifest)
 
-        if generated >= max_templates:
-            break
+    if dart_crosscheck_keys:
+        failed += _crosscheck_keys(written_keys)
 
     # Summary
     total_size = sum(os.path.getsize(os.path.join(output_dir, f)) for f in os.listdir(output_dir)) // 1024
+    cache = get_shared_selector().cache_stats()
     logger.info(f"\n{'='*60}")
     logger.info(f"🎉 Generated {generated} templates in {output_dir}/")
+    if incremental:
+        logger.info(f"⏭️  Skipped (unchanged): {skipped}")
     logger.info(f"❌ Failed: {failed}")
     logger.info(f"📊 Total size: {total_size}KB")
+    logger.info(f"♻️  Selection cache: {cache['hits']} hits, {cache['misses']} misses")
+    if bundle_path:
+        _write_bundle(output_dir, bundle_path)
+    logger.info(f"{'='*60}")
+
+    return generated, failed
+
+def _crosscheck_keys(keys: List[str]) -> int:
+    """Re-hash written fingerprint keys with the Dart runtime (one batched run); returns the mismatch count"""
+    if not keys:
+        return 0
+    mismatches = dart_crosscheck(keys)
+    for mm in mismatches:
+        logger.error(f"Dart mismatch for '{mm['key']}': python={mm['python']} dart={mm['dart']}")
+    logger.info(f"🎯 Dart cross-check: {len(keys) - len(mismatches)}/{len(keys)} keys match")
+    return len(mismatches)
+
+def _existing_template_id(filepath: str) -> Optional[str]:
+    """template_id of the template already at filepath (None if there is none)"""
+    try:
+        with open(filepath, 'r', encoding='utf-8') as f:
+            return json.load(f).get("template_id")
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+def _write_bundle(output_dir: str, bundle_path: str):
+    """Pack output_dir into bundle_path and log the size reduction"""
+    bundle = pack_directory(output_dir, bundle_path)
+    files_size = sum(os.path.getsize(os.path.join(output_dir, f)) for f in os.listdir(output_dir)) // 1024
+    habit_refs = sum(len(row[2]) for row in bundle["templates"])
+    logger.info(f"📦 Bundle: {len(bundle['fingerprints'])} templates, {len(bundle['habits'])} unique of "
+                f"{habit_refs} habit blocks, {files_size}KB -> {os.path.getsize(bundle_path) // 1024}KB ({bundle_path})")
+
+def _quiet_worker():
+    """Silence per-profile selection logs inside pool workers"""
+    logging.getLogger().setLevel(logging.WARNING)
+
+def _generate_or_none(profile: Dict) -> Optional[Dict]:
+    """Pool task: generate and validate one template (None on failure)"""
+    try:
+        template = generate_template(profile)
+    except Exception as e:
+        logger.error(f"Failed to generate template for {profile}: {e}")
+        return None
+    return template if validate_template(template) else None
+
+def generate_profile_space(output_dir: str = "habit_templates_v2", workers: Optional[int] = None,
+                           all_orders: bool = False, chunksize: int = 64, incremental: bool = False,
+                           bundle_path: Optional[str] = None, support_level: str = DEFAULT_SUPPORT_LEVEL,
+                           dart_crosscheck_keys: bool = False):
+    """Generate a template for every reachable onboarding profile
+
+    supportLevel is not part of the fingerprint, so every level maps to the
+    same file: only profiles with support_level are generated, and existing
+    templates replaced by a different profile (e.g. curated weak-support
+    ones) are reported. Profiles are deduplicated by fingerprint key and
+    generated across a process pool. Reports throughput and coverage.
+    With incremental, only templates whose inputs changed are regenerated.
+    With bundle_path, the output directory is also packed into one bundle.
+    With dart_crosscheck_keys, written keys are confirmed against Dart.
+    """
+    if support_level not in SUPPORT_LEVELS:
+        raise ValueError(f"Unknown supportLevel {support_level!r} (expected one of {SUPPORT_LEVELS})")
+    os.makedirs(output_dir, exist_ok=True)
+    start = time.perf_counter()
+
+    profiles = [p for p in enumerate_profile_space(all_orders=all_orders) if p["supportLevel"] == support_level]
+    unique = {}
+    for profile in profiles:
+        unique.setdefault(fingerprint_key(profile), profile)
+
+    logger.info(f"Profile space: {len(profiles)} profiles (supportLevel={support_level}) -> "
+                f"{len(unique)} unique fingerprints")
+
+    to_build, skipped, manifest = plan_incremental(list(unique.values()), output_dir, skip_unchanged=incremental)
+    if incremental:
+        logger.info(f"⏭️  {skipped} unchanged, {len(to_build)} to regenerate")
+
+    generated = 0
+    failed = 0
+    written = {}  # fingerprint -> template_id, to catch 30-bit hash collisions
+    written_keys = []
+    replaced = []  # (filename, previous template_id, new template_id)
+    if not to_build:
+        save_manifest(output_dir, manifest)
+        logger.info(f"✅ Nothing to do ({time.perf_counter() - start:.2f}s)")
+        if bundle_path:
+            _write_bundle(output_dir, bundle_path)
+        return generated, failed
+
+    build_profiles = [profile for profile, _, _ in to_build]
+    with ProcessPoolExecutor(max_workers=workers, initializer=_quiet_worker) as pool:
+        results = pool.map(_generate_or_none, build_profiles, chunksize=chunksize)
+        for (profile, fp, input_hash), template in zip(to_build, results):
+            if template is None:
+                logger.error(f"Validation failed for profile: {profile}")
+                failed += 1
+                continue
+
+            if template["fingerprint"] in written:
+                logger.warning(f"Fingerprint collision {template['fingerprint']}: "
+                               f"{template['template_id']} vs {written[template['fingerprint']]} (skipped)")
+                failed += 1
+                continue
+            written[template["fingerprint"]] = template["template_id"]
+
+            filepath = os.path.join(output_dir, f"{template['fingerprint']}.json")
+            previous = _existing_template_id(filepath)
+            if previous is not None and previous != template["template_id"]:
+                replaced.append((os.path.basename(filepath), previous, template["template_id"]))
+            with open(filepath, 'w', encoding='utf-8') as f:
+                json.dump(template, f, indent=2, ensure_ascii=False)
+            manifest[fp] = input_hash
+            written_keys.append(fingerprint_key(profile))
+            generated += 1
+
+    save_manifest(output_dir, manifest)
+    if replaced:
+        logger.warning(f"⚠️  Replaced {len(replaced)} existing templates built for a different profile:")
+        for filename, previous, template_id in replaced:
+            logger.warning(f"   {filename}: {previous} -> {template_id}")
+    if dart_crosscheck_keys:
+        failed += _crosscheck_keys(written_keys)
+    elapsed = time.perf_counter() - start
+    covered = generated + skipped
+    coverage = covered / len(unique) * 100 if unique else 0.0
+
+    logger.info(f"\n{'='*60}")
+    logger.info(f"🎉 Generated {generated} templates in {output_dir}/")
+    if incremental:
+        logger.info(f"⏭️  Skipped (unchanged): {skipped}")
+    logger.info(f"❌ Failed: {failed}")
+    logger.info(f"🔁 Replaced (different profile): {len(replaced)}")
+    logger.info(f"📈 Coverage: {covered}/{len(unique)} fingerprints ({coverage:.1f}%), {len(profiles)} profiles")
+    logger.info(f"⚡ Throughput: {generated / elapsed:.0f} templates/s ({elapsed:.2f}s)")
+    if bundle_path:
+        _write_bundle(output_dir, bundle_path)
     logger.info(f"{'='*60}")
 
     return generated, failed
@@ -440,7 +782,29 @@ def generate_all_templates(output_dir: str = "habit_templates_v2", max_templates
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Habit Template Generator v2 (Rule-Based)")
     parser.add_argument('--max', type=int, default=60, help='Maximum number of templates to generate (for UAT)')
+    parser.add_argument('--dart-crosscheck', action='store_true',
+                        help='Confirm all fingerprints against the Dart runtime (one batched dart run)')
+    parser.add_argument('--all-profiles', action='store_true',
+                        help='Generate every reachable onboarding profile instead of TEMPLATE_MATRIX')
+    parser.add_argument('--all-orders', action='store_true',
+                        help='With --all-profiles, include every motivation selection order')
+    parser.add_argument('--support-level', choices=SUPPORT_LEVELS, default=None,
+                        help=f'With --all-profiles, the supportLevel to write (default: {DEFAULT_SUPPORT_LEVEL}); '
+                             'levels share a fingerprint, so only one can be stored per profile')
+    parser.add_argument('--workers', type=int, default=None, help='Worker processes for --all-profiles')
+    parser.add_argument('--incremental', action='store_true',
+                        help='Only regenerate templates whose catalog inputs changed since the last build')
+    parser.add_argument('--bundle', metavar='PATH', default=None,
+                        help='Also pack the output into one bundle file (sorted fingerprint index + shared habit table)')
     args = parser.parse_args()
+    if args.support_level and not args.all_profiles:
+        parser.error("--support-level only applies to --all-profiles")
     print("🚀 Habit Template Generator v2 (Rule-Based)")
     print("="*60)
-    generate_all_templates(max_templates=args.max)
+    if args.all_profiles:
+        generate_profile_space(workers=args.workers, all_orders=args.all_orders, incremental=args.incremental,
+                               bundle_path=args.bundle, support_level=args.support_level or DEFAULT_SUPPORT_LEVEL,
+                               dart_crosscheck_keys=args.dart_crosscheck)
+    else:
+        generate_all_templates(max_templates=args.max, dart_crosscheck_keys=args.dart_crosscheck,
+                               incremental=args.incremental, bundle_path=args.bundle)
@@ -630,20 +630,122 @@ HABIT_CATALOG = {
     ]
 }
 
+# ==================== CATALOG INDEX ====================
+
+import weakref
+
+from habit_records import load_catalog
+
+# Categories offered to each onboarding intent (anything else gets every category)
+INTENT_CATEGORIES = {
+    "faithBased": ("spiritual",),
+    "wellness": ("physical", "mental", "relational"),
+}
+MATURITY_LEVELS = ("new", "growing", "mature", "passionate")
+
+class CatalogIndex:
+    """Read-only lookups over a habit catalog, built once
+
+    Precomputes per-(intent, maturity) pools, id lookup, category buckets and
+    tag/motivation inverted indexes so selection never rebuilds lists. All
+    collections are tuples, in catalog order.
+    """
+
+    def __init__(self, catalog):
+        self.catalog = catalog
+        self.rebuild()
+
+    def rebuild(self):
+        """Recompute every lookup from self.catalog (after it was edited)"""
+        catalog = self.catalog
+        self.habits = tuple(h for category in catalog.values() for h in category)
+        self.by_id = {h["id"]: h for h in self.habits}
+        self.by_category = {category: tuple(habits) for category, habits in catalog.items()}
+
+        by_tag = {}
+        by_motivation = {}
+        for h in self.habits:
+            for tag in h.get("tags", []):
+                by_tag.setdefault(tag, []).append(h)
+            for motivation in h.get("motivation_match", []):
+                by_motivation.setdefault(motivation, []).append(h)
+        self.by_tag = {k: tuple(v) for k, v in by_tag.items()}
+        self.by_motivation = {k: tuple(v) for k, v in by_motivation.items()}
+
+        # Compact records for scoring (see habit_records.py)
+        self.records = load_catalog(catalog)
+        self.record_by_id = {r.id: r for habits in self.records.values() for r in habits}
+
+        self._pools = {}
+        self._record_pools = {}
+        for intent in (*INTENT_CATEGORIES, "both"):
+            for maturity in (None, *MATURITY_LEVELS):
+                self._pools[(intent, maturity)] = self._build_pool(intent, maturity)
+
+    def _build_pool(self, intent, maturity):
+        categories = INTENT_CATEGORIES.get(intent)
+        if categories is None:
+            pool = self.habits
+        else:
+            pool = tuple(h for c in categories for h in self.by_category.get(c, ()))
+
+        if maturity is None:
+            # Wellness path - no maturity filtering
+            return pool
+        return tuple(
+            h for h in pool
+            if h.get("maturity_multiplier") is None or h["maturity_multiplier"].get(maturity) is not None
+        )
+
+    def pool(self, intent, maturity=None):
+        """Habits for an intent, filtered to those suited to maturity (None = no filter)"""
+        key = (intent if intent in INTENT_CATEGORIES else "both", maturity)
+        pool = self._pools.get(key)
+        if pool is None:
+            pool = self._pools[key] = self._build_pool(*key)
+        return pool
+
+    def record_pool(self, intent, maturity=None):
+        """Same pool as pool(), as Habit records"""
+        key = (intent if intent in INTENT_CATEGORIES else "both", maturity)
+        pool = self._record_pools.get(key)
+        if pool is None:
+            pool = self._record_pools[key] = tuple(self.record_by_id[h["id"]] for h in self.pool(*key))
+        return pool
+
+    def get(self, habit_id):
+        """Habit by id, or None"""
+        return self.by_id.get(habit_id)
+
+    def with_tag(self, tag):
+        return self.by_tag.get(tag, ())
+
+    def matching_motivation(self, motivation):
+        return self.by_motivation.get(motivation, ())
+
+CATALOG_INDEX = CatalogIndex(HABIT_CATALOG)
+
+# Callbacks run by invalidate_catalog(), held weakly so caches can be collected
+_catalog_listeners = []
+
+def on_catalog_change(callback):
+    """Register a bound method to call whenever HABIT_CATALOG is invalidated"""
+    _catalog_listeners.append(weakref.WeakMethod(callback))
+
+def invalidate_catalog():
+    """Call after editing HABIT_CATALOG in place: rebuilds the index and drops caches"""
+    CATALOG_INDEX.rebuild()
+    for ref in list(_catalog_listeners):
+        callback = ref()
+        if callback is None:
+            _catalog_listeners.remove(ref)
+        else:
+            callback()
+
 def get_all_habits():
     """Returns all 45 habits as a flat list"""
-    all_habits = []
-    for category in HABIT_CATALOG.values():
-        all_habits.extend(category)
-    return all_habits
+    return list(CATALOG_INDEX.habits)
 
 def get_habits_for_intent(intent):
-    """Returns appropriate habit pool based on user intent"""
-    if intent == "faithBased":
-        return HABIT_CATALOG["spiritual"]
-    elif intent == "wellness":
-        return (HABIT_CATALOG["physical"] +
-                HABIT_CATALOG["mental"] +
-                HABIT_CATALOG["relational"])
-    else:  # both
-        return get_all_habits()
+    """Returns appropriate habit pool based on user intent, as a new list (CATALOG_INDEX.pool is the shared tuple)"""
+    return list(CATALOG_INDEX.pool(intent))
@@ -0,0 +1,182 @@
+# habit_records.py
+# Compact, immutable habit records for the scoring hot path
+# Loaded from the HABIT_CATALOG dict literal; tables become enum-indexed tuples
+
+import sys
+from enum import IntEnum
+from typing import Dict, List, Optional, Tuple
+
+class Maturity(IntEnum):
+    new = 0
+    growing = 1
+    mature = 2
+    passionate = 3
+
+class Challenge(IntEnum):
+    lackOfTime = 0
+    lackOfMotivation = 1
+    dontKnowStart = 2
+    givingUp = 3
+
+MATURITY_NAMES = tuple(m.name for m in Maturity)
+CHALLENGE_NAMES = tuple(c.name for c in Challenge)
+MATURITY_INDEX = {name: i for i, name in enumerate(MATURITY_NAMES)}
+CHALLENGE_INDEX = {name: i for i, name in enumerate(CHALLENGE_NAMES)}
+# Extra challenge_fit slot holding the fit used for unknown challenges
+UNKNOWN_CHALLENGE = len(Challenge)
+DEFAULT_CHALLENGE_FIT = 0.5
+
+# Motivation name -> bit; grows as catalogs introduce new motivations
+_MOTIVATION_BITS: Dict[str, int] = {}
+
+def motivation_bit(name: str) -> int:
+    bit = _MOTIVATION_BITS.get(name)
+    if bit is None:
+        bit = _MOTIVATION_BITS[name] = 1 << len(_MOTIVATION_BITS)
+    return bit
+
+class Habit:
+    """One catalog habit as a fixed-layout, read-only record
+
+    maturity_multiplier is indexed by Maturity (None = not offered at that
+    level; the whole table is None for habits open to every level).
+    challenge_fit is indexed by Challenge, plus one trailing default slot.
+    motivation_match is also kept as a bitmask for allocation-free scoring.
+    """
+
+    __slots__ = (
+        "id", "nameKey", "category", "emoji", "base_duration", "maturity_multiplier",
+        "tags", "motivation_match", "motivation_mask", "challenge_fit", "weak_boost",
+        "verse_key", "priority", "time_of_day",
+    )
+
+    def __init__(self, id: str, nameKey: str, category: str, emoji: str, base_duration: int,
+                 maturity_multiplier: Optional[Tuple[Optional[float], ...]], tags: Tuple[str, ...],
+                 motivation_match: Tuple[str, ...], challenge_fit: Tuple[float, ...], weak_boost: float,
+                 verse_key: Optional[str], priority: int, time_of_day: str):
+        mask = 0
+        for m in motivation_match:
+            mask |= motivation_bit(m)
+        values = (
+            sys.intern(id), sys.intern(nameKey), sys.intern(category), emoji, base_duration,
+            maturity_multiplier, tuple(sys.intern(t) for t in tags),
+            tuple(sys.intern(m) for m in motivation_match), mask, challenge_fit, weak_boost,
+            verse_key, priority, sys.intern(time_of_day),
+        )
+        for slot, value in zip(self.__slots__, values):
+            object.__setattr__(self, slot, value)
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"Habit records are immutable (tried to set {name})")
+
+    def __delattr__(self, name):
+        raise AttributeError(f"Habit records are immutable (tried to delete {name})")
+
+    def __repr__(self):
+        return f"Habit({self.id!r}, {self.category!r}, priority={self.priority})"
+
+    @classmethod
+    def from_dict(cls, habit: Dict) -> "Habit":
+        """Load a record from a HABIT_CATALOG entry"""
+        mult = habit.get("maturity_multiplier")
+        maturity_multiplier = None if mult is None else tuple(mult.get(m) for m in MATURITY_NAMES)
+
+        fit = habit.get("challenge_fit", {})
+        challenge_fit = tuple(fit.get(c, DEFAULT_CHALLENGE_FIT) for c in CHALLENGE_NAMES) + (DEFAULT_CHALLENGE_FIT,)
+
+        return cls(
+            id=habit["id"],
+            nameKey=habit["nameKey"],
+            category=habit["category"],
+            emoji=habit["emoji"],
+            base_duration=habit["base_duration"],
+            maturity_multiplier=maturity_multiplier,
+            tags=tuple(habit.get("tags", ())),
+            motivation_match=tuple(habit.get("motivation_match", ())),
+            challenge_fit=challenge_fit,
+            weak_boost=habit.get("support_boost", {}).get("weak", 1.0),
+            verse_key=habit.get("verse_key"),
+            priority=habit["priority"],
+            time_of_day=habit.get("time_of_day", "flexible"),
+        )
+
+    def to_dict(self) -> Dict:
+        """Catalog-style dict (the shape select_habits has always returned)"""
+        habit = {
+            "id": self.id,
+            "nameKey": self.nameKey,
+            "category": self.category,
+            "emoji": self.emoji,
+            "base_duration": self.base_duration,
+            "maturity_multiplier": None if self.maturity_multiplier is None else {
+                m: v for m, v in zip(MATURITY_NAMES, self.maturity_multiplier) if v is not None
+            },
+            "tags": list(self.tags),
+            "motivation_match": list(self.motivation_match),
+            "challenge_fit": dict(zip(CHALLENGE_NAMES, self.challenge_fit)),
+        }
+        if self.weak_boost != 1.0:
+            habit["support_boost"] = {"weak": self.weak_boost}
+        if self.verse_key is not None:
+            habit["verse_key"] = self.verse_key
+        habit["priority"] = self.priority
+        habit["time_of_day"] = self.time_of_day
+        return habit
+
+    def offered_at(self, maturity: Optional[str]) -> bool:
+        """Same rule as HabitScorer.filter_by_maturity"""
+        if maturity is None or self.maturity_multiplier is None:
+            return True
+        idx = MATURITY_INDEX.get(maturity)
+        return idx is not None and self.maturity_multiplier[idx] is not None
+
+    def multiplier_for(self, maturity: Optional[str]) -> float:
+        """Duration multiplier for maturity (1.0 when not specified)"""
+        if not maturity or self.maturity_multiplier is None:
+            return 1.0
+        idx = MATURITY_INDEX.get(maturity)
+        value = None if idx is None else self.maturity_multiplier[idx]
+        return 1.0 if value is None else value
+
+def load_catalog(catalog: Dict[str, List[Dict]]) -> Dict[str, Tuple[Habit, ...]]:
+    """Convert a HABIT_CATALOG-shaped dict literal into record tuples per category"""
+    return {category: tuple(Habit.from_dict(h) for h in habits) for category, habits in catalog.items()}
+
+def encode_profile(profile: Dict) -> Tuple[Tuple[int, ...], int, bool]:
+    """Encode a profile once per selection: (motivation bits, challenge slot, weak support)"""
+    bits = tuple(_MOTIVATION_BITS.get(m, 0) for m in profile.get("motivations", []))
+    challenge = CHALLENGE_INDEX.get(profile.get("challenge", "dontKnowStart"), UNKNOWN_CHALLENGE)
+    weak = profile.get("supportLevel", "normal") == "weak"
+    return bits, challenge, weak
+
+# ==================== MEMORY FOOTPRINT ====================
+
+def deep_sizeof(obj, seen=None) -> int:
+    """Bytes held by obj and everything it references (shared objects counted once)"""
+    if seen is None:
+        seen = set()
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(deep_sizeof(k, seen) + deep_sizeof(v, seen) for k, v in obj.items())
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        size += sum(deep_sizeof(item, seen) for item in obj)
+    elif isinstance(obj, Habit):
+        size += sum(deep_sizeof(getattr(obj, slot), seen) for slot in Habit.__slots__)
+    return size
+
+def catalog_footprint(catalog: Dict[str, List[Dict]]) -> Tuple[int, int]:
+    """(dict catalog bytes, record catalog bytes) for the same habits"""
+    return deep_sizeof(catalog), deep_sizeof(load_catalog(catalog))
+
+if __name__ == "__main__":
+    from habit_catalog import HABIT_CATALOG
+
+    habits = sum(len(v) for v in HABIT_CATALOG.values())
+    dict_bytes, record_bytes = catalog_footprint(HABIT_CATALOG)
+    print(f"Catalog of {habits} habits")
+    print(f"  dicts:   {dict_bytes / 1024:8.1f}KB ({dict_bytes // habits} B/habit)")
+    print(f"  records: {record_bytes / 1024:8.1f}KB ({record_bytes // habits} B/habit)")
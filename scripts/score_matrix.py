@@ -0,0 +1,93 @@
+# score_matrix.py
+# Compiled (NumPy) version of HabitScorer.score_habit
+# Turns the catalog into arrays once and scores many profiles as one matrix operation
+
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from habit_catalog import HABIT_CATALOG
+
+# Factors used by HabitScorer.score_habit when a habit has no entry
+MOTIVATION_BONUS = 20
+DEFAULT_CHALLENGE = "dontKnowStart"
+DEFAULT_CHALLENGE_FIT = 0.5
+DEFAULT_SUPPORT = "normal"
+
+class CompiledHabitScorer:
+    """Scores every catalog habit for a batch of profiles at once
+
+    Arrays (one row per habit, in catalog order):
+      priority        (H,)     base priority
+      motivation_inc  (H, M)   1.0 where the habit lists the motivation
+      challenge_fit   (H, C+1) fit per challenge; last column is the 0.5 default
+      weak_boost      (H,)     multiplier applied for weak support
+
+    Results are bit-identical to the scalar HabitScorer.score_habit path: the
+    same float operations are applied in the same order.
+    """
+
+    def __init__(self, catalog: Dict = HABIT_CATALOG):
+        self.habits = [h for category in catalog.values() for h in category]
+        self.ids = [h["id"] for h in self.habits]
+        self.index = {habit_id: i for i, habit_id in enumerate(self.ids)}
+
+        self.motivations = sorted({m for h in self.habits for m in h.get("motivation_match", [])})
+        self.challenges = sorted({c for h in self.habits for c in h.get("challenge_fit", {})})
+        self._motivation_col = {m: i for i, m in enumerate(self.motivations)}
+        self._challenge_col = {c: i for i, c in enumerate(self.challenges)}
+
+        n = len(self.habits)
+        self.priority = np.array([h["priority"] for h in self.habits], dtype=np.float64)
+
+        self.motivation_inc = np.zeros((n, len(self.motivations)), dtype=np.float64)
+        self.challenge_fit = np.full((n, len(self.challenges) + 1), DEFAULT_CHALLENGE_FIT, dtype=np.float64)
+        self.weak_boost = np.ones(n, dtype=np.float64)
+
+        for i, h in enumerate(self.habits):
+            for m in h.get("motivation_match", []):
+                self.motivation_inc[i, self._motivation_col[m]] = 1.0
+            for c, fit in h.get("challenge_fit", {}).items():
+                self.challenge_fit[i, self._challenge_col[c]] = fit
+            self.weak_boost[i] = h.get("support_boost", {}).get("weak", 1.0)
+
+    def _encode(self, profiles: List[Dict]):
+        """Encode profiles as (motivation counts, challenge column, weak flag)"""
+        counts = np.zeros((len(profiles), len(self.motivations)), dtype=np.float64)
+        challenge_cols = np.empty(len(profiles), dtype=np.intp)
+        weak = np.zeros(len(profiles), dtype=bool)
+        unknown_challenge = len(self.challenges)
+
+        for row, profile in enumerate(profiles):
+            for m in profile.get("motivations", []):
+                col = self._motivation_col.get(m)
+                if col is not None:
+                    counts[row, col] += 1.0
+            challenge = profile.get("challenge", DEFAULT_CHALLENGE)
+            challenge_cols[row] = self._challenge_col.get(challenge, unknown_challenge)
+            weak[row] = profile.get("supportLevel", DEFAULT_SUPPORT) == "weak"
+
+        return counts, challenge_cols, weak
+
+    def score_profiles(self, profiles: List[Dict]) -> np.ndarray:
+        """Score all habits for all profiles: returns a (P, H) float64 matrix"""
+        counts, challenge_cols, weak = self._encode(profiles)
+
+        # Base priority + 20 per matching motivation
+        scores = self.priority[None, :] + MOTIVATION_BONUS * (counts @ self.motivation_inc.T)
+        # Challenge fit factor
+        scores *= self.challenge_fit.T[challenge_cols]
+        # Weak support boost
+        scores[weak] *= self.weak_boost[None, :]
+
+        return scores
+
+    def score_profile(self, profile: Dict) -> np.ndarray:
+        """Score all habits for a single profile: returns an (H,) vector"""
+        return self.score_profiles([profile])[0]
+
+    def scores_by_id(self, profile: Dict, habit_ids: Optional[List[str]] = None) -> Dict[str, float]:
+        """Map habit id -> score for one profile (all habits by default)"""
+        row = self.score_profile(profile)
+        ids = self.ids if habit_ids is None else habit_ids
+        return {habit_id: float(row[self.index[habit_id]]) for habit_id in ids}
@@ -5,23 +5,11 @@ Simple script to verify ONE template fingerprint manually
 
 import json
 import sys
+from dart_fingerprint import dart_string_hash
 
 def jenkins_hash(s):
     """Calculate Jenkins hash like Dart's String.hashCode"""
-    h = 0
-    for char in s:
-        h = (h + ord(char)) & 0xFFFFFFFF
-        h = (h + (h << 10)) & 0xFFFFFFFF
-        h = (h ^ (h >> 6)) & 0xFFFFFFFF
-    h = (h + (h << 3)) & 0xFFFFFFFF
-    h = (h ^ (h >> 11)) & 0xFFFFFFFF
-    h = (h + (h << 15)) & 0xFFFFFFFF
-
-    # Convert to signed 32-bit
-    if h >= 0x80000000:
-        h = h - 0x100000000
-
-    return h
+    return dart_string_hash(s)
 
 # Load template
 print("Loading template 1689162142.json...")
@@ -0,0 +1,178 @@
+# template_bundle.py
+# Packed single-file form of assets/habit_templates_v2
+# One sorted fingerprint index + one deduplicated habit table instead of one JSON file per template
+
+import json
+import os
+from bisect import bisect_left
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+BUNDLE_FORMAT = "habit_templates_bundle"
+BUNDLE_VERSION = 1
+
+# Row layouts (stored in the bundle header so readers never hard-code positions)
+PROFILE_FIELDS = ("intent", "motivations", "challenge", "supportLevel", "spiritualMaturity")
+HABIT_FIELDS = ("id", "nameKey", "category", "emoji", "target_minutes", "verse_key", "time_of_day")
+
+def _habit_row(habit: Dict) -> Tuple:
+    """Habit block as a hashable row; notification_key is always nameKey so it is not stored"""
+    if habit.get("notification_key", habit["nameKey"]) != habit["nameKey"]:
+        raise ValueError(f"Habit {habit['id']} has notification_key != nameKey and cannot be packed")
+    return tuple(habit.get(field) for field in HABIT_FIELDS)
+
+def pack_templates(templates: Iterable[Dict]) -> Dict:
+    """Build a bundle dict from full template dicts
+
+    Layout:
+      fingerprints  sorted ints (binary-search index)
+      templates     rows aligned with fingerprints: [template_id, profile row, habit indexes]
+      habits        deduplicated habit rows, referenced by index
+    Template-wide constants (version, generated_by) are stored once.
+    """
+    by_fingerprint = {}
+    version = generated_by = None
+    for template in templates:
+        fp = int(template["fingerprint"])
+        if fp in by_fingerprint:
+            raise ValueError(f"Duplicate fingerprint {fp}: {template['template_id']} "
+                             f"vs {by_fingerprint[fp]['template_id']}")
+        if version is None:
+            version, generated_by = template["version"], template["generated_by"]
+        elif (template["version"], template["generated_by"]) != (version, generated_by):
+            raise ValueError(f"Template {template['template_id']} has a different version/generator")
+        by_fingerprint[fp] = template
+
+    habit_index: Dict[Tuple, int] = {}
+    habits: List[Tuple] = []
+    rows = []
+    fingerprints = sorted(by_fingerprint)
+    for fp in fingerprints:
+        template = by_fingerprint[fp]
+        refs = []
+        for habit in template["habits"]:
+            row = _habit_row(habit)
+            idx = habit_index.get(row)
+            if idx is None:
+                idx = habit_index[row] = len(habits)
+                habits.append(row)
+            refs.append(idx)
+        profile = template["profile"]
+        rows.append([template["template_id"], [profile.get(f) for f in PROFILE_FIELDS], refs])
+
+    return {
+        "format": BUNDLE_FORMAT,
+        "bundle_version": BUNDLE_VERSION,
+        "version": version,
+        "generated_by": generated_by,
+        "profile_fields": list(PROFILE_FIELDS),
+        "habit_fields": list(HABIT_FIELDS),
+        "fingerprints": fingerprints,
+        "templates": rows,
+        "habits": [list(row) for row in habits],
+    }
+
+def write_bundle(templates: Iterable[Dict], path: str) -> Dict:
+    """Pack templates and write the bundle as compact JSON; returns the bundle"""
+    bundle = pack_templates(templates)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(bundle, f, ensure_ascii=False, separators=(",", ":"))
+    return bundle
+
+def load_directory(templates_dir: str) -> Iterator[Dict]:
+    """Yield every <fingerprint>.json template in a directory"""
+    for filename in sorted(os.listdir(templates_dir)):
+        if filename.endswith(".json") and not filename.endswith(".bundle.json"):
+            with open(os.path.join(templates_dir, filename), 'r', encoding='utf-8') as f:
+                yield json.load(f)
+
+def pack_directory(templates_dir: str, path: str) -> Dict:
+    """Pack a directory of per-fingerprint templates into one bundle file"""
+    return write_bundle(load_directory(templates_dir), path)
+
+class TemplateBundle:
+    """Read-only view over a packed bundle
+
+    get() is a binary search over the sorted fingerprint index and rebuilds
+    the exact dict the per-file <fingerprint>.json template holds.
+    """
+
+    def __init__(self, bundle: Dict):
+        if bundle.get("format") != BUNDLE_FORMAT:
+            raise ValueError("Not a habit template bundle")
+        if bundle.get("bundle_version") != BUNDLE_VERSION:
+            raise ValueError(f"Unsupported bundle version {bundle.get('bundle_version')}")
+        self.version = bundle["version"]
+        self.generated_by = bundle["generated_by"]
+        self.profile_fields = bundle["profile_fields"]
+        self.habit_fields = bundle["habit_fields"]
+        self.fingerprints = bundle["fingerprints"]
+        self.rows = bundle["templates"]
+        self.habits = bundle["habits"]
+
+    @classmethod
+    def load(cls, path: str) -> "TemplateBundle":
+        with open(path, 'r', encoding='utf-8') as f:
+            return cls(json.load(f))
+
+    def __len__(self) -> int:
+        return len(self.fingerprints)
+
+    def _find(self, fingerprint) -> int:
+        fp = int(fingerprint)
+        i = bisect_left(self.fingerprints, fp)
+        return i if i < len(self.fingerprints) and self.fingerprints[i] == fp else -1
+
+    def __contains__(self, fingerprint) -> bool:
+        return self._find(fingerprint) >= 0
+
+    def get(self, fingerprint) -> Optional[Dict]:
+        """Template for a fingerprint (str or int), or None if not bundled"""
+        i = self._find(fingerprint)
+        return None if i < 0 else self._template(i)
+
+    def _habit(self, idx: int) -> Dict:
+        habit = dict(zip(self.habit_fields, self.habits[idx]))
+        # Same key order as generate_template
+        return {
+            "id": habit["id"],
+            "nameKey": habit["nameKey"],
+            "category": habit["category"],
+            "emoji": habit["emoji"],
+            "target_minutes": habit["target_minutes"],
+            "verse_key": habit["verse_key"],
+            "notification_key": habit["nameKey"],
+            "time_of_day": habit["time_of_day"],
+        }
+
+    def _template(self, i: int) -> Dict:
+        template_id, profile, refs = self.rows[i]
+        return {
+            "template_id": template_id,
+            "fingerprint": str(self.fingerprints[i]),
+            "version": self.version,
+            "generated_by": self.generated_by,
+            "profile": dict(zip(self.profile_fields, profile)),
+            "habits": [self._habit(idx) for idx in refs],
+        }
+
+    def items(self) -> Iterator[Tuple[str, Dict]]:
+        """(fingerprint, template) pairs in index order"""
+        for i, fp in enumerate(self.fingerprints):
+            yield str(fp), self._template(i)
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Pack a template directory into one bundle")
+    parser.add_argument('templates_dir', nargs='?', default="habit_templates_v2")
+    parser.add_argument('output', nargs='?', default="habit_templates_v2.bundle.json")
+    args = parser.parse_args()
+
+    bundle = pack_directory(args.templates_dir, args.output)
+    files_size = sum(os.path.getsize(os.path.join(args.templates_dir, f))
+                     for f in os.listdir(args.templates_dir) if f.endswith(".json"))
+    bundle_size = os.path.getsize(args.output)
+    habit_refs = sum(len(row[2]) for row in bundle["templates"])
+    print(f"Packed {len(bundle['fingerprints'])} templates -> {args.output}")
+    print(f"  habit blocks: {habit_refs} referenced, {len(bundle['habits'])} unique")
+    print(f"  size: {files_size / 1024:.1f}KB as files -> {bundle_size / 1024:.1f}KB bundled")
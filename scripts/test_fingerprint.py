@@ -1,38 +1,208 @@
 #!/usr/bin/env python3
-"""Test fingerprint generation"""
-
-from generate_templates_v2 import generate_fingerprint
-
-# Test case from template
-profile = {
-    "intent": "faithBased",
-    "maturity": "new",
-    "motivations": ["closerToGod"],
-    "challenge": "lackOfTime"
-}
-
-fingerprint = generate_fingerprint(profile)
-print(f"Python fingerprint: {fingerprint}")
-print(f"Expected from file: 1689162142")
-print(f"Match: {fingerprint == '1689162142'}")
-
-# Build key manually
-key = f"{profile['intent']}_{profile['maturity']}_{profile['motivations'][0]}_{profile['challenge']}"
-print(f"\nKey: {key}")
-
-# Dart algorithm (Jenkins hash)
-h = 0
-for char in key:
-    h = (h + ord(char)) & 0xFFFFFFFF
-    h = (h + (h << 10)) & 0xFFFFFFFF
-    h = (h ^ (h >> 6)) & 0xFFFFFFFF
-h = (h + (h << 3)) & 0xFFFFFFFF
-h = (h ^ (h >> 11)) & 0xFFFFFFFF
-h = (h + (h << 15)) & 0xFFFFFFFF
-
-# Convert to signed 32-bit
-if h >= 0x80000000:
-    h = h - 0x100000000
-
-print(f"Manual hash: {h}")
+"""
+Golden-vector tests for the in-process Dart String.hashCode engine
+Vectors are fingerprints recorded from the Dart runtime (assets/habit_templates_v2)
+"""
 
+import sys
+import os
+import re
+import time
+import subprocess
+from unittest import mock
+sys.path.insert(0, os.path.dirname(__file__))
+
+from dart_fingerprint import dart_string_hash, fingerprint_key, fingerprint, DART_HASH_MASK
+from generate_templates_v2 import generate_fingerprint, generate_fingerprints, TEMPLATE_MATRIX
+
+# (cacheFingerprint key, String.hashCode printed by Dart)
+GOLDEN_VECTORS = [
+    ("both_growing_closerToGod_physicalHealth_lackOfTime", 521693874),
+    ("both_growing_closerToGod_reduceStress_lackOfMotivation", 1023436122),
+    ("both_growing_growInFaith_betterSleep_lackOfTime", 841773503),
+    ("both_growing_overcomeHabits_timeManagement_givingUp", 905074846),
+    ("both_growing_prayerDiscipline_physicalHealth_dontKnowStart", 434140580),
+    ("both_growing_prayerDiscipline_productivity_lackOfMotivation", 3998210),
+    ("both_growing_understandBible_productivity_givingUp", 1058967659),
+    ("both_growing_understandBible_reduceStress_dontKnowStart", 69026799),
+    ("both_mature_closerToGod_physicalHealth_productivity_lackOfTime", 697366878),
+    ("both_mature_growInFaith_timeManagement_dontKnowStart", 788749912),
+    ("both_mature_overcomeHabits_betterSleep_givingUp", 529141822),
+    ("both_mature_understandBible_reduceStress_lackOfMotivation", 842562418),
+    ("both_new_closerToGod_physicalHealth_lackOfTime", 878898846),
+    ("both_new_closerToGod_productivity_lackOfTime", 734040338),
+    ("both_new_growInFaith_physicalHealth_givingUp", 1046185874),
+    ("both_new_growInFaith_timeManagement_givingUp", 109885889),
+    ("both_new_prayerDiscipline_betterSleep_lackOfMotivation", 1064495521),
+    ("both_new_prayerDiscipline_reduceStress_lackOfMotivation", 452031651),
+    ("both_new_understandBible_reduceStress_dontKnowStart", 988215053),
+    ("both_new_understandBible_timeManagement_dontKnowStart", 665897281),
+    ("both_passionate_closerToGod_prayerDiscipline_physicalHealth_lackOfTime", 289951544),
+    ("both_passionate_closerToGod_reduceStress_dontKnowStart", 678418255),
+    ("both_passionate_growInFaith_timeManagement_givingUp", 59354668),
+    ("both_passionate_understandBible_growInFaith_productivity_lackOfMotivation", 316175132),
+    ("faithBased_growing_closerToGod_prayerDiscipline_lackOfTime", 470114878),
+    ("faithBased_growing_overcomeHabits_closerToGod_lackOfMotivation", 885129647),
+    ("faithBased_growing_prayerDiscipline_givingUp", 372095037),
+    ("faithBased_growing_understandBible_growInFaith_lackOfMotivation", 552843534),
+    ("faithBased_mature_closerToGod_prayerDiscipline_lackOfMotivation", 789615887),
+    ("faithBased_mature_growInFaith_dontKnowStart", 857090507),
+    ("faithBased_mature_overcomeHabits_givingUp", 245473652),
+    ("faithBased_mature_understandBible_growInFaith_lackOfTime", 327290165),
+    ("faithBased_new_closerToGod_givingUp", 501394145),
+    ("faithBased_new_closerToGod_lackOfTime", 615420318),
+    ("faithBased_new_closerToGod_prayerDiscipline_lackOfMotivation", 711878546),
+    ("faithBased_new_growInFaith_closerToGod_lackOfTime", 217410324),
+    ("faithBased_new_growInFaith_dontKnowStart", 799580514),
+    ("faithBased_new_growInFaith_lackOfMotivation", 656016131),
+    ("faithBased_new_overcomeHabits_givingUp", 370666795),
+    ("faithBased_new_prayerDiscipline_dontKnowStart", 574606111),
+    ("faithBased_new_prayerDiscipline_lackOfTime", 460623641),
+    ("faithBased_new_prayerDiscipline_understandBible_givingUp", 1035031392),
+    ("faithBased_new_understandBible_dontKnowStart", 497366004),
+    ("faithBased_new_understandBible_lackOfMotivation", 965741295),
+    ("faithBased_passionate_closerToGod_growInFaith_givingUp", 765636466),
+    ("faithBased_passionate_closerToGod_prayerDiscipline_understandBible_lackOfTime", 456494248),
+    ("faithBased_passionate_growInFaith_overcomeHabits_lackOfMotivation", 516994556),
+    ("faithBased_passionate_understandBible_dontKnowStart", 879777418),
+    ("wellness__betterSleep_givingUp", 192576856),
+    ("wellness__betterSleep_physicalHealth_lackOfTime", 153110427),
+    ("wellness__physicalHealth_lackOfTime", 554437297),
+    ("wellness__physicalHealth_reduceStress_lackOfTime", 863340998),
+    ("wellness__physicalHealth_timeManagement_givingUp", 12509419),
+    ("wellness__productivity_lackOfTime", 988008299),
+    ("wellness__productivity_reduceStress_lackOfMotivation", 52661677),
+    ("wellness__reduceStress_betterSleep_lackOfMotivation", 499598648),
+    ("wellness__reduceStress_lackOfMotivation", 142490031),
+    ("wellness__timeManagement_dontKnowStart", 474362497),
+    ("wellness__timeManagement_productivity_dontKnowStart", 845036394),
+    ("wellness__timeManagement_reduceStress_dontKnowStart", 789594107),
+]
+
+def test_golden_vectors():
+    """Every recorded Dart hash must be reproduced exactly"""
+    print("\n=== TEST: Golden Vectors ===")
+
+    mismatches = [(k, v, dart_string_hash(k)) for k, v in GOLDEN_VECTORS if dart_string_hash(k) != v]
+    for key, expected, got in mismatches:
+        print(f"  ✗ {key}: dart={expected} python={got}")
+
+    assert not mismatches, f"{len(mismatches)}/{len(GOLDEN_VECTORS)} golden vectors differ"
+
+    print(f"✅ PASSED: {len(GOLDEN_VECTORS)} golden vectors match")
+    return True
+
+def test_fingerprint_key_format():
+    """Key must mirror onboarding_models.dart (no sorting, '' for missing maturity)"""
+    print("\n=== TEST: Fingerprint Key Format ===")
+
+    wellness = {"intent": "wellness", "maturity": None, "motivations": ["reduceStress", "betterSleep"], "challenge": "lackOfMotivation"}
+    faith = {"intent": "faithBased", "maturity": "new", "motivations": ["prayerDiscipline", "closerToGod"], "challenge": "lackOfTime"}
+
+    assert fingerprint_key(wellness) == "wellness__reduceStress_betterSleep_lackOfMotivation"
+    assert fingerprint_key(faith) == "faithBased_new_prayerDiscipline_closerToGod_lackOfTime"
+    assert fingerprint_key({k: v for k, v in wellness.items() if k != "maturity"}) == fingerprint_key(wellness)
+
+    print("✅ PASSED: Keys built exactly like Dart")
+    return True
+
+def test_hash_range():
+    """Dart VM hashes are positive 30-bit integers"""
+    print("\n=== TEST: Hash Range ===")
+
+    samples = ["", "a", "ñandú", "🙏 prayer", "x" * 1000] + [k for k, _ in GOLDEN_VECTORS]
+    for s in samples:
+        h = dart_string_hash(s)
+        assert 0 < h <= DART_HASH_MASK, f"hash {h} for {s!r} outside 30-bit range"
+
+    print("✅ PASSED: All hashes within Dart's 30-bit range")
+    return True
+
+def test_generate_fingerprint_uses_engine():
+    """generate_fingerprint must delegate to the engine for every matrix profile"""
+    print("\n=== TEST: Generator Delegation ===")
+
+    checked = 0
+    for intent, profiles in TEMPLATE_MATRIX.items():
+        for profile in profiles:
+            p = dict(profile, intent=intent)
+            assert generate_fingerprint(p) == fingerprint(p) == str(dart_string_hash(fingerprint_key(p)))
+            checked += 1
+
+    print(f"✅ PASSED: {checked} matrix profiles fingerprinted in-process")
+    return True
+
+def test_batch_fingerprints():
+    """Batch API must match the scalar path and use one Dart run for any size"""
+    print("\n=== TEST: Batch Fingerprints ===")
+
+    profiles = [dict(p, intent=intent) for intent, ps in TEMPLATE_MATRIX.items() for p in ps] * 100
+    expected = [generate_fingerprint(p) for p in profiles]
+    assert generate_fingerprints(profiles) == expected
+
+    def fake_dart(cmd, **kwargs):
+        with open(cmd[-1]) as f:
+            source = f.read()
+        keys = re.findall(r"r'([^']*)'", source)
+        stdout = "\n".join(str(dart_string_hash(k)) for k in keys)
+        return subprocess.CompletedProcess(cmd, 0, stdout=stdout, stderr="")
+
+    with mock.patch("dart_fingerprint.subprocess.run", side_effect=fake_dart) as run:
+        assert generate_fingerprints(profiles, use_dart=True) == expected
+    print(f"Dart runs for {len(profiles)} profiles: {run.call_count}")
+    assert run.call_count == 1, f"Expected 1 Dart run, got {run.call_count}"
+
+    print("✅ PASSED: Batch fingerprints use a single Dart invocation")
+    return True
+
+def test_fingerprint_speed():
+    """Fingerprinting must be fast enough to cover the whole profile space"""
+    print("\n=== TEST: Fingerprint Speed ===")
+
+    keys = [f"{k}_{i}" for i in range(200) for k, _ in GOLDEN_VECTORS]
+    start = time.perf_counter()
+    for key in keys:
+        dart_string_hash(key)
+    elapsed = time.perf_counter() - start
+
+    print(f"Hashed {len(keys)} keys in {elapsed * 1000:.1f}ms")
+    assert elapsed < 5.0, f"Hashing {len(keys)} keys took {elapsed:.2f}s"
+
+    print("✅ PASSED: In-process hashing is fast")
+    return True
+
+def run_all_tests():
+    """Run all tests"""
+    print("\n" + "="*60)
+    print("RUNNING FINGERPRINT ENGINE TEST SUITE")
+    print("="*60)
+
+    tests = [
+        test_golden_vectors,
+        test_fingerprint_key_format,
+        test_hash_range,
+        test_generate_fingerprint_uses_engine,
+        test_batch_fingerprints,
+        test_fingerprint_speed,
+    ]
+
+    passed = 0
+    failed = 0
+
+    for test in tests:
+        try:
+            if test():
+                passed += 1
+        except AssertionError as e:
+            print(f"❌ FAILED: {e}")
+            failed += 1
+
+    print("\n" + "="*60)
+    print(f"TEST RESULTS: {passed} passed, {failed} failed")
+    print("="*60)
+
+    return failed == 0
+
+if __name__ == "__main__":
+    success = run_all_tests()
+    sys.exit(0 if success else 1)
@@ -15,7 +15,7 @@ from generate_templates_v2 import (
     validate_template,
     generate_template
 )
-from habit_catalog import HABIT_CATALOG, get_habits_for_intent
+from habit_catalog import HABIT_CATALOG, get_habits_for_intent, get_all_habits
 
 def test_catalog_completeness():
     """Verify catalog has required number of habits"""
@@ -236,6 +236,42 @@ def test_maturity_filtering():
     print("✅ PASSED: Maturity filtering working")
     return True
 
+def test_catalog_index():
+    """Test that precomputed pools and lookups match the catalog"""
+    print("\n=== TEST: Catalog Index ===")
+
+    from habit_catalog import CATALOG_INDEX, MATURITY_LEVELS
+
+    all_habits = get_all_habits()
+    legacy_pools = {
+        "faithBased": HABIT_CATALOG["spiritual"],
+        "wellness": HABIT_CATALOG["physical"] + HABIT_CATALOG["mental"] + HABIT_CATALOG["relational"],
+        "both": all_habits,
+    }
+
+    for intent, legacy in legacy_pools.items():
+        pool = get_habits_for_intent(intent)
+        assert isinstance(pool, list) and pool == legacy, f"Pool differs for {intent}"
+        pool.append(pool[0])
+        assert get_habits_for_intent(intent) == legacy, "Callers may extend the returned list"
+        for maturity in (None, *MATURITY_LEVELS):
+            expected = HabitScorer.filter_by_maturity(legacy, maturity)
+            assert list(CATALOG_INDEX.pool(intent, maturity)) == expected, f"Pool differs for {intent}/{maturity}"
+        assert CATALOG_INDEX.pool(intent, "new") is CATALOG_INDEX.pool(intent, "new"), "Pools should be precomputed"
+
+    assert all(CATALOG_INDEX.get(h["id"]) is h for h in all_habits)
+    assert CATALOG_INDEX.get("missing") is None
+    for h in all_habits:
+        for tag in h.get("tags", []):
+            assert h in CATALOG_INDEX.with_tag(tag)
+        for motivation in h.get("motivation_match", []):
+            assert h in CATALOG_INDEX.matching_motivation(motivation)
+    assert sum(len(b) for b in CATALOG_INDEX.by_category.values()) == len(all_habits)
+
+    print(f"Indexed {len(all_habits)} habits, {len(CATALOG_INDEX.by_tag)} tags, {len(CATALOG_INDEX.by_motivation)} motivations")
+    print("✅ PASSED: Catalog index consistent with catalog")
+    return True
+
 def test_duration_adjustment():
     """Test that durations are adjusted based on challenge"""
     print("\n=== TEST: Duration Adjustment ===")
@@ -273,6 +309,341 @@ def test_duration_adjustment():
     print("✅ PASSED: Duration adjustments working correctly")
     return True
 
+def test_habit_records():
+    """Test that compact Habit records round-trip and score like the dicts"""
+    print("\n=== TEST: Habit Records ===")
+
+    from habit_records import Habit, encode_profile, catalog_footprint
+    from generate_templates_v2 import enumerate_profile_space
+
+    habits = get_all_habits()
+    records = [Habit.from_dict(h) for h in habits]
+
+    for habit, record in zip(habits, records):
+        assert record.to_dict() == habit, f"{habit['id']} does not round-trip"
+
+    try:
+        records[0].priority = 0
+        assert False, "Records should be immutable"
+    except AttributeError:
+        pass
+    assert not hasattr(records[0], "__dict__"), "Records should use __slots__"
+
+    profiles = enumerate_profile_space()[::7] + [{}, {"motivations": ["unknown"], "challenge": "unknownChallenge"}]
+    for profile in profiles:
+        codes = encode_profile(profile)
+        for habit, record in zip(habits, records):
+            assert HabitScorer.score_record(record, codes) == HabitScorer.score_habit(habit, profile)
+        for maturity in (None, "", "new", "passionate"):
+            assert [r.id for r in records if r.offered_at(maturity)] == \
+                [h["id"] for h in HabitScorer.filter_by_maturity(habits, maturity)]
+
+    dict_bytes, record_bytes = catalog_footprint(HABIT_CATALOG)
+    print(f"Footprint: dicts {dict_bytes}B, records {record_bytes}B")
+    assert record_bytes < dict_bytes, "Records should be smaller than dicts"
+
+    print("✅ PASSED: Records match dict catalog")
+    return True
+
+def test_compiled_scores_match_scalar():
+    """Test that the NumPy score matrix reproduces HabitScorer exactly"""
+    print("\n=== TEST: Compiled Score Matrix ===")
+
+    from itertools import product
+    from score_matrix import CompiledHabitScorer
+
+    compiled = CompiledHabitScorer(HABIT_CATALOG)
+    motivations = compiled.motivations
+    profiles = [
+        {"motivations": [m1, m2], "challenge": challenge, "supportLevel": support}
+        for m1, m2, challenge, support in product(
+            motivations, motivations,
+            compiled.challenges + ["unknownChallenge"],
+            ["weak", "normal", "strong"]
+        )
+    ]
+    profiles.append({})  # all defaults
+
+    matrix = compiled.score_profiles(profiles)
+    print(f"Scored {matrix.shape[0]} profiles x {matrix.shape[1]} habits")
+
+    habits = get_all_habits()
+    for row, profile in zip(matrix, profiles):
+        for col, habit in enumerate(habits):
+            expected = HabitScorer.score_habit(habit, profile)
+            assert row[col] == expected, f"{habit['id']} {profile}: {row[col]} != {expected}"
+
+    print("✅ PASSED: Compiled scores identical to scalar path")
+    return True
+
+def test_compiled_selector_matches_scalar():
+    """Test that compiled selection picks the same habits as the scalar selector"""
+    print("\n=== TEST: Compiled Selector ===")
+
+    from generate_templates_v2 import TEMPLATE_MATRIX
+
+    scalar = HabitSelector(HABIT_CATALOG)
+    compiled = HabitSelector(HABIT_CATALOG, compiled=True)
+
+    for intent, profiles in TEMPLATE_MATRIX.items():
+        for profile in profiles:
+            p = dict(profile, intent=intent)
+            count = 5 if p.get("supportLevel") != "weak" else 6
+            assert compiled.select_habits(p, count) == scalar.select_habits(p, count), f"Selection differs for {p}"
+
+    print("✅ PASSED: Compiled selector matches scalar selector")
+    return True
+
+def test_deterministic_tie_breaking():
+    """Test that equal scores keep catalog order within each category"""
+    print("\n=== TEST: Deterministic Tie-Breaking ===")
+
+    from habit_records import Habit
+
+    selector = HabitSelector(HABIT_CATALOG)
+    template = get_all_habits()[0]
+    habits = [Habit.from_dict(dict(template, id=f"t{i}", category="spiritual" if i % 2 else "relational"))
+              for i in range(12)]
+    scored = [(50.0, h) for h in habits]
+    profile = {"intent": "faithBased", "supportLevel": "weak"}
+
+    first = selector._smart_select(scored, profile, count=4)
+    print(f"Selected: {[h.id for h in first]}")
+
+    assert [h.id for h in first] == ["t1", "t3", "t5", "t0"], "Ties should resolve in pool order"
+    assert selector._smart_select(list(scored), profile, count=4) == first, "Selection must be stable"
+
+    print("✅ PASSED: Ties broken by pool order")
+    return True
+
+def test_checked_in_templates_reproduced():
+    """Test that the generator reproduces every checked-in template exactly"""
+    print("\n=== TEST: Checked-in Templates Reproduced ===")
+
+    import json
+    import glob
+
+    paths = sorted(glob.glob(os.path.join(os.path.dirname(__file__), "habit_templates_v2", "*.json")))
+    for path in paths:
+        with open(path, encoding="utf-8") as f:
+            template = json.load(f)
+        stored = template["profile"]
+        profile = {k: stored[k] for k in ("intent", "motivations", "challenge", "supportLevel")}
+        if stored.get("spiritualMaturity"):
+            profile["maturity"] = stored["spiritualMaturity"]
+
+        assert generate_template(profile) == template, f"{os.path.basename(path)} differs from regenerated template"
+
+    print(f"✅ PASSED: {len(paths)} templates regenerated exactly")
+    return True
+
+def test_selection_cache():
+    """Test memoized selection: same results, counters, and catalog invalidation"""
+    print("\n=== TEST: Selection Cache ===")
+
+    from generate_templates_v2 import enumerate_profile_space
+    from habit_catalog import invalidate_catalog
+
+    cached = HabitSelector(HABIT_CATALOG)
+    uncached = HabitSelector(HABIT_CATALOG, cache_size=0)
+    profiles = enumerate_profile_space(all_orders=True)[::97]
+
+    for profile in profiles:
+        assert cached.select_habits(profile, 5) == uncached.select_habits(profile, 5), f"Cache changed result for {profile}"
+    misses = cached.cache_stats()["misses"]
+    for profile in profiles:
+        cached.select_habits(profile, 5)
+    stats = cached.cache_stats()
+    print(f"Cache stats: {stats}")
+    assert stats["misses"] == misses, "Repeated profiles should not miss"
+    assert stats["hits"] >= len(profiles)
+
+    # Returned habits must not alias the cache, nested containers included
+    first = cached.select_habits(profiles[0], 5)
+    expected = cached.select_habits(profiles[0], 5)
+    first[0]["target_minutes"] = -1
+    first[0]["tags"].append("mutated")
+    first[0]["motivation_match"].clear()
+    first[0]["challenge_fit"]["lackOfTime"] = -1
+    if first[0]["maturity_multiplier"] is not None:
+        first[0]["maturity_multiplier"]["new"] = -1
+    assert cached.select_habits(profiles[0], 5) == expected, "Mutating a result must not change later cache hits"
+
+    # Editing the catalog + invalidate_catalog() must refresh cached selections
+    profile = {"intent": "faithBased", "maturity": "new", "motivations": ["closerToGod"],
+               "challenge": "lackOfTime", "supportLevel": "normal"}
+    before = [h["id"] for h in cached.select_habits(profile, 5)]
+    habit = next(h for h in HABIT_CATALOG["spiritual"] if h["id"] not in before)
+    original_priority = habit["priority"]
+    try:
+        habit["priority"] = 10_000
+        invalidate_catalog()
+        after = [h["id"] for h in cached.select_habits(profile, 5)]
+        assert habit["id"] in after, "Invalidated cache should see catalog edits"
+    finally:
+        habit["priority"] = original_priority
+        invalidate_catalog()
+    assert [h["id"] for h in cached.select_habits(profile, 5)] == before
+
+    print("✅ PASSED: Cached selection consistent and invalidated on catalog change")
+    return True
+
+def test_profile_space_enumeration():
+    """Test that the exhaustive profile space is complete and valid"""
+    print("\n=== TEST: Profile Space Enumeration ===")
+
+    from generate_templates_v2 import enumerate_profile_space
+    from dart_fingerprint import fingerprint_key
+
+    profiles = enumerate_profile_space()
+    keys = {fingerprint_key(p) for p in profiles}
+    by_intent = {}
+    for p in profiles:
+        by_intent[p["intent"]] = by_intent.get(p["intent"], 0) + 1
+
+    print(f"Profiles: {len(profiles)}, unique fingerprint keys: {len(keys)}")
+    print(f"By intent: {by_intent}")
+
+    # 25 motivation subsets per question, 4 maturities, 4 challenges, 3 support levels
+    assert by_intent == {"faithBased": 25 * 4 * 4 * 3, "wellness": 25 * 4 * 3, "both": 25 * 25 * 4 * 4 * 3}
+    assert len(keys) == len(profiles) // 3, "supportLevel should be the only field outside the key"
+    assert all(1 <= len(p["motivations"]) <= 6 for p in profiles)
+    assert all(("maturity" in p) == (p["intent"] != "wellness") for p in profiles)
+
+    orders = enumerate_profile_space(all_orders=True)
+    assert len(orders) > len(profiles), "all_orders should add tap-order variants"
+
+    print("✅ PASSED: Profile space covers every onboarding answer")
+    return True
+
+def test_profile_space_support_level():
+    """Test that --all-profiles writes one explicit supportLevel and reports replaced templates"""
+    print("\n=== TEST: Profile Space Support Level ===")
+
+    import json
+    import logging
+    import tempfile
+    import generate_templates_v2
+    from generate_templates_v2 import generate_profile_space
+
+    class Capture(logging.Handler):
+        def __init__(self):
+            super().__init__()
+            self.messages = []
+
+        def emit(self, record):
+            self.messages.append(record.getMessage())
+
+    with tempfile.TemporaryDirectory() as tmp:
+        output_dir = os.path.join(tmp, "templates")
+        assert generate_profile_space(output_dir, workers=1, support_level="weak") == (10500, 0)
+        files = sorted(os.listdir(output_dir))
+        with open(os.path.join(output_dir, files[0]), 'r', encoding='utf-8') as f:
+            assert json.load(f)["profile"]["supportLevel"] == "weak"
+
+        capture = Capture()
+        generate_templates_v2.logger.addHandler(capture)
+        try:
+            generate_profile_space(output_dir, workers=1, support_level="normal")
+        finally:
+            generate_templates_v2.logger.removeHandler(capture)
+        reported = [m for m in capture.messages if "_weak_" in m and "_normal_" in m]
+        print(f"Reported {len(reported)} replaced templates")
+        assert len(reported) == len(files), "Every weak template replaced by a normal one should be reported"
+        assert any("Replaced 10500 existing templates" in m for m in capture.messages)
+
+        try:
+            generate_profile_space(output_dir, workers=1, support_level="low")
+            assert False, "Unknown support level should be rejected"
+        except ValueError:
+            pass
+
+    print("✅ PASSED: Support level is explicit and replacements are reported")
+    return True
+
+def test_incremental_regeneration():
+    """Test that incremental builds skip unchanged templates and rebuild only edited ones"""
+    print("\n=== TEST: Incremental Regeneration ===")
+
+    import tempfile
+    from generate_templates_v2 import generate_all_templates, load_manifest
+    from habit_catalog import invalidate_catalog
+
+    with tempfile.TemporaryDirectory() as tmp:
+        output_dir = os.path.join(tmp, "templates")
+
+        generated, failed = generate_all_templates(output_dir, max_templates=60, incremental=True)
+        assert (generated, failed) == (60, 0)
+        manifest = load_manifest(output_dir)
+        assert len(manifest) == 60
+        assert sorted(os.listdir(output_dir)) == sorted(f"{fp}.json" for fp in manifest), \
+            "Manifest must live outside the template directory"
+
+        generated, failed = generate_all_templates(output_dir, max_templates=60, incremental=True)
+        assert (generated, failed) == (0, 0), "Unchanged inputs should be a no-op"
+
+        # A full (non-incremental) run refreshes its entries and keeps the others
+        assert generate_all_templates(output_dir, max_templates=30) == (30, 0)
+        assert load_manifest(output_dir) == manifest, "Full runs must rewrite, not truncate, the manifest"
+        assert generate_all_templates(output_dir, max_templates=60, incremental=True) == (0, 0)
+
+        # A deleted output is rebuilt even though its inputs are unchanged
+        os.remove(os.path.join(output_dir, f"{next(iter(manifest))}.json"))
+        assert generate_all_templates(output_dir, max_templates=60, incremental=True) == (1, 0)
+
+        # Editing a wellness-only habit touches the wellness and "both" pools only
+        habit = HABIT_CATALOG["physical"][0]
+        original_priority = habit["priority"]
+        try:
+            habit["priority"] += 1
+            invalidate_catalog()
+            generated, failed = generate_all_templates(output_dir, max_templates=60, incremental=True)
+        finally:
+            habit["priority"] = original_priority
+            invalidate_catalog()
+        print(f"Rebuilt after physical habit edit: {generated}/60")
+        assert failed == 0 and 0 < generated < 60
+        assert load_manifest(output_dir) != manifest
+
+    print("✅ PASSED: Incremental builds only rewrite templates whose inputs changed")
+    return True
+
+def test_template_bundle():
+    """Test that the packed bundle round-trips every checked-in template"""
+    print("\n=== TEST: Template Bundle ===")
+
+    import json
+    import tempfile
+    from template_bundle import TemplateBundle, load_directory, write_bundle
+
+    assets_dir = os.path.join(os.path.dirname(__file__), "..", "assets", "habit_templates_v2")
+    templates = list(load_directory(assets_dir))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "templates.bundle.json")
+        packed = write_bundle(templates, path)
+        bundle = TemplateBundle.load(path)
+
+        assert len(bundle) == len(templates)
+        assert packed["fingerprints"] == sorted(packed["fingerprints"]), "Index must be sorted for binary search"
+        for template in templates:
+            assert template["fingerprint"] in bundle
+            assert bundle.get(template["fingerprint"]) == template, f"Round-trip differs for {template['template_id']}"
+            assert bundle.get(int(template["fingerprint"])) == template
+
+        missing = next(fp for fp in range(1, 1 << 30) if str(fp) not in bundle)
+        assert bundle.get(missing) is None
+
+        habit_refs = sum(len(t["habits"]) for t in templates)
+        files_size = sum(len(json.dumps(t, indent=2, ensure_ascii=False).encode("utf-8")) for t in templates)
+        print(f"{habit_refs} habit blocks -> {len(packed['habits'])} unique; "
+              f"{files_size // 1024}KB -> {os.path.getsize(path) // 1024}KB")
+        assert len(packed["habits"]) < habit_refs
+        assert os.path.getsize(path) < files_size
+
+    print("✅ PASSED: Bundle lookups return the exact per-file templates")
+    return True
+
 def run_all_tests():
     """Run all tests"""
     print("\n" + "="*60)
@@ -288,6 +659,17 @@ def run_all_tests():
         test_template_validation,
         test_maturity_filtering,
         test_duration_adjustment,
+        test_catalog_index,
+        test_habit_records,
+        test_compiled_scores_match_scalar,
+        test_compiled_selector_matches_scalar,
+        test_deterministic_tie_breaking,
+        test_checked_in_templates_reproduced,
+        test_selection_cache,
+        test_profile_space_enumeration,
+        test_profile_space_support_level,
+        test_incremental_regeneration,
+        test_template_bundle,
     ]
 
     passed = 0
@@ -9,6 +9,7 @@ import os
 from pathlib import Path
 from typing import Dict
 from generate_templates_v2 import generate_fingerprint
+from dart_fingerprint import dart_string_hash
 
 class Colors:
     GREEN = '\033[92m'
@@ -23,21 +24,8 @@ def simulate_dart_fingerprint(intent: str, maturity: str, motivations: list, cha
     # This matches onboarding_models.dart line 80-82
     key = f"{intent}_{maturity}_{'_'.join(motivations)}_{challenge}"
 
-    # Simulate Dart's Jenkins hash
-    h = 0
-    for char in key:
-        h = (h + ord(char)) & 0xFFFFFFFF
-        h = (h + (h << 10)) & 0xFFFFFFFF
-        h = (h ^ (h >> 6)) & 0xFFFFFFFF
-    h = (h + (h << 3)) & 0xFFFFFFFF
-    h = (h ^ (h >> 11)) & 0xFFFFFFFF
-    h = (h + (h << 15)) & 0xFFFFFFFF
-
-    # Convert to signed 32-bit integer
-    if h >= 0x80000000:
-        h = h - 0x100000000
-
-    return str(h)
+    # Dart's Jenkins hash (30-bit, as the Dart VM stores it)
+    return str(dart_string_hash(key))
 
 def test_onboarding_scenarios():
     """Test realistic onboarding scenarios"""
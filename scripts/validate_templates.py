@@ -12,8 +12,10 @@ import json
 import os
 import sys
 from pathlib import Path
-from typing import Dict, List
-from generate_templates_v2 import generate_fingerprint
+from typing import Dict, List, Optional
+from generate_templates_v2 import generate_fingerprint, generate_fingerprints
+from habit_catalog import CATALOG_INDEX
+from template_bundle import TemplateBundle
 
 # Colors for terminal output
 class Colors:
@@ -72,19 +74,29 @@ def validate_template_structure(template: Dict, filename: str) -> List[str]:
     
     return errors
 
-def validate_fingerprint_matching(template: Dict) -> List[str]:
-    """Validate fingerprint matches what Dart would generate"""
-    errors = []
-    
+def fingerprint_profile(template: Dict) -> Dict:
+    """Map a template's profile to the fields hashed by cacheFingerprint"""
     profile = template.get("profile", {})
     
-    # Reconstruct the fingerprint (handle None same as generator)
-    python_fingerprint = generate_fingerprint({
+    # Handle None same as generator
+    return {
         "intent": profile.get("intent", ""),
         "maturity": profile.get("spiritualMaturity") or "",  # Convert None to ""
         "motivations": profile.get("motivations", []),
         "challenge": profile.get("challenge", "")
-    })
+    }
+
+def validate_fingerprint_matching(template: Dict, expected_fingerprint: Optional[str] = None) -> List[str]:
+    """Validate fingerprint matches what Dart would generate
+
+    expected_fingerprint comes from a batched generate_fingerprints call; when
+    omitted the fingerprint is reconstructed for this template alone.
+    """
+    errors = []
+    
+    python_fingerprint = expected_fingerprint
+    if python_fingerprint is None:
+        python_fingerprint = generate_fingerprint(fingerprint_profile(template))
     
     template_fingerprint = template.get("fingerprint", "")
     
@@ -108,6 +120,13 @@ def validate_habit_selection(template: Dict) -> List[str]:
     for habit in habits:
         cat = habit.get("category", "unknown")
         categories[cat] = categories.get(cat, 0) + 1
+        
+        # Habit must come from the catalog, in the same category
+        catalog_habit = CATALOG_INDEX.get(habit.get("id"))
+        if catalog_habit is None:
+            errors.append(f"Habit {habit.get('id')} not found in catalog")
+        elif catalog_habit["category"] != cat:
+            errors.append(f"Habit {habit.get('id')} category {cat} != catalog {catalog_habit['category']}")
     
     # Validate based on intent
     if intent == "faithBased":
@@ -144,36 +163,60 @@ def validate_habit_selection(template: Dict) -> List[str]:
     
     return errors
 
-def validate_all_templates(directory: str = "habit_templates_v2") -> bool:
-    """Validate all templates in directory"""
+def validate_all_templates(directory: str = "habit_templates_v2", use_dart: bool = False) -> bool:
+    """Validate all templates in directory (or in a packed bundle file)
+
+    Fingerprints are regenerated in one batch up front (a single Dart
+    subprocess with use_dart) instead of once per template.
+    """
     template_dir = Path(directory)
     
     if not template_dir.exists():
         print(f"{Colors.RED}✗ Directory not found: {directory}{Colors.END}")
         return False
     
-    json_files = list(template_dir.glob("*.json"))
+    total_errors = 0
+    valid_count = 0
     
-    if len(json_files) == 0:
+    loaded = {}
+    if template_dir.is_file():
+        # Packed bundle: each template is checked under its virtual <fingerprint>.json name
+        try:
+            bundle = TemplateBundle.load(template_dir)
+        except (json.JSONDecodeError, ValueError) as e:
+            print(f"{Colors.RED}✗ {template_dir.name} - Invalid bundle: {e}{Colors.END}")
+            return False
+        loaded = {f"{fp}.json": template for fp, template in bundle.items()}
+        template_count = len(loaded)
+    else:
+        json_files = list(template_dir.glob("*.json"))
+        template_count = len(json_files)
+        for json_file in sorted(json_files):
+            try:
+                with open(json_file, 'r', encoding='utf-8') as f:
+                    loaded[json_file.name] = json.load(f)
+            except json.JSONDecodeError as e:
+                print(f"{Colors.RED}✗ {json_file.name} - Invalid JSON: {e}{Colors.END}\n")
+                total_errors += 1
+    
+    if template_count == 0:
         print(f"{Colors.RED}✗ No JSON files found in {directory}{Colors.END}")
         return False
     
-    print(f"{Colors.BOLD}Validating {len(json_files)} templates...{Colors.END}\n")
+    print(f"{Colors.BOLD}Validating {template_count} templates...{Colors.END}\n")
     
-    total_errors = 0
-    valid_count = 0
+    fingerprints = dict(zip(
+        loaded,
+        generate_fingerprints([fingerprint_profile(t) for t in loaded.values()], use_dart=use_dart)
+    ))
     
-    for json_file in sorted(json_files):
+    for filename, template in loaded.items():
         try:
-            with open(json_file, 'r', encoding='utf-8') as f:
-                template = json.load(f)
-            
-            filename = json_file.name
             all_errors = []
             
             # Run all validations
             all_errors.extend(validate_template_structure(template, filename))
-            all_errors.extend(validate_fingerprint_matching(template))
+            all_errors.extend(validate_fingerprint_matching(template, fingerprints[filename]))
             all_errors.extend(validate_habit_selection(template))
             
             if all_errors:
@@ -186,20 +229,17 @@ def validate_all_templates(directory: str = "habit_templates_v2") -> bool:
                 print(f"{Colors.GREEN}✓ {filename}{Colors.END}")
                 valid_count += 1
         
-        except json.JSONDecodeError as e:
-            print(f"{Colors.RED}✗ {json_file.name} - Invalid JSON: {e}{Colors.END}\n")
-            total_errors += 1
         except Exception as e:
-            print(f"{Colors.RED}✗ {json_file.name} - Error: {e}{Colors.END}\n")
+            print(f"{Colors.RED}✗ {filename} - Error: {e}{Colors.END}\n")
             total_errors += 1
     
     # Summary
     print(f"\n{Colors.BOLD}{'='*60}{Colors.END}")
     print(f"{Colors.BOLD}VALIDATION SUMMARY{Colors.END}")
     print(f"{Colors.BOLD}{'='*60}{Colors.END}")
-    print(f"Total templates: {len(json_files)}")
+    print(f"Total templates: {template_count}")
     print(f"{Colors.GREEN}Valid: {valid_count}{Colors.END}")
-    print(f"{Colors.RED}Invalid: {len(json_files) - valid_count}{Colors.END}")
+    print(f"{Colors.RED}Invalid: {template_count - valid_count}{Colors.END}")
     print(f"{Colors.YELLOW}Total errors: {total_errors}{Colors.END}")
     
     if total_errors == 0:
@@ -252,14 +292,23 @@ if __name__ == "__main__":
     # Test fingerprint generation
     test_sample_profiles()
     
+    # --dart: regenerate fingerprints with the real Dart runtime (one subprocess per directory)
+    use_dart = "--dart" in sys.argv[1:]
+    
     # Validate templates
-    success = validate_all_templates("habit_templates_v2")
+    success = validate_all_templates("habit_templates_v2", use_dart=use_dart)
+    
+    # Validate a packed bundle if one was given (--bundle PATH)
+    if "--bundle" in sys.argv[1:]:
+        bundle_path = sys.argv[sys.argv.index("--bundle") + 1]
+        print(f"\n{Colors.BOLD}Validating bundle {bundle_path}...{Colors.END}\n")
+        success = validate_all_templates(bundle_path, use_dart=use_dart) and success
     
     # Also validate assets directory if it exists
     assets_dir = "../assets/habit_templates_v2"
     if os.path.exists(assets_dir):
         print(f"\n{Colors.BOLD}Validating assets directory...{Colors.END}\n")
-        assets_success = validate_all_templates(assets_dir)
+        assets_success = validate_all_templates(assets_dir, use_dart=use_dart)
         success = success and assets_success
     
     sys.exit(0 if success else 1)
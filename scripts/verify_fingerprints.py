@@ -6,10 +6,15 @@ This is CRITICAL for cache matching to work in the app
 
 import json
 import os
-from generate_templates_v2 import generate_fingerprint
+import sys
+from generate_templates_v2 import generate_fingerprint, generate_fingerprints
 
-def verify_template_fingerprints(templates_dir: str = "habit_templates_v2"):
-    """Verify all templates have matching fingerprint in filename and content"""
+def verify_template_fingerprints(templates_dir: str = "habit_templates_v2", use_dart: bool = False):
+    """Verify all templates have matching fingerprint in filename and content
+
+    All profiles are fingerprinted in one batch; with use_dart that batch is a
+    single Dart subprocess regardless of how many templates exist.
+    """
     
     print("\n" + "="*60)
     print("FINGERPRINT VERIFICATION")
@@ -27,30 +32,35 @@ def verify_template_fingerprints(templates_dir: str = "habit_templates_v2"):
     
     print(f"Found {len(files)} template files\n")
     
-    mismatches = []
-    verified = 0
-    
+    templates = []
+    profiles_for_fingerprint = []
     for filename in sorted(files):
         filepath = os.path.join(templates_dir, filename)
         
         with open(filepath, 'r', encoding='utf-8') as f:
             template = json.load(f)
         
-        # Extract fingerprint from filename (remove .json)
-        filename_fingerprint = filename[:-5]
-        
-        # Get fingerprint from template content
-        content_fingerprint = template.get("fingerprint")
-        
         # Regenerate fingerprint from profile
         profile = template.get("profile", {})
-        profile_for_fingerprint = {
+        templates.append((filename, template))
+        profiles_for_fingerprint.append({
             "intent": profile.get("intent"),
             "maturity": profile.get("spiritualMaturity"),  # Map spiritualMaturity -> maturity
             "motivations": profile.get("motivations", []),
             "challenge": profile.get("challenge")
-        }
-        regenerated_fingerprint = generate_fingerprint(profile_for_fingerprint)
+        })
+    
+    regenerated = generate_fingerprints(profiles_for_fingerprint, use_dart=use_dart)
+    
+    mismatches = []
+    verified = 0
+    
+    for (filename, template), regenerated_fingerprint in zip(templates, regenerated):
+        # Extract fingerprint from filename (remove .json)
+        filename_fingerprint = filename[:-5]
+        
+        # Get fingerprint from template content
+        content_fingerprint = template.get("fingerprint")
 
         # Verify all three match
         if filename_fingerprint == content_fingerprint == regenerated_fingerprint:
@@ -113,7 +123,7 @@ OnboardingProfile(
     print(f"\nDart code to verify:")
     print("""
 final profile = OnboardingProfile(...);  // as above
-print('Dart fingerprint: ${profile.cacheFingerprint}');
+print('Dart fingerprint: ${{profile.cacheFingerprint}}');
 // Should output: {fingerprint}
 """.format(fingerprint=fingerprint))
     
@@ -122,7 +132,8 @@ print('Dart fingerprint: ${profile.cacheFingerprint}');
 
 
 if __name__ == "__main__":
-    success = verify_template_fingerprints()
+    # --dart: regenerate fingerprints with the real Dart runtime (one subprocess)
+    success = verify_template_fingerprints(use_dart="--dart" in sys.argv[1:])
     
     if success:
         show_sample_dart_comparison()